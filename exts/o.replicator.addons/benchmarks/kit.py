@@ -0,0 +1,280 @@
+"""
+Lightweight stand-ins for the Kit modules the nodes import, so they can run on ``usd-core`` outside of Kit.
+
+Call :func:`install` before importing anything from ``o.replicator.addons``. The Replicator patches are skipped
+when ``omni.replicator.core`` can't be imported.
+"""
+import enum
+import functools
+import json
+import logging
+import os
+import sys
+import types
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pxr import Gf, Sdf, Usd, UsdGeom
+
+EXTENSION_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+logger = logging.getLogger("o.replicator.addons.benchmarks")
+
+
+class Settings:
+    """``carb.settings`` stand-in, a flat dictionary with change subscriptions."""
+
+    def __init__(self):
+        self._values: Dict[str, Any] = {}
+        self._subscribers: Dict[str, List[Callable]] = {}
+
+    def get(self, path: str) -> Any:
+        return self._values.get(path)
+
+    def set(self, path: str, value: Any):
+        self._values[path] = value
+        for callback in self._subscribers.get(path, []):
+            callback(None, None)
+
+    def subscribe_to_node_change_events(self, path: str, callback: Callable):
+        self._subscribers.setdefault(path, []).append(callback)
+        return callback
+
+
+class Timeline:
+    """``omni.timeline`` interface stand-in, the current time is set by the benchmarks."""
+
+    def __init__(self, time_codes_per_second: float = 60.0):
+        self.current_time = 0.0
+        self.time_codes_per_second = time_codes_per_second
+
+    def get_current_time(self) -> float:
+        return self.current_time
+
+    def get_time_codes_per_seconds(self) -> float:
+        return self.time_codes_per_second
+
+
+class UsdContext:
+    """
+    ``omni.usd.UsdContext`` stand-in over a ``usd-core`` stage.
+
+    The bounds and transform queries are computed on every call, without a cache kept across calls.
+    """
+
+    def __init__(self):
+        self.stage: Optional[Usd.Stage] = None
+
+    def get_stage(self) -> Optional[Usd.Stage]:
+        return self.stage
+
+    def _time(self) -> Usd.TimeCode:
+        timeline = _timeline
+        return Usd.TimeCode(timeline.current_time * timeline.time_codes_per_second)
+
+    def compute_path_world_bounding_box(self, path: str) -> Tuple[Tuple[float, ...], Tuple[float, ...]]:
+        prim = self.stage.GetPrimAtPath(path)
+        if not prim:
+            return (1.0e30,) * 3, (-1.0e30,) * 3
+        purposes = [UsdGeom.Tokens.default_, UsdGeom.Tokens.render]
+        aligned = UsdGeom.BBoxCache(self._time(), purposes).ComputeWorldBound(prim).ComputeAlignedRange()
+        if aligned.IsEmpty():
+            return (1.0e30,) * 3, (-1.0e30,) * 3
+        return tuple(aligned.GetMin()), tuple(aligned.GetMax())
+
+    def compute_path_world_transform(self, path: str) -> Tuple[float, ...]:
+        prim = self.stage.GetPrimAtPath(path)
+        matrix = UsdGeom.Xformable(prim).ComputeLocalToWorldTransform(self._time()) if prim else Gf.Matrix4d(1)
+        return tuple(value for row in matrix for value in row)
+
+
+class ExecutionAttributeState(enum.IntEnum):
+    DISABLED = 0
+    ENABLED = 1
+    ENABLED_AND_PUSH = 2
+    LATENT_PUSH = 3
+    LATENT_FINISH = 4
+
+
+@functools.lru_cache(maxsize=None)
+def ogn_inputs(node: str) -> Dict[str, Dict[str, Any]]:
+    """Return the input specs of the ``node`` type, from its ``.ogn`` file."""
+    path = os.path.join(EXTENSION_ROOT, "o", "replicator", "addons", "nodes", f"Ogn{node}.ogn")
+    with open(path) as ogn_file:
+        return json.load(ogn_file)[node].get("inputs", {})
+
+
+def ogn_defaults(node: str) -> Dict[str, Any]:
+    """Return the default of each input of the ``node`` type, from its ``.ogn`` file."""
+    return {name: attribute.get("default") for name, attribute in ogn_inputs(node).items()}
+
+
+# ``.ogn`` attribute types to the USD types of their node prim attributes, the others aren't authored
+OGN_VALUE_TYPES = {
+    "bool": Sdf.ValueTypeNames.Bool,
+    "int": Sdf.ValueTypeNames.Int,
+    "int[]": Sdf.ValueTypeNames.IntArray,
+    "float": Sdf.ValueTypeNames.Float,
+    "float[]": Sdf.ValueTypeNames.FloatArray,
+    "double": Sdf.ValueTypeNames.Double,
+    "string": Sdf.ValueTypeNames.String,
+    "token": Sdf.ValueTypeNames.Token,
+}
+
+
+class Attribute:
+    """An ``og.Attribute`` of a :class:`Node`, backed by a prim attribute."""
+
+    def __init__(self, node: "Node", name: str, value_type: Optional[Sdf.ValueTypeName]):
+        self.node = node
+        self.name = name
+        self.value_type = value_type
+
+    def get_name(self) -> str:
+        return self.name
+
+
+class Node:
+    """
+    An ``og.Node`` whose values live in a dictionary, the stand-in of Fabric, and are synced to its prim on demand.
+
+    Args:
+        prim (Usd.Prim): The node prim.
+        node_type (str): The node type, e.g. "CalculateFocalLength".
+    """
+
+    def __init__(self, prim: Usd.Prim, node_type: str):
+        self.prim = prim
+        self.node_type = node_type
+        self.values: Dict[str, Any] = {}
+        self._attributes: Dict[str, Attribute] = {}
+        for name, attribute in ogn_inputs(node_type).items():
+            full_name = f"inputs:{name}"
+            self._attributes[full_name] = Attribute(self, full_name, OGN_VALUE_TYPES.get(attribute["type"]))
+            self.values[full_name] = attribute.get("default")
+
+    def get_type_name(self) -> str:
+        return f"o.replicator.addons.{self.node_type}"
+
+    def get_prim_path(self) -> str:
+        return str(self.prim.GetPath())
+
+    def get_attribute(self, name: str) -> Attribute:
+        return self._attributes[name]
+
+    def get_attribute_exists(self, name: str) -> bool:
+        return name in self._attributes
+
+    def get_attributes(self) -> List[Attribute]:
+        return list(self._attributes.values())
+
+
+class AttributeValueHelper:
+    """The ``og.AttributeValueHelper`` of an :class:`Attribute`."""
+
+    def __init__(self, attribute: Attribute):
+        self.attribute = attribute
+
+    def get(self) -> Any:
+        return self.attribute.node.values[self.attribute.name]
+
+    def set(self, value: Any, update_usd: bool = False):
+        self.attribute.node.values[self.attribute.name] = value
+        if update_usd and self.attribute.value_type is not None:
+            prim = self.attribute.node.prim
+            usd_attribute = prim.GetAttribute(self.attribute.name)
+            if not usd_attribute:
+                usd_attribute = prim.CreateAttribute(self.attribute.name, self.attribute.value_type)
+            usd_attribute.Set(value)
+
+
+def create_node(stage: Usd.Stage, path: str, node_type: str) -> Node:
+    """Define an OmniGraph node prim of ``node_type`` at ``path``, without any authored input."""
+    prim = stage.DefinePrim(path, "OmniGraphNode")
+    prim.CreateAttribute("node:type", Sdf.ValueTypeNames.Token, custom=False).Set(f"o.replicator.addons.{node_type}")
+    return Node(prim, node_type)
+
+
+class FakeDb:
+    """
+    The ``db`` object a node ``compute`` receives, with plain attribute inputs and outputs.
+
+    Args:
+        inputs (Dict[str, Any]): The node inputs, without the ``inputs:`` prefix.
+        internal_state (Any, optional): The per node instance state. Defaults to None.
+        node (str, optional): The node type, e.g. "CalculateFocalLength". The inputs missing from ``inputs`` get the
+            default of its ``.ogn`` file. Defaults to None.
+    """
+
+    def __init__(self, inputs: Dict[str, Any], internal_state: Any = None, node: Optional[str] = None):
+        if node is not None:
+            inputs = {**ogn_defaults(node), **inputs}
+        self.inputs = types.SimpleNamespace(**inputs)
+        self.outputs = types.SimpleNamespace()
+        self.internal_state = internal_state
+        self.errors: List[str] = []
+
+    def log_error(self, message: str):
+        self.errors.append(message)
+
+    def log_warning(self, message: str):
+        logger.warning(message)
+
+
+_settings = Settings()
+_timeline = Timeline()
+_usd_context = UsdContext()
+
+
+def _module(name: str, **attributes) -> types.ModuleType:
+    module = sys.modules.get(name)
+    if module is None:
+        module = sys.modules[name] = types.ModuleType(name)
+    for key, value in attributes.items():
+        setattr(module, key, value)
+
+    parent_name, _, child_name = name.rpartition(".")
+    if parent_name:
+        setattr(sys.modules[parent_name], child_name, module)
+    return module
+
+
+def install():
+    """Register the stand-ins in ``sys.modules``, the real modules are used where they can be imported."""
+    if "omni.usd" in sys.modules and getattr(sys.modules["omni.usd"], "get_context", None) is _usd_context_getter:
+        return
+
+    _module("carb", log_warn=logger.debug, log_error=logger.error, log_info=logger.debug)
+    _module("carb.settings", get_settings=lambda: _settings)
+    _module("omni")
+    _module("omni.ext", IExt=object)
+    _module("omni.usd", get_context=_usd_context_getter)
+    _module("omni.timeline", get_timeline_interface=lambda: _timeline)
+    _module("omni.graph")
+    _module(
+        "omni.graph.core",
+        ExecutionAttributeState=ExecutionAttributeState,
+        Node=Node,
+        Attribute=Attribute,
+        AttributeValueHelper=AttributeValueHelper,
+    )
+
+    if EXTENSION_ROOT not in sys.path:
+        sys.path.insert(0, EXTENSION_ROOT)
+
+
+def _usd_context_getter() -> UsdContext:
+    return _usd_context
+
+
+def set_stage(stage: Usd.Stage):
+    """Make ``stage`` the stage of the ``omni.usd`` context."""
+    _usd_context.stage = stage
+
+
+def set_time(time_code: float):
+    """Move the timeline to ``time_code``."""
+    _timeline.current_time = time_code / _timeline.time_codes_per_second
+
+
+def get_settings() -> Settings:
+    return _settings
@@ -0,0 +1,400 @@
+"""
+Time the framing and camera-param nodes on ``usd-core`` stages, outside of Kit.
+
+Usage:
+    python exts/o.replicator.addons/benchmarks/run.py --sizes 1 100 10000 --output bench.json
+    python exts/o.replicator.addons/benchmarks/run.py --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import kit  # noqa: E402
+
+kit.install()
+
+import numpy as np  # noqa: E402
+from pxr import Sdf, Usd  # noqa: E402
+
+import o.replicator.addons as addons  # noqa: E402
+from o.replicator.addons.nodes.OgnCalculateFocalLength import (  # noqa: E402
+    OgnCalculateFocalLength,
+    compute_bounds,
+    compute_local_transform,
+)
+from o.replicator.addons.nodes.OgnCheckVisibility import OgnCheckVisibility  # noqa: E402
+from o.replicator.addons.nodes.OgnCullTargets import OgnCullTargets  # noqa: E402
+from o.replicator.addons.nodes.OgnSetCameraParams import OgnSetCameraParams  # noqa: E402
+from o.replicator.addons.scripts.baking import bake_camera_params  # noqa: E402
+from o.replicator.addons.scripts.bounds import BOUNDS_BACKEND_CONTEXT, BOUNDS_BACKEND_USD  # noqa: E402
+from o.replicator.addons.scripts.graph import batch_graph_edits, new_node, set_input  # noqa: E402
+from o.replicator.addons.scripts.query import TargetQuery, get_target_index, resolve_query  # noqa: E402
+from o.replicator.addons.scripts.stats import get_stats  # noqa: E402
+from o.replicator.addons.scripts.tracking import get_change_tracker  # noqa: E402
+from scenes import LAYOUTS, TARGET_LABEL, Scene, add_cameras, build_scene  # noqa: E402
+
+DEFAULT_SIZES = (1, 10, 100, 1000, 10000, 100000)
+# Camera/target pairs of the focus_pairs cases, at most one per target
+MAX_PAIRS = 256
+# Frames of the camera param sequence of the bake case
+BAKE_FRAMES = 10000
+# Targets whose visibility is checked, the other spheres are occluders
+VISIBILITY_TARGETS = 16
+
+
+def _extension_version() -> str:
+    with open(os.path.join(kit.EXTENSION_ROOT, "config", "extension.toml")) as toml:
+        for line in toml:
+            if line.startswith("version"):
+                return line.split("=", 1)[1].strip().strip('"')
+    return "unknown"
+
+
+def time_case(fn: Callable[[int], None], budget: float, min_runs: int, max_runs: int) -> Dict[str, float]:
+    """
+    Call ``fn(run)`` once to warm up, then until ``budget`` seconds are spent or ``max_runs`` runs are done.
+
+    Returns:
+        Dict[str, float]: The run count and the min, median, mean and standard deviation, in seconds.
+    """
+    fn(-1)
+    timings: List[float] = []
+    start = time.perf_counter()
+    while len(timings) < max_runs and (len(timings) < min_runs or time.perf_counter() - start < budget):
+        run_start = time.perf_counter()
+        fn(len(timings))
+        timings.append(time.perf_counter() - run_start)
+
+    return {
+        "runs": len(timings),
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.fmean(timings),
+        "stdev_s": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+def _calculate_focal_length_db(
+    scene: Scene, backend: str, use_cache: bool, target_query: str = "", skip_unchanged: bool = False
+) -> kit.FakeDb:
+    return kit.FakeDb(
+        {
+            "prims": [scene.camera_path],
+            "targetPrim": [] if target_query else scene.target_paths,
+            "targetQuery": target_query,
+            "zoom": 2.0,
+            "setFocalLength": True,
+            "useHorizontalFov": True,
+            "conform": 0,
+            "useBoundsCache": use_cache,
+            "boundsBackend": backend,
+            "writeBackend": "usd",
+            "fabricWriteBack": False,
+            "skipUnchanged": skip_unchanged,
+        },
+        OgnCalculateFocalLength.internal_state(),
+        node="CalculateFocalLength",
+    )
+
+
+def _set_camera_params_db(scene: Scene) -> kit.FakeDb:
+    return kit.FakeDb(
+        {
+            "cameraPrim": [scene.camera_path],
+            "params": ["focalLength", "horizontalAperture", "verticalAperture"],
+            "values": [24.0, 20.955, 15.2908],
+            "writeBackend": "usd",
+            "fabricWriteBack": False,
+        },
+        OgnSetCameraParams.internal_state(),
+        node="SetCameraParams",
+    )
+
+
+def _check_visibility_db(scene: Scene) -> kit.FakeDb:
+    return kit.FakeDb(
+        {"prims": [scene.camera_path], "targetPrim": scene.target_paths[-VISIBILITY_TARGETS:]},
+        node="CheckVisibility",
+    )
+
+
+def _check(db: kit.FakeDb, ok: bool):
+    if not ok:
+        raise RuntimeError(f"compute failed: {db.errors}")
+
+
+def build_focus_nodes(scene: Scene, count: int, batched: bool):
+    """Build ``count`` focal length nodes with the inputs ``rep.modify.focus`` sets, in a new graph of ``scene``."""
+    stage = scene.stage
+    graph_path = f"/BenchmarkGraph_{'batched' if batched else 'immediate'}"
+    stage.RemovePrim(graph_path)
+    stage.DefinePrim(graph_path, "OmniGraph")
+
+    def build():
+        for n in range(count):
+            node = new_node(kit.create_node(stage, f"{graph_path}/focus_{n}", "CalculateFocalLength"))
+            set_input(node, "inputs:zoom", 2.0)
+            set_input(node, "inputs:setFocalLength", False)
+            set_input(node, "inputs:useHorizontalFov", True)
+            set_input(node, "inputs:conform", "fit")
+            set_input(node, "inputs:skipUnchanged", True)
+
+    if batched:
+        with batch_graph_edits():
+            build()
+    else:
+        build()
+
+
+def scene_cases(scene: Scene) -> Dict[str, Callable[[int], None]]:
+    """Return the cases timed on ``scene``, keyed by name."""
+    cases = {}
+
+    # Every target twice and after its parent, bounded through the parents alone
+    overlapping = [str(Sdf.Path(path).GetParentPath()) for path in scene.target_paths] + scene.target_paths * 2
+
+    for backend in (BOUNDS_BACKEND_CONTEXT, BOUNDS_BACKEND_USD):
+        cases[f"compute_bounds[{backend}]"] = lambda run, backend=backend: compute_bounds(
+            scene.camera_path, scene.target_paths, False, backend
+        )
+        cases[f"compute_bounds[{backend},overlapping]"] = lambda run, backend=backend: compute_bounds(
+            scene.camera_path, overlapping, False, backend
+        )
+        cases[f"compute_local_transform[{backend}]"] = lambda run, backend=backend: compute_local_transform(
+            scene.camera_path, backend
+        )
+
+    for backend, use_cache in (
+        (BOUNDS_BACKEND_CONTEXT, False),
+        (BOUNDS_BACKEND_USD, False),
+        (BOUNDS_BACKEND_USD, True),
+    ):
+        db = _calculate_focal_length_db(scene, backend, use_cache)
+        name = f"OgnCalculateFocalLength.compute[{backend}{',cached' if use_cache else ''}]"
+        cases[name] = lambda run, db=db: _check(db, OgnCalculateFocalLength.compute(db))
+
+    # Nothing moves between runs, every run after the first one reuses the last solve
+    db = _calculate_focal_length_db(scene, BOUNDS_BACKEND_USD, False, skip_unchanged=True)
+    cases["OgnCalculateFocalLength.compute[usd,skip]"] = lambda run, db=db: _check(
+        db, OgnCalculateFocalLength.compute(db)
+    )
+
+    # The timeline advances on every run over the static scene, the solves are still skipped
+    def skip_advancing(run, db=_calculate_focal_length_db(scene, BOUNDS_BACKEND_USD, False, skip_unchanged=True)):
+        kit.set_time(float(run + 1))
+        try:
+            _check(db, OgnCalculateFocalLength.compute(db))
+        finally:
+            kit.set_time(0.0)
+
+    cases["OgnCalculateFocalLength.compute[usd,skip,advancing]"] = skip_advancing
+
+    # Solved for a coverage range from the 8 projected corners of every target box
+    db = _calculate_focal_length_db(scene, BOUNDS_BACKEND_USD, False)
+    db.inputs.coverage = [0.1, 0.3]
+    cases["OgnCalculateFocalLength.compute[usd,coverage]"] = lambda run, db=db: _check(
+        db, OgnCalculateFocalLength.compute(db)
+    )
+
+    # Solved and recorded on every run, then the recorded frame replayed without solving
+    recording_path = tempfile.mkdtemp(prefix="o_replicator_addons_recording_")
+    db = _calculate_focal_length_db(scene, BOUNDS_BACKEND_USD, False)
+    db.inputs.recordMode, db.inputs.recordPath = "record", recording_path
+    cases["OgnCalculateFocalLength.compute[usd,record]"] = lambda run, db=db: _check(
+        db, OgnCalculateFocalLength.compute(db)
+    )
+
+    def replay(run, db=_calculate_focal_length_db(scene, BOUNDS_BACKEND_USD, False)):
+        db.inputs.recordMode, db.inputs.recordPath = "replay", recording_path
+        db.internal_state.frame = 0
+        _check(db, OgnCalculateFocalLength.compute(db))
+
+    cases["OgnCalculateFocalLength.compute[usd,replay]"] = replay
+
+    # Targets selected by semantic label, served from the notice-maintained index
+    query = TargetQuery([TARGET_LABEL])
+    cases["resolve_query[semantics]"] = lambda run: resolve_query(scene.stage, query)
+    db = _calculate_focal_length_db(scene, BOUNDS_BACKEND_USD, True, query.to_json())
+    cases["OgnCalculateFocalLength.compute[usd,cached,query]"] = lambda run, db=db: _check(
+        db, OgnCalculateFocalLength.compute(db)
+    )
+
+    # Every target box tested against the camera frustum in one pass
+    db = kit.FakeDb(
+        {"prims": [scene.camera_path], "targetPrim": scene.target_paths, "boundsBackend": BOUNDS_BACKEND_USD},
+        OgnCullTargets.internal_state(),
+        node="CullTargets",
+    )
+    cases["OgnCullTargets.compute[usd]"] = lambda run, db=db: _check(db, OgnCullTargets.compute(db))
+
+    # Rays cast against the occluder hierarchy, as is and refit after a sphere moved through USD
+    db = _check_visibility_db(scene)
+    cases["OgnCheckVisibility.compute"] = lambda run, db=db: _check(db, OgnCheckVisibility.compute(db))
+
+    moved = scene.stage.GetPrimAtPath(scene.target_paths[0]).GetAttribute("xformOp:translate")
+
+    def check_visibility_refit(run, db=_check_visibility_db(scene), origin=moved.Get()):
+        moved.Set(origin + (0.0, 0.0, run % 2 * 1.0))
+        _check(db, OgnCheckVisibility.compute(db))
+
+    cases["OgnCheckVisibility.compute[refit]"] = check_visibility_refit
+
+    # Unchanged values are skipped by the node, changing ones are authored on every run
+    db = _set_camera_params_db(scene)
+    cases["OgnSetCameraParams.compute[unchanged]"] = lambda run, db=db: _check(db, OgnSetCameraParams.compute(db))
+
+    changing_db = _set_camera_params_db(scene)
+
+    def set_changing_params(run, db=changing_db):
+        db.inputs.values = [24.0 + run % 7, 20.955, 15.2908 + run % 3]
+        _check(db, OgnSetCameraParams.compute(db))
+
+    cases["OgnSetCameraParams.compute[changing]"] = set_changing_params
+
+    # A camera param sequence authored as time samples in one pass, instead of one compute per frame
+    bake_values = np.stack(
+        [np.linspace(18.0, 200.0, BAKE_FRAMES), np.full(BAKE_FRAMES, 20.955), np.full(BAKE_FRAMES, 15.2908)], axis=1
+    )
+    cases[f"bake_camera_params[{BAKE_FRAMES}_frames]"] = lambda run: bake_camera_params(
+        scene.stage, scene.camera_path, ("focalLength", "horizontalAperture", "verticalAperture"), bake_values
+    )
+
+    # Each camera framing its own target, with one node for all the pairs and with one node per pair
+    pairs = min(len(scene.target_paths), MAX_PAIRS)
+    camera_paths = add_cameras(scene.stage, pairs)
+    zooms = [1.0 + i % 4 * 0.5 for i in range(pairs)]
+    db = _calculate_focal_length_db(scene, BOUNDS_BACKEND_USD, False)
+    db.inputs.prims = camera_paths
+    db.inputs.targetPrim = scene.target_paths[:pairs]
+    db.inputs.targetCounts = [1] * pairs
+    db.inputs.zooms = zooms
+    cases["focus_pairs[one_node]"] = lambda run, db=db: _check(db, OgnCalculateFocalLength.compute(db))
+
+    pair_dbs = []
+    for camera_path, target_path, pair_zoom in zip(camera_paths, scene.target_paths, zooms):
+        pair_db = _calculate_focal_length_db(scene, BOUNDS_BACKEND_USD, False)
+        pair_db.inputs.prims = [camera_path]
+        pair_db.inputs.targetPrim = [target_path]
+        pair_db.inputs.zoom = pair_zoom
+        pair_dbs.append(pair_db)
+
+    def focus_each_pair(run):
+        for pair_db in pair_dbs:
+            _check(pair_db, OgnCalculateFocalLength.compute(pair_db))
+
+    cases["focus_pairs[node_per_pair]"] = focus_each_pair
+
+    # One focus node per target, with the stage listeners of a running graph notified of every input sync
+    get_target_index(scene.stage)
+    get_change_tracker(scene.stage)
+    for batched in (False, True):
+        cases[f"build_graph[{'batched' if batched else 'immediate'}]"] = lambda run, batched=batched: (
+            build_focus_nodes(scene, len(scene.target_paths), batched)
+        )
+    return cases
+
+
+def run(
+    sizes: Sequence[int],
+    layouts: Sequence[str],
+    budget: float,
+    min_runs: int,
+    max_runs: int,
+    cases: Optional[Sequence[str]] = None,
+) -> Dict:
+    results = []
+    for layout in layouts:
+        for size in sizes:
+            build_start = time.perf_counter()
+            scene = build_scene(size, layout)
+            build_time = time.perf_counter() - build_start
+            kit.set_stage(scene.stage)
+            kit.set_time(0.0)
+
+            for name, fn in scene_cases(scene).items():
+                if cases and not any(pattern in name for pattern in cases):
+                    continue
+                timing = time_case(fn, budget, min_runs, max_runs)
+                results.append({"case": name, "layout": layout, "targets": size, **timing})
+                print(
+                    f"{layout:>5} {size:>7} {name:<55} median {timing['median_s'] * 1e3:10.3f} ms"
+                    f" ({timing['runs']} runs)",
+                    file=sys.stderr,
+                )
+            results.append({"case": "build_scene", "layout": layout, "targets": size, "runs": 1, "min_s": build_time})
+
+    return {
+        "meta": {
+            "extension_version": _extension_version(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "usd": ".".join(map(str, Usd.GetVersion())),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+        "imports": addons.import_report(),
+        "stats": get_stats(),
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[Dict]:
+    """Return the cases whose median is more than ``threshold`` times slower than in ``baseline``."""
+
+    def key(result):
+        return result["case"], result["layout"], result["targets"]
+
+    baseline_results = {key(result): result for result in baseline["results"] if "median_s" in result}
+    regressions = []
+    for result in current["results"]:
+        previous = baseline_results.get(key(result))
+        if previous is None or "median_s" not in result:
+            continue
+        ratio = result["median_s"] / max(previous["median_s"], 1e-12)
+        if ratio > threshold:
+            regressions.append(
+                {"case": result["case"], "layout": result["layout"], "targets": result["targets"], "ratio": ratio}
+            )
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Target counts to time")
+    parser.add_argument("--layouts", nargs="+", choices=LAYOUTS, default=LAYOUTS, help="Target hierarchies")
+    parser.add_argument("--cases", nargs="+", help="Only time the cases whose name contains one of these")
+    parser.add_argument("--budget", type=float, default=1.0, help="Seconds spent on each case")
+    parser.add_argument("--min-runs", type=int, default=3)
+    parser.add_argument("--max-runs", type=int, default=1000)
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.layouts, args.budget, args.min_runs, args.max_runs, args.cases)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            results["regressions"] = compare(json.load(baseline_file), results, args.threshold)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    return 1 if results.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
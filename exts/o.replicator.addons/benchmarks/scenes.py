@@ -0,0 +1,122 @@
+"""
+Benchmark scenes: a Replicator-style camera and ``N`` sphere targets in a flat or deep hierarchy.
+"""
+from typing import List, NamedTuple
+
+from pxr import Gf, Sdf, Usd, UsdGeom, Vt
+
+LAYOUT_FLAT = "flat"
+LAYOUT_DEEP = "deep"
+LAYOUTS = (LAYOUT_FLAT, LAYOUT_DEEP)
+
+CAMERA_XFORM_PATH = "/Replicator/Camera_Xform"
+CAMERA_PATH = f"{CAMERA_XFORM_PATH}/Camera"
+TARGETS_PATH = "/World/Targets"
+TARGET_LABEL = ("class", "target")
+
+
+class Scene(NamedTuple):
+    stage: Usd.Stage
+    camera_path: str
+    target_paths: List[str]
+
+
+def _xform_spec(layer: Sdf.Layer, path: Sdf.Path, translate: Gf.Vec3d) -> Sdf.PrimSpec:
+    spec = Sdf.CreatePrimInLayer(layer, path)
+    spec.specifier = Sdf.SpecifierDef
+    spec.typeName = "Xform"
+    Sdf.AttributeSpec(spec, "xformOp:translate", Sdf.ValueTypeNames.Double3).default = translate
+    Sdf.AttributeSpec(spec, "xformOpOrder", Sdf.ValueTypeNames.TokenArray).default = Vt.TokenArray(
+        ["xformOp:translate"]
+    )
+    return spec
+
+
+def _sphere_spec(layer: Sdf.Layer, path: Sdf.Path, translate: Gf.Vec3d, radius: float):
+    spec = _xform_spec(layer, path, translate)
+    spec.typeName = "Sphere"
+    Sdf.AttributeSpec(spec, "radius", Sdf.ValueTypeNames.Double).default = radius
+    Sdf.AttributeSpec(spec, "extent", Sdf.ValueTypeNames.Float3Array).default = Vt.Vec3fArray(
+        [Gf.Vec3f(-radius), Gf.Vec3f(radius)]
+    )
+
+
+def _semantics_spec(layer: Sdf.Layer, path: Sdf.Path, label_type: str, data: str):
+    spec = layer.GetPrimAtPath(path)
+    spec.SetInfo("apiSchemas", Sdf.TokenListOp.Create(prependedItems=["SemanticsAPI:Semantics"]))
+    Sdf.AttributeSpec(spec, "semantic:Semantics:params:semanticType", Sdf.ValueTypeNames.String).default = label_type
+    Sdf.AttributeSpec(spec, "semantic:Semantics:params:semanticData", Sdf.ValueTypeNames.String).default = data
+
+
+def _camera_spec(layer: Sdf.Layer, xform_path: Sdf.Path, translate: Gf.Vec3d):
+    camera_xform = _xform_spec(layer, xform_path, translate)
+    Sdf.AttributeSpec(camera_xform, "replicatorXform", Sdf.ValueTypeNames.Bool).default = True
+    camera = Sdf.CreatePrimInLayer(layer, xform_path.AppendChild("Camera"))
+    camera.specifier = Sdf.SpecifierDef
+    camera.typeName = "Camera"
+    Sdf.AttributeSpec(camera, "focalLength", Sdf.ValueTypeNames.Float).default = 24.0
+    Sdf.AttributeSpec(camera, "horizontalAperture", Sdf.ValueTypeNames.Float).default = 20.955
+    Sdf.AttributeSpec(camera, "verticalAperture", Sdf.ValueTypeNames.Float).default = 15.2908
+
+
+def add_cameras(stage: Usd.Stage, count: int) -> List[str]:
+    """Add ``count`` Replicator-style cameras to ``stage``, in a row, and return their xform paths."""
+    paths = []
+    layer = stage.GetRootLayer()
+    with Sdf.ChangeBlock():
+        for i in range(count):
+            path = Sdf.Path(f"/Replicator/Camera_Xform_{i}")
+            _camera_spec(layer, path, Gf.Vec3d(i % 100 * 10.0, 200, 1500))
+            paths.append(str(path))
+    return paths
+
+
+def build_scene(num_targets: int, layout: str = LAYOUT_FLAT, depth: int = 16, fanout: int = 8) -> Scene:
+    """
+    Build an in-memory stage with a camera under a Replicator camera xform and ``num_targets`` spheres.
+
+    Every sphere carries the ``TARGET_LABEL`` semantic label.
+
+    Args:
+        num_targets (int): The number of sphere targets.
+        layout (str, optional): "flat" puts every target directly under one scope, "deep" nests each group of
+            ``fanout`` targets under a chain of ``depth`` translated xforms. Defaults to "flat".
+        depth (int, optional): The length of the xform chains of the deep layout. Defaults to 16.
+        fanout (int, optional): The number of targets sharing a chain in the deep layout. Defaults to 8.
+
+    Returns:
+        Scene: The stage, the camera xform path and the target paths.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout}")
+
+    stage = Usd.Stage.CreateInMemory()
+    layer = stage.GetRootLayer()
+    target_paths = []
+
+    with Sdf.ChangeBlock():
+        for root in ("/Replicator", "/World"):
+            _xform_spec(layer, Sdf.Path(root), Gf.Vec3d(0))
+
+        _camera_spec(layer, Sdf.Path(CAMERA_XFORM_PATH), Gf.Vec3d(0, 200, 1500))
+
+        _xform_spec(layer, Sdf.Path(TARGETS_PATH), Gf.Vec3d(0))
+        for i in range(num_targets):
+            parent = Sdf.Path(TARGETS_PATH)
+            if layout == LAYOUT_DEEP:
+                parent = parent.AppendChild(f"Chain_{i // fanout}")
+                if i % fanout == 0:
+                    for level in range(depth):
+                        _xform_spec(layer, parent, Gf.Vec3d(1, 0, 0))
+                        if level < depth - 1:
+                            parent = parent.AppendChild(f"Level_{level}")
+                else:
+                    for level in range(depth - 1):
+                        parent = parent.AppendChild(f"Level_{level}")
+
+            path = parent.AppendChild(f"Sphere_{i}")
+            _sphere_spec(layer, path, Gf.Vec3d(i % 100 * 10.0, i // 100 % 100 * 10.0, i // 10000 * 10.0), 5.0)
+            _semantics_spec(layer, path, *TARGET_LABEL)
+            target_paths.append(str(path))
+
+    return Scene(stage, CAMERA_XFORM_PATH, target_paths)
@@ -1,22 +1,56 @@
-
-from ._impl import *
-
-from inspect import getmembers, isfunction, isclass, ismodule
-
-# Get all the functions from the modify module
-from .scripts import modify
-
-import sys
-sys.modules["o.replicator.addons.modify"] = modify
-
-from omni.replicator.core.utils import ReplicatorWrapper
-
-predicate = lambda x: (isfunction(x) or isclass(x) or type(x)==ReplicatorWrapper) and x.__module__ == modify.__name__
-
-def __monkeypatch_rep(module, module_name, module_path="omni.replicator.core.scripts"):
-    for name, obj in getmembers(module, predicate):
-        setattr(sys.modules[f"{module_path}.{module_name}"], name, obj)
-        print(f"Patched `{name}` to {module_path}.{module_name}.{name}")
-
-
-__monkeypatch_rep(modify, "modify")
+import time as _time
+
+_import_start = _time.perf_counter()
+
+try:
+    from ._impl import *
+except ModuleNotFoundError as _error:
+    # Outside of Kit only the modules that don't need it are usable, e.g. the offline framing preflight
+    if _error.name.split(".")[0] not in ("carb", "omni"):
+        raise
+
+from ._lazy import apply_patches as _apply_patches
+from ._lazy import import_module as _import_module
+from ._lazy import import_report, set_package_import_time as _set_package_import_time
+
+# Public names imported on first use: name -> (module, attribute or None for the module itself)
+_LAZY_ATTRIBUTES = {
+    "modify": ("o.replicator.addons.scripts.modify", None),
+    "bake_camera_params": ("o.replicator.addons.scripts.baking", "bake_camera_params"),
+    "cull_targets": ("o.replicator.addons.scripts.culling", "cull_targets"),
+    "batch_graph_edits": ("o.replicator.addons.scripts.graph", "batch_graph_edits"),
+    "FocalLengthPlan": ("o.replicator.addons.scripts.planning", "FocalLengthPlan"),
+    "compute_visibility": ("o.replicator.addons.scripts.occlusion", "compute_visibility"),
+    "plan_focal_lengths": ("o.replicator.addons.scripts.planning", "plan_focal_lengths"),
+    "run_preflight": ("o.replicator.addons.scripts.preflight", "run_preflight"),
+    "FramingRecording": ("o.replicator.addons.scripts.recording", "FramingRecording"),
+    "flush_recordings": ("o.replicator.addons.scripts.recording", "flush_recordings"),
+    "TargetQuery": ("o.replicator.addons.scripts.query", "TargetQuery"),
+    "dump_stats": ("o.replicator.addons.scripts.stats", "dump_stats"),
+    "get_stats": ("o.replicator.addons.scripts.stats", "get_stats"),
+    "reset_stats": ("o.replicator.addons.scripts.stats", "reset_stats"),
+    "flush_attribute_stores": ("o.replicator.addons.scripts.stores", "flush_attribute_stores"),
+    "register_attribute_store": ("o.replicator.addons.scripts.stores", "register_attribute_store"),
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module_name, attribute = _LAZY_ATTRIBUTES[name]
+    value = _import_module(module_name)
+    if attribute is not None:
+        value = getattr(value, attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+# Patch our modify functions into `omni.replicator.core.scripts.modify`
+_apply_patches()
+
+_set_package_import_time(_time.perf_counter() - _import_start)
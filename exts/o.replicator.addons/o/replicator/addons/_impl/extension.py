@@ -10,6 +10,8 @@
 """
 Support required by the Carbonite extension loader
 """
+import sys
+
 import carb.settings
 import omni.ext
 
@@ -33,4 +35,10 @@ class PublicExtension(omni.ext.IExt):
 
     def on_shutdown(self):
         """Shutting down this part of the extension prepares it for hot reload"""
-        pass
+        # Imported with the nodes, importing it here would defeat the lazy imports
+        prefetch = sys.modules.get("o.replicator.addons.scripts.prefetch")
+        if prefetch is not None:
+            prefetch.shutdown()
+        recording = sys.modules.get("o.replicator.addons.scripts.recording")
+        if recording is not None:
+            recording.flush_recordings()
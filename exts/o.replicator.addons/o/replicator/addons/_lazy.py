@@ -0,0 +1,113 @@
+"""
+Lazy imports and the declarative registry of the Replicator patches.
+
+Importing ``o.replicator.addons`` only installs :class:`LazySymbol` proxies on the patched Replicator modules. The
+module defining a patched symbol is imported the first time one of its proxies is called or inspected, and the proxy
+then replaces itself with the real symbol.
+"""
+import importlib
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Replicator module patched -> (module defining the symbols, patched symbol names)
+PATCHES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "omni.replicator.core.scripts.modify": (
+        "o.replicator.addons.scripts.modify",
+        ("focus", "focus_pairs", "frame", "focus_plan", "check_visibility", "cull", "_focus_on"),
+    ),
+}
+
+PACKAGE = "o.replicator.addons"
+
+_load_times: Dict[str, float] = {}
+_patched: Dict[str, List[str]] = {}
+_package_import_time: Optional[float] = None
+
+
+def import_module(module_name: str):
+    """Import ``module_name``, recording how long the first import took."""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    _load_times[module_name] = time.perf_counter() - start
+    return module
+
+
+class LazySymbol:
+    """
+    Stand-in for ``name`` of ``module_name`` until it is first used.
+
+    Args:
+        module_name (str): The module defining the symbol.
+        name (str): The name of the symbol.
+        target (Any): The module the proxy is installed on, updated with the real symbol once it is resolved.
+    """
+
+    __slots__ = ("module_name", "name", "target", "_value")
+
+    def __init__(self, module_name: str, name: str, target: Any):
+        self.module_name = module_name
+        self.name = name
+        self.target = target
+        self._value = None
+
+    def resolve(self) -> Any:
+        if self._value is None:
+            self._value = getattr(import_module(self.module_name), self.name)
+            if getattr(self.target, self.name, None) is self:
+                setattr(self.target, self.name, self._value)
+        return self._value
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self.resolve(), attribute)
+
+    def __repr__(self):
+        return f"<lazy {self.module_name}.{self.name}>"
+
+
+def apply_patches(patches: Dict[str, Tuple[str, Tuple[str, ...]]] = PATCHES):
+    """Install the proxies of ``patches`` on the Replicator modules that can be imported."""
+    for target_name, (module_name, names) in patches.items():
+        try:
+            target = importlib.import_module(target_name)
+        except ImportError:
+            continue
+
+        for name in names:
+            if not isinstance(getattr(target, name, None), LazySymbol):
+                setattr(target, name, LazySymbol(module_name, name, target))
+        _patched[target_name] = list(names)
+
+
+def set_package_import_time(seconds: float):
+    global _package_import_time
+    _package_import_time = seconds
+
+
+def import_report() -> Dict[str, Any]:
+    """
+    Report what importing ``o.replicator.addons`` cost and what has been loaded since.
+
+    Returns:
+        Dict[str, Any]: ``package_import_s`` the time spent importing the package, ``lazy_loads_s`` the time spent
+        in each module imported on first use, ``loaded_modules`` the package modules currently imported and
+        ``patches`` the patched symbols of each Replicator module, with whether they are resolved yet.
+    """
+    patches = {}
+    for target_name, names in _patched.items():
+        target = sys.modules.get(target_name)
+        patches[target_name] = {name: not isinstance(getattr(target, name, None), LazySymbol) for name in names}
+
+    return {
+        "package_import_s": _package_import_time,
+        "lazy_loads_s": dict(_load_times),
+        "loaded_modules": sorted(name for name in sys.modules if name.startswith(f"{PACKAGE}.")),
+        "patches": patches,
+    }
@@ -0,0 +1,31 @@
+"""
+Pure NumPy framing helpers, importable without Kit.
+"""
+from .coverage import CoverageSolution, box_corners, solve_coverage
+from .culling import DEFAULT_CLIPPING_RANGE, boxes_in_frustums, frustum_planes
+from .engine import (
+    APERTURE_UNIT,
+    CONFORM_CROP,
+    CONFORM_FIT,
+    CONFORM_HORIZONTAL,
+    CONFORM_NONE,
+    CONFORM_VERTICAL,
+    FALLBACK_HALF_EXTENT,
+    FOCAL_LENGTH_UNIT,
+    FramingSolution,
+    conform_code,
+    empty_bounds,
+    focal_lengths_from_radius,
+    frame_bounds,
+    is_empty,
+    look_at_rotations,
+    look_at_transforms,
+    orthonormal_rotations,
+    pad_segments,
+    segment_bounds,
+    solve_focal_lengths,
+    transform_bounds,
+    union_bounds,
+)
+from .instancer import instance_world_bounds, select_instances
+from .occlusion import BoxHierarchy, box_samples, morton_codes, segment_hits
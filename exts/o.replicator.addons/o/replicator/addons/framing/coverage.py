@@ -0,0 +1,132 @@
+"""
+Closed-form focal length solve for a requested screen coverage.
+
+The 8 corners of every target box are projected through each camera. On the film, the projected box of the targets
+scales linearly with the focal length of a perspective camera, and inversely with the aperture scale of an
+orthographic one, so the coverage of the frame area is quadratic in a single zoom factor ``g`` and the range of
+``g`` meeting a coverage range is solved without iterating. The frame is the aperture rectangle of the camera, and
+``g`` is also bounded so that no corner leaves it, the targets are never clipped.
+"""
+
+from typing import NamedTuple, Union
+
+import numpy as np
+
+from .engine import APERTURE_UNIT, is_empty
+
+# Bit i of corner k selects the max of axis i
+_CORNER_BITS = (np.arange(8)[:, None] >> np.arange(3)) & 1 == 1
+
+
+class CoverageSolution(NamedTuple):
+    """Per-camera result of :func:`solve_coverage`, every field is an array of shape (C,)."""
+
+    focal_length: np.ndarray
+    horizontal_aperture: np.ndarray
+    vertical_aperture: np.ndarray
+    # The fraction of the frame area covered by the projected box of the targets, with the solved values
+    coverage: np.ndarray
+    # False where the targets were empty, behind the camera or can't cover the range without being clipped
+    valid: np.ndarray
+
+
+def box_corners(mins: np.ndarray, maxs: np.ndarray) -> np.ndarray:
+    """Return the 8 corners of boxes of shape (..., 3), shape (..., 8, 3)."""
+    mins = np.asarray(mins, dtype=np.float64)
+    maxs = np.asarray(maxs, dtype=np.float64)
+    return np.where(_CORNER_BITS, maxs[..., None, :], mins[..., None, :])
+
+
+def solve_coverage(
+    target_min: np.ndarray,
+    target_max: np.ndarray,
+    local_xforms: np.ndarray,
+    parent_xforms: np.ndarray,
+    horizontal_aperture: np.ndarray,
+    vertical_aperture: np.ndarray,
+    coverage_min: Union[float, np.ndarray],
+    coverage_max: Union[float, np.ndarray],
+    orthographic: Union[bool, np.ndarray] = False,
+) -> CoverageSolution:
+    """
+    Solve the focal length, or the apertures of orthographic cameras, covering a range of the frame area.
+
+    The solve aims at the middle of the range, clamped to the values that meet it without clipping the targets.
+
+    Args:
+        target_min (np.ndarray): Target box minimums. Shape (3,) for a single box, (T, 3) for target boxes shared by
+            every camera or (C, T, 3) for per-camera targets, padded with empty boxes.
+        target_max (np.ndarray): Target box maximums, same shape as ``target_min``.
+        local_xforms (np.ndarray): Local transforms of the cameras, shape (C, 4, 4) or (4, 4).
+        parent_xforms (np.ndarray): Parent to world transforms of the cameras, shape (C, 4, 4) or (4, 4).
+        horizontal_aperture (np.ndarray): Horizontal aperture, scalar or shape (C,).
+        vertical_aperture (np.ndarray): Vertical aperture, scalar or shape (C,).
+        coverage_min (Union[float, np.ndarray]): The smallest fraction of the frame area to cover, scalar or (C,).
+        coverage_max (Union[float, np.ndarray]): The largest fraction of the frame area to cover, scalar or (C,).
+        orthographic (Union[bool, np.ndarray], optional): Cameras using an orthographic projection. Defaults to False.
+
+    Returns:
+        CoverageSolution: One entry per camera. Orthographic cameras are framed by their apertures and get a NaN
+        focal length, cameras that are not ``valid`` get NaN values.
+    """
+    local_xforms = np.asarray(local_xforms, dtype=np.float64).reshape(-1, 4, 4)
+    parent_xforms = np.broadcast_to(np.asarray(parent_xforms, dtype=np.float64), local_xforms.shape)
+    count = local_xforms.shape[0]
+
+    def per_camera(value, dtype=np.float64):
+        return np.broadcast_to(np.asarray(value, dtype=dtype), (count,))
+
+    h_aperture = per_camera(horizontal_aperture)
+    v_aperture = per_camera(vertical_aperture)
+    coverage_min = per_camera(coverage_min)
+    coverage_max = per_camera(coverage_max)
+    orthographic = per_camera(orthographic, bool)
+
+    target_min = np.asarray(target_min, dtype=np.float64)
+    target_max = np.asarray(target_max, dtype=np.float64)
+    if target_min.ndim == 1:
+        target_min, target_max = target_min[None], target_max[None]
+    target_min = np.broadcast_to(target_min, (count,) + target_min.shape[-2:])
+    target_max = np.broadcast_to(target_max, target_min.shape)
+
+    # Corners of the boxes in the space of each camera, looking down -Z, shape (C, T, 8, 3)
+    empty = is_empty(target_min, target_max)
+    corners = box_corners(np.where(empty[..., None], 0.0, target_min), np.where(empty[..., None], 0.0, target_max))
+    views = np.linalg.inv(local_xforms @ parent_xforms)
+    corners = np.einsum("ctki,cij->ctkj", corners, views[:, :3, :3]) + views[:, None, None, 3, :3]
+    depth = -corners[..., 2]
+    used = np.broadcast_to(~empty[..., None], depth.shape)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Film coordinates at g = 1: x / depth for a focal length of 1, x in aperture units for an aperture scale of 1
+        scale = np.where(orthographic[:, None, None], 1.0 / APERTURE_UNIT, 1.0 / depth)
+        film_x = corners[..., 0] * scale
+        film_y = corners[..., 1] * scale
+        axes = (1, 2)
+        low_x, high_x = np.where(used, film_x, np.inf).min(axis=axes), np.where(used, film_x, -np.inf).max(axis=axes)
+        low_y, high_y = np.where(used, film_y, np.inf).min(axis=axes), np.where(used, film_y, -np.inf).max(axis=axes)
+
+        # Coverage is area * g^2, and the corners stay in the frame while g <= g_clip
+        area = (high_x - low_x) * (high_y - low_y) / (h_aperture * v_aperture)
+        reach_x = np.maximum(np.abs(low_x), np.abs(high_x))
+        reach_y = np.maximum(np.abs(low_y), np.abs(high_y))
+        g_clip = np.minimum(h_aperture / (2.0 * reach_x), v_aperture / (2.0 * reach_y))
+        g_low = np.sqrt(coverage_min / area)
+        g_high = np.minimum(np.sqrt(coverage_max / area), g_clip)
+        g = np.clip(np.sqrt((coverage_min + coverage_max) * 0.5 / area), g_low, g_high)
+
+        behind = np.any(used & (depth <= 0.0), axis=axes)
+        valid = ~np.all(empty, axis=-1) & ~behind & (g_low <= g_high) & np.isfinite(g) & (g > 0.0)
+        g = np.where(valid, g, np.nan)
+
+        focal_length = np.where(orthographic, np.nan, g)
+        h_aperture = np.where(orthographic, h_aperture / g, h_aperture)
+        v_aperture = np.where(orthographic, v_aperture / g, v_aperture)
+
+    return CoverageSolution(
+        focal_length=focal_length,
+        horizontal_aperture=h_aperture,
+        vertical_aperture=v_aperture,
+        coverage=area * g * g,
+        valid=valid,
+    )
@@ -0,0 +1,108 @@
+"""
+Vectorized view frustum culling of target boxes.
+
+Every camera gives 6 world space planes, the 4 sides of its aperture and its near and far clipping planes. A box is
+outside a frustum when its corner furthest along the inner normal of one plane is behind that plane, which is tested
+for all the boxes, planes and cameras at once. The test is conservative: a large box near a corner of the frustum can
+be kept while it lies outside of it, a box in view is never culled.
+"""
+
+from typing import Union
+
+import numpy as np
+
+from .engine import APERTURE_UNIT, FOCAL_LENGTH_UNIT, is_empty
+
+# Near and far distances of cameras without a clipping range, as authored by UsdGeom.Camera
+DEFAULT_CLIPPING_RANGE = (1.0, 1000000.0)
+
+
+def frustum_planes(
+    local_xforms: np.ndarray,
+    parent_xforms: np.ndarray,
+    focal_length: Union[float, np.ndarray],
+    horizontal_aperture: Union[float, np.ndarray],
+    vertical_aperture: Union[float, np.ndarray],
+    near: Union[float, np.ndarray] = DEFAULT_CLIPPING_RANGE[0],
+    far: Union[float, np.ndarray] = DEFAULT_CLIPPING_RANGE[1],
+    orthographic: Union[bool, np.ndarray] = False,
+) -> np.ndarray:
+    """
+    Return the world space planes bounding the view of each camera.
+
+    Args:
+        local_xforms (np.ndarray): Local transforms of the cameras, shape (C, 4, 4) or (4, 4).
+        parent_xforms (np.ndarray): Parent to world transforms of the cameras, shape (C, 4, 4) or (4, 4).
+        focal_length (Union[float, np.ndarray]): Focal length, scalar or shape (C,). Unused by orthographic cameras.
+        horizontal_aperture (Union[float, np.ndarray]): Horizontal aperture, scalar or shape (C,).
+        vertical_aperture (Union[float, np.ndarray]): Vertical aperture, scalar or shape (C,).
+        near (Union[float, np.ndarray], optional): Near clipping distance, scalar or shape (C,). Defaults to 1.
+        far (Union[float, np.ndarray], optional): Far clipping distance, scalar or shape (C,). Defaults to 1e6.
+        orthographic (Union[bool, np.ndarray], optional): Cameras using an orthographic projection. Defaults to False.
+
+    Returns:
+        np.ndarray: The (a, b, c, d) planes of each camera, shape (C, 6, 4). A point ``p`` is on the inner side of a
+        plane where ``a * p.x + b * p.y + c * p.z + d >= 0``.
+    """
+    local_xforms = np.asarray(local_xforms, dtype=np.float64).reshape(-1, 4, 4)
+    parent_xforms = np.broadcast_to(np.asarray(parent_xforms, dtype=np.float64), local_xforms.shape)
+    count = local_xforms.shape[0]
+
+    def per_camera(value, dtype=np.float64):
+        return np.broadcast_to(np.asarray(value, dtype=dtype), (count,))
+
+    focal_length = per_camera(focal_length)
+    orthographic = per_camera(orthographic, bool)
+    near, far = per_camera(near), per_camera(far)
+    half_width = per_camera(horizontal_aperture) * APERTURE_UNIT * 0.5
+    half_height = per_camera(vertical_aperture) * APERTURE_UNIT * 0.5
+
+    # Camera space planes, the camera looks down -Z. The sides of a perspective frustum go through the camera with
+    # a slope of half the aperture over the focal length, the sides of an orthographic one are parallel to the view
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope_x = np.where(orthographic, 0.0, half_width / (focal_length * FOCAL_LENGTH_UNIT))
+        slope_y = np.where(orthographic, 0.0, half_height / (focal_length * FOCAL_LENGTH_UNIT))
+    offset_x = np.where(orthographic, half_width, 0.0)
+    offset_y = np.where(orthographic, half_height, 0.0)
+    zeros, ones = np.zeros(count), np.ones(count)
+    planes = np.stack(
+        [
+            np.stack([ones, zeros, -slope_x, offset_x], axis=-1),
+            np.stack([-ones, zeros, -slope_x, offset_x], axis=-1),
+            np.stack([zeros, ones, -slope_y, offset_y], axis=-1),
+            np.stack([zeros, -ones, -slope_y, offset_y], axis=-1),
+            np.stack([zeros, zeros, -ones, -near], axis=-1),
+            np.stack([zeros, zeros, ones, far], axis=-1),
+        ],
+        axis=1,
+    )
+
+    # With row vectors, camera = world @ view, so a camera space plane is view @ plane in world space
+    views = np.linalg.inv(local_xforms @ parent_xforms)
+    return np.einsum("cij,cpj->cpi", views, planes)
+
+
+def boxes_in_frustums(mins: np.ndarray, maxs: np.ndarray, planes: np.ndarray) -> np.ndarray:
+    """
+    Test every box against every frustum.
+
+    Args:
+        mins (np.ndarray): Box minimums, shape (B, 3).
+        maxs (np.ndarray): Box maximums, shape (B, 3).
+        planes (np.ndarray): The planes of each frustum from :func:`frustum_planes`, shape (C, 6, 4).
+
+    Returns:
+        np.ndarray: True where a box may be in view of a camera, shape (C, B). Empty boxes are never in view.
+    """
+    mins = np.asarray(mins, dtype=np.float64).reshape(-1, 3)
+    maxs = np.asarray(maxs, dtype=np.float64).reshape(-1, 3)
+    planes = np.asarray(planes, dtype=np.float64).reshape(-1, 6, 4)
+    empty = is_empty(mins, maxs)
+    mins, maxs = np.where(empty[:, None], 0.0, mins), np.where(empty[:, None], 0.0, maxs)
+
+    # The corner furthest along a normal takes the max of the axes where it is positive and the min elsewhere
+    positive, negative = np.maximum(planes[..., :3], 0.0), np.minimum(planes[..., :3], 0.0)
+    inside = np.broadcast_to(~empty, (len(planes), len(mins))).copy()
+    for plane in range(planes.shape[1]):
+        inside &= positive[:, plane] @ maxs.T + negative[:, plane] @ mins.T + planes[:, plane, 3:] >= 0.0
+    return inside
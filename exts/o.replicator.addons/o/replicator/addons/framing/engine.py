@@ -0,0 +1,481 @@
+"""
+Vectorized framing solve behind the CalculateFocalLength node.
+
+Everything in this module works on plain NumPy arrays so that it can run (and be tested) without Kit.
+Matrices follow the Gf convention: row-major 4x4 matrices applied to row vectors, so the translation
+of ``m`` lives in ``m[3, :3]`` and a point is transformed with ``p @ m[:3, :3] + m[3, :3]``.
+
+Empty boxes are encoded like ``Gf.Range3d()``: a min that is greater than the max on at least one axis.
+"""
+
+from typing import NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+# Same values as Gf.Camera.APERTURE_UNIT and Gf.Camera.FOCAL_LENGTH_UNIT
+APERTURE_UNIT = 0.1
+FOCAL_LENGTH_UNIT = 0.1
+
+CONFORM_VERTICAL = 0
+CONFORM_HORIZONTAL = 1
+CONFORM_FIT = 2
+CONFORM_CROP = 3
+CONFORM_NONE = 4
+
+_CONFORM_NAMES = {
+    "vertical": CONFORM_VERTICAL,
+    "horizontal": CONFORM_HORIZONTAL,
+    "fit": CONFORM_FIT,
+    "crop": CONFORM_CROP,
+    "none": CONFORM_NONE,
+}
+
+# Box used in place of targets that have no extent (lights, empty xforms, ...)
+FALLBACK_HALF_EXTENT = 20.0
+
+
+class FramingSolution(NamedTuple):
+    """Per-camera result of :func:`solve_focal_lengths`, every field is an array of shape (C,)."""
+
+    focal_length: np.ndarray
+    horizontal_aperture: np.ndarray
+    vertical_aperture: np.ndarray
+    distance: np.ndarray
+    radius: np.ndarray
+    valid: np.ndarray
+
+
+def conform_code(conform: Optional[Union[int, str]]) -> int:
+    """
+    Convert a conform setting to one of the ``CONFORM_*`` codes.
+
+    Args:
+        conform (Union[int, str], optional): 0-3 or one of "vertical", "horizontal", "fit", "crop", "none".
+
+    Returns:
+        int: The conform code, unknown values map to ``CONFORM_NONE``.
+    """
+    if isinstance(conform, str):
+        return _CONFORM_NAMES.get(conform.lower(), CONFORM_NONE)
+    if conform in (CONFORM_VERTICAL, CONFORM_HORIZONTAL, CONFORM_FIT, CONFORM_CROP):
+        return int(conform)
+    return CONFORM_NONE
+
+
+def empty_bounds(count: Optional[int] = None):
+    """Return an empty box, or ``count`` empty boxes, as a (min, max) pair."""
+    shape = (3,) if count is None else (count, 3)
+    return np.full(shape, np.inf), np.full(shape, -np.inf)
+
+
+def is_empty(mins: np.ndarray, maxs: np.ndarray) -> np.ndarray:
+    """Return True for every box that is empty on at least one axis."""
+    return np.any(np.asarray(mins) > np.asarray(maxs), axis=-1)
+
+
+def union_bounds(mins: np.ndarray, maxs: np.ndarray, axis: int = -2):
+    """
+    Merge boxes along ``axis``, the equivalent of chaining ``Gf.Range3d.UnionWith``.
+
+    Args:
+        mins (np.ndarray): Box minimums, shape (..., N, 3).
+        maxs (np.ndarray): Box maximums, shape (..., N, 3).
+        axis (int, optional): The axis holding the boxes to merge. Defaults to -2.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The merged (min, max), empty if there was nothing to merge.
+    """
+    mins = np.asarray(mins, dtype=np.float64)
+    maxs = np.asarray(maxs, dtype=np.float64)
+    if mins.shape[axis] == 0:
+        shape = list(mins.shape)
+        del shape[axis]
+        return np.full(shape, np.inf), np.full(shape, -np.inf)
+
+    # Empty boxes must not contribute, whatever the values of their other axes are
+    empty = np.expand_dims(is_empty(mins, maxs), -1)
+    mins = np.where(empty, np.inf, mins)
+    maxs = np.where(empty, -np.inf, maxs)
+    return mins.min(axis=axis), maxs.max(axis=axis)
+
+
+def segment_bounds(mins: np.ndarray, maxs: np.ndarray, counts: Sequence[int]):
+    """
+    Merge consecutive runs of boxes, the first ``counts[0]`` boxes into one, the next ``counts[1]`` into another...
+
+    Args:
+        mins (np.ndarray): Box minimums, shape (N, 3).
+        maxs (np.ndarray): Box maximums, shape (N, 3).
+        counts (Sequence[int]): The length of each run, summing to N.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The merged (min, max) of each run, shape (len(counts), 3). Runs without boxes
+        or with empty boxes only are empty.
+    """
+    mins = np.asarray(mins, dtype=np.float64).reshape(-1, 3)
+    maxs = np.asarray(maxs, dtype=np.float64).reshape(-1, 3)
+    counts = np.asarray(counts, dtype=np.int64)
+    if counts.sum() != len(mins):
+        raise ValueError(f"The run lengths sum to {counts.sum()}, expected {len(mins)} boxes")
+
+    segment_mins, segment_maxs = empty_bounds(len(counts))
+    filled = counts > 0
+    if not filled.any():
+        return segment_mins, segment_maxs
+
+    empty = is_empty(mins, maxs)[:, None]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+    segment_mins[filled] = np.minimum.reduceat(np.where(empty, np.inf, mins), starts, axis=0)
+    segment_maxs[filled] = np.maximum.reduceat(np.where(empty, -np.inf, maxs), starts, axis=0)
+    return segment_mins, segment_maxs
+
+
+def pad_segments(mins: np.ndarray, maxs: np.ndarray, counts: Sequence[int]):
+    """
+    Split consecutive runs of boxes into rows padded with empty boxes, the rows :func:`segment_bounds` would merge.
+
+    Args:
+        mins (np.ndarray): Box minimums, shape (N, 3).
+        maxs (np.ndarray): Box maximums, shape (N, 3).
+        counts (Sequence[int]): The length of each run, summing to N.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The (min, max) of the boxes of each run, shape (len(counts), max(counts), 3).
+    """
+    mins = np.asarray(mins, dtype=np.float64).reshape(-1, 3)
+    maxs = np.asarray(maxs, dtype=np.float64).reshape(-1, 3)
+    counts = np.asarray(counts, dtype=np.int64)
+    if counts.sum() != len(mins):
+        raise ValueError(f"The run lengths sum to {counts.sum()}, expected {len(mins)} boxes")
+
+    width = int(counts.max()) if len(counts) else 0
+    padded_mins, padded_maxs = empty_bounds(len(counts) * width)
+    padded_mins, padded_maxs = padded_mins.reshape(len(counts), width, 3), padded_maxs.reshape(len(counts), width, 3)
+    runs = np.repeat(np.arange(len(counts)), counts)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    columns = np.arange(len(mins)) - np.repeat(starts, counts)
+    padded_mins[runs, columns] = mins
+    padded_maxs[runs, columns] = maxs
+    return padded_mins, padded_maxs
+
+
+def transform_bounds(mins: np.ndarray, maxs: np.ndarray, matrices: np.ndarray):
+    """
+    Transform boxes and return their axis aligned range, like ``Gf.BBox3d(range, matrix).ComputeAlignedRange()``.
+
+    Args:
+        mins (np.ndarray): Box minimums, shape (..., 3).
+        maxs (np.ndarray): Box maximums, shape (..., 3).
+        matrices (np.ndarray): Affine matrices broadcastable against the boxes, shape (..., 4, 4).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The aligned (min, max), empty boxes stay empty.
+    """
+    mins = np.asarray(mins, dtype=np.float64)
+    maxs = np.asarray(maxs, dtype=np.float64)
+    matrices = np.asarray(matrices, dtype=np.float64)
+
+    empty = np.expand_dims(is_empty(mins, maxs), -1)
+    with np.errstate(invalid="ignore"):
+        center = np.where(empty, 0.0, (mins + maxs) * 0.5)
+        half = np.where(empty, 0.0, (maxs - mins) * 0.5)
+
+    linear = matrices[..., :3, :3]
+    new_center = np.einsum("...i,...ij->...j", center, linear) + matrices[..., 3, :3]
+    new_half = np.einsum("...i,...ij->...j", half, np.abs(linear))
+
+    return np.where(empty, np.inf, new_center - new_half), np.where(empty, -np.inf, new_center + new_half)
+
+
+def orthonormal_rotations(matrices: np.ndarray) -> np.ndarray:
+    """
+    Extract the rotation of each matrix with scale and shear removed.
+
+    This is the polar decomposition of the upper 3x3 block, the matrix that
+    ``Gf.Matrix4d.GetOrthonormalized().ExtractRotationQuat()`` converges to.
+
+    Args:
+        matrices (np.ndarray): Transforms, shape (..., 4, 4).
+
+    Returns:
+        np.ndarray: Pure rotations, shape (..., 3, 3).
+    """
+    linear = np.asarray(matrices, dtype=np.float64)[..., :3, :3]
+    u, _, vt = np.linalg.svd(linear)
+    # Keep a proper rotation when the transform mirrors
+    flip = np.linalg.det(u) * np.linalg.det(vt) < 0
+    u[..., :, 2] = np.where(flip[..., None], -u[..., :, 2], u[..., :, 2])
+    return u @ vt
+
+
+def look_at_rotations(
+    eyes: np.ndarray,
+    targets: np.ndarray,
+    up: Union[Sequence[float], np.ndarray] = (0.0, 1.0, 0.0),
+) -> np.ndarray:
+    """
+    Compute the rotations that make cameras at ``eyes`` look at ``targets``.
+
+    USD cameras look down their -Z axis with +Y up, the rows of the returned matrices are the world space X, Y and Z
+    axes of each camera. When the view direction is parallel to ``up`` another up axis is used.
+
+    Args:
+        eyes (np.ndarray): Camera positions, shape (..., 3).
+        targets (np.ndarray): Points to look at, shape (..., 3).
+        up (Union[Sequence[float], np.ndarray], optional): The up axis. Defaults to +Y.
+
+    Returns:
+        np.ndarray: Rotations, shape (..., 3, 3).
+    """
+    eyes = np.asarray(eyes, dtype=np.float64)
+    targets = np.asarray(targets, dtype=np.float64)
+    up = np.broadcast_to(np.asarray(up, dtype=np.float64), np.broadcast(eyes, targets).shape)
+
+    z_axis = eyes - targets
+    length = np.linalg.norm(z_axis, axis=-1, keepdims=True)
+    z_axis = np.where(length > 0, z_axis / np.where(length > 0, length, 1.0), [0.0, 0.0, 1.0])
+
+    x_axis = np.cross(up, z_axis)
+    degenerate = np.linalg.norm(x_axis, axis=-1, keepdims=True) < 1e-9
+    # Swap the up axis for one that is not parallel to the view direction
+    fallback_up = np.where(np.abs(z_axis[..., 1:2]) < 0.9, [0.0, 1.0, 0.0], [1.0, 0.0, 0.0])
+    x_axis = np.where(degenerate, np.cross(fallback_up, z_axis), x_axis)
+    x_axis /= np.linalg.norm(x_axis, axis=-1, keepdims=True)
+
+    y_axis = np.cross(z_axis, x_axis)
+    return np.stack([x_axis, y_axis, z_axis], axis=-2)
+
+
+def look_at_transforms(
+    local_xforms: np.ndarray,
+    parent_xforms: np.ndarray,
+    targets: np.ndarray,
+    up: Union[Sequence[float], np.ndarray] = (0.0, 1.0, 0.0),
+    positions: Optional[np.ndarray] = None,
+):
+    """
+    Re-orient local transforms so that they look at ``targets``, keeping their local translation and scale.
+
+    Args:
+        local_xforms (np.ndarray): Local transforms, shape (C, 4, 4).
+        parent_xforms (np.ndarray): Parent to world transforms, shape (C, 4, 4).
+        targets (np.ndarray): World space points to look at, shape (3,) or (C, 3).
+        up (Union[Sequence[float], np.ndarray], optional): The world up axis. Defaults to +Y.
+        positions (np.ndarray, optional): New local translations, shape (C, 3). Defaults to the current ones.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The new local transforms (C, 4, 4) and their rotations (C, 3, 3).
+    """
+    local_xforms = np.array(local_xforms, dtype=np.float64).reshape(-1, 4, 4)
+    parent_xforms = np.broadcast_to(np.asarray(parent_xforms, dtype=np.float64), local_xforms.shape)
+    if positions is not None:
+        local_xforms[:, 3, :3] = positions
+
+    eyes = np.einsum("...i,...ij->...j", local_xforms[:, 3, :3], parent_xforms[:, :3, :3]) + parent_xforms[:, 3, :3]
+    world_xforms = np.tile(np.eye(4), (len(local_xforms), 1, 1))
+    world_xforms[:, :3, :3] = look_at_rotations(eyes, targets, up)
+    world_xforms[:, 3, :3] = eyes
+
+    # Bring the rotation to the parent space
+    rotations = orthonormal_rotations(world_xforms @ np.linalg.inv(parent_xforms))
+    scales = np.linalg.norm(local_xforms[:, :3, :3], axis=-1)
+    local_xforms[:, :3, :3] = scales[:, :, None] * rotations
+    return local_xforms, rotations
+
+
+def frame_bounds(
+    target_min: np.ndarray,
+    target_max: np.ndarray,
+    local_xforms: np.ndarray,
+    parent_xforms: np.ndarray,
+    zoom: Union[float, np.ndarray] = 1.0,
+):
+    """
+    Compute the distance to the targets and the radius to frame for each camera.
+
+    The target box is oriented to the camera around its midpoint, moved to the parent space of the camera,
+    and framed against its bounding sphere scaled by ``zoom``.
+
+    Args:
+        target_min (np.ndarray): World space minimum of the targets, shape (3,) or (C, 3).
+        target_max (np.ndarray): World space maximum of the targets, shape (3,) or (C, 3).
+        local_xforms (np.ndarray): Local transforms of the cameras, shape (C, 4, 4).
+        parent_xforms (np.ndarray): Parent to world transforms of the cameras, shape (C, 4, 4).
+        zoom (Union[float, np.ndarray], optional): Zoom factor, scalar or shape (C,). Defaults to 1.0.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The distance and radius, both of shape (C,).
+    """
+    target_min = np.asarray(target_min, dtype=np.float64)
+    target_max = np.asarray(target_max, dtype=np.float64)
+    local_xforms = np.asarray(local_xforms, dtype=np.float64)
+    parent_xforms = np.asarray(parent_xforms, dtype=np.float64)
+
+    # Orient the aabox to the camera, about its midpoint
+    rotations = orthonormal_rotations(local_xforms)
+    empty = np.expand_dims(is_empty(target_min, target_max), -1)
+    with np.errstate(invalid="ignore"):
+        center = (target_min + target_max) * 0.5
+        half = (target_max - target_min) * 0.5
+    half = np.einsum("...i,...ij->...j", half, np.abs(rotations))
+
+    # Compute where to move in the parent space
+    oriented_min = np.where(empty, np.inf, center - half)
+    oriented_max = np.where(empty, -np.inf, center + half)
+    parent_min, parent_max = transform_bounds(oriented_min, oriented_max, np.linalg.inv(parent_xforms))
+
+    with np.errstate(invalid="ignore"):
+        # Target is in parent-space (just like the camera / object we're moving)
+        target = (parent_min + parent_max) * 0.5
+        distance = np.linalg.norm(local_xforms[..., 3, :3] - target, axis=-1)
+
+        # Frame against the aabox's bounding sphere
+        radius = np.linalg.norm(parent_max - parent_min, axis=-1) * zoom
+
+    return distance, radius
+
+
+def focal_lengths_from_radius(
+    distance: np.ndarray,
+    radius: np.ndarray,
+    horizontal_aperture: np.ndarray,
+    vertical_aperture: np.ndarray,
+    use_horizontal_fov: Optional[Union[bool, np.ndarray]] = None,
+    conform: Union[int, str, np.ndarray] = CONFORM_FIT,
+    aspect_ratio: Union[float, np.ndarray] = 1.0,
+    orthographic: Union[bool, np.ndarray] = False,
+):
+    """
+    Vectorized version of the focal length solve for a bounding sphere of ``radius`` at ``distance``.
+
+    Args:
+        distance (np.ndarray): Distance from each camera to the targets.
+        radius (np.ndarray): Radius of the sphere to fit.
+        horizontal_aperture (np.ndarray): Horizontal aperture of each camera.
+        vertical_aperture (np.ndarray): Vertical aperture of each camera.
+        use_horizontal_fov (Union[bool, np.ndarray], optional): Whether to fit the horizontal field of view.
+            None, or -1 in an array, lets ``conform`` decide. Defaults to None.
+        conform (Union[int, str, np.ndarray], optional): ``CONFORM_*`` code(s) or name. Defaults to CONFORM_FIT.
+        aspect_ratio (Union[float, np.ndarray], optional): The aspect ratio of the cameras. Defaults to 1.0.
+        orthographic (Union[bool, np.ndarray], optional): Cameras using an orthographic projection. Defaults to False.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: The focal lengths and the (horizontal, vertical) apertures.
+            Orthographic cameras are framed by their apertures and get a NaN focal length.
+    """
+    distance = np.asarray(distance, dtype=np.float64)
+    radius = np.asarray(radius, dtype=np.float64)
+    h_aperture = np.asarray(horizontal_aperture, dtype=np.float64)
+    v_aperture = np.asarray(vertical_aperture, dtype=np.float64)
+    aspect_ratio = np.asarray(aspect_ratio, dtype=np.float64)
+    orthographic = np.asarray(orthographic, dtype=bool)
+    if isinstance(conform, str):
+        conform = conform_code(conform)
+    conform = np.asarray(conform)
+    if use_horizontal_fov is None:
+        use_horizontal_fov = -1
+    use_horizontal_fov = np.asarray(use_horizontal_fov, dtype=np.int8)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h_fov_rad = np.arctan((h_aperture * APERTURE_UNIT) / (2.0 * FOCAL_LENGTH_UNIT))
+        v_fov_rad = np.arctan((v_aperture * APERTURE_UNIT) / (2.0 * FOCAL_LENGTH_UNIT))
+
+        is_fit = conform == CONFORM_FIT
+        fit_or_crop = ~(is_fit ^ (h_fov_rad / v_fov_rad > aspect_ratio))
+        conform_horizontal = np.where(
+            conform == CONFORM_VERTICAL,
+            False,
+            np.where(is_fit | (conform == CONFORM_CROP), fit_or_crop, True),
+        )
+        fit_horizontal = np.where(use_horizontal_fov >= 0, use_horizontal_fov > 0, conform_horizontal)
+
+        sensor_size = np.where(
+            fit_horizontal,
+            np.minimum(h_fov_rad, h_fov_rad / aspect_ratio),
+            np.minimum(v_fov_rad * aspect_ratio, v_fov_rad),
+        )
+
+        focal_length = np.where((distance == 0) | (radius == 0), 0.0, sensor_size * (distance / radius))
+
+        new_h_aperture = (np.maximum(0.001, radius) / APERTURE_UNIT) * 2.0
+        new_v_aperture = v_aperture * np.where(h_aperture != 0, new_h_aperture / h_aperture, new_h_aperture)
+
+    focal_length = np.where(orthographic, np.nan, focal_length)
+    h_aperture = np.where(orthographic, new_h_aperture, h_aperture)
+    v_aperture = np.where(orthographic, new_v_aperture, v_aperture)
+    return focal_length, h_aperture, v_aperture
+
+
+def solve_focal_lengths(
+    target_min: np.ndarray,
+    target_max: np.ndarray,
+    local_xforms: np.ndarray,
+    parent_xforms: np.ndarray,
+    horizontal_aperture: np.ndarray,
+    vertical_aperture: np.ndarray,
+    zoom: Union[float, np.ndarray] = 1.0,
+    use_horizontal_fov: Optional[Union[bool, np.ndarray]] = None,
+    conform: Union[int, str, Sequence[int], np.ndarray] = CONFORM_FIT,
+    aspect_ratio: Union[float, np.ndarray] = 1.0,
+    orthographic: Union[bool, np.ndarray] = False,
+) -> FramingSolution:
+    """
+    Solve the focal length of every camera in one batched call.
+
+    Args:
+        target_min (np.ndarray): Target box minimums. Shape (3,) for a single box, (T, 3) for target boxes shared by
+            every camera or (C, T, 3) for per-camera targets. Target boxes are merged before framing.
+        target_max (np.ndarray): Target box maximums, same shape as ``target_min``.
+        local_xforms (np.ndarray): Local transforms of the cameras, shape (C, 4, 4) or (4, 4).
+        parent_xforms (np.ndarray): Parent to world transforms of the cameras, shape (C, 4, 4) or (4, 4).
+        horizontal_aperture (np.ndarray): Horizontal aperture, scalar or shape (C,).
+        vertical_aperture (np.ndarray): Vertical aperture, scalar or shape (C,).
+        zoom (Union[float, np.ndarray], optional): Zoom factor, scalar or shape (C,). Defaults to 1.0.
+        use_horizontal_fov (Union[bool, np.ndarray], optional): See :func:`focal_lengths_from_radius`.
+        conform (Union[int, str, np.ndarray], optional): See :func:`focal_lengths_from_radius`.
+        aspect_ratio (Union[float, np.ndarray], optional): The aspect ratio of the cameras. Defaults to 1.0.
+        orthographic (Union[bool, np.ndarray], optional): Cameras using an orthographic projection. Defaults to False.
+
+    Returns:
+        FramingSolution: One entry per camera, ``valid`` is False where the targets were empty.
+    """
+    local_xforms = np.asarray(local_xforms, dtype=np.float64).reshape(-1, 4, 4)
+    parent_xforms = np.broadcast_to(np.asarray(parent_xforms, dtype=np.float64), local_xforms.shape)
+    count = local_xforms.shape[0]
+
+    target_min = np.asarray(target_min, dtype=np.float64)
+    target_max = np.asarray(target_max, dtype=np.float64)
+    if target_min.ndim > 1:
+        target_min, target_max = union_bounds(target_min, target_max)
+    target_min = np.broadcast_to(target_min, (count, 3))
+    target_max = np.broadcast_to(target_max, (count, 3))
+
+    if not isinstance(conform, (int, str, type(None))):
+        conform = np.array([conform_code(c) for c in conform])
+    elif isinstance(conform, str) or conform is None:
+        conform = conform_code(conform)
+
+    def per_camera(value, dtype=np.float64):
+        return np.broadcast_to(np.asarray(value, dtype=dtype), (count,))
+
+    distance, radius = frame_bounds(target_min, target_max, local_xforms, parent_xforms, per_camera(zoom))
+    focal_length, h_aperture, v_aperture = focal_lengths_from_radius(
+        distance,
+        radius,
+        per_camera(horizontal_aperture),
+        per_camera(vertical_aperture),
+        per_camera(-1 if use_horizontal_fov is None else use_horizontal_fov, np.int8),
+        per_camera(conform, np.int64),
+        per_camera(aspect_ratio),
+        per_camera(orthographic, bool),
+    )
+
+    valid = ~is_empty(target_min, target_max)
+    return FramingSolution(
+        focal_length=np.where(valid, focal_length, np.nan),
+        horizontal_aperture=h_aperture,
+        vertical_aperture=v_aperture,
+        distance=distance,
+        radius=radius,
+        valid=valid,
+    )
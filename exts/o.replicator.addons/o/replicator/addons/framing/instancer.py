@@ -0,0 +1,88 @@
+"""
+Vectorized bounds of ``UsdGeom.PointInstancer`` instances.
+
+The boxes of the selected instances are computed from the prototype boxes and the instance transform arrays in one
+pass, without any per-instance prim. Matrices follow the Gf row-vector convention of :mod:`.engine`.
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from .engine import empty_bounds, transform_bounds
+
+
+def select_instances(
+    num_instances: int,
+    indices: Optional[Sequence[int]] = None,
+    mask: Optional[Sequence[bool]] = None,
+) -> np.ndarray:
+    """
+    Return the valid, active and unique instance indices of a selection.
+
+    Args:
+        num_instances (int): The number of instances of the instancer.
+        indices (Sequence[int], optional): The selected instance indices, all of them if None. Out of range indices
+            are ignored.
+        mask (Sequence[bool], optional): ``PointInstancer.ComputeMaskAtTime``, False for inactive instances. An
+            empty mask keeps every instance.
+
+    Returns:
+        np.ndarray: The selected indices, sorted.
+    """
+    if indices is None:
+        selected = np.arange(num_instances)
+    else:
+        selected = np.unique(np.asarray(indices, dtype=np.int64))
+        selected = selected[(selected >= 0) & (selected < num_instances)]
+
+    if mask is not None and len(mask) == num_instances:
+        selected = selected[np.asarray(mask, dtype=bool)[selected]]
+
+    return selected
+
+
+def instance_world_bounds(
+    proto_mins: np.ndarray,
+    proto_maxs: np.ndarray,
+    proto_indices: np.ndarray,
+    instance_xforms: np.ndarray,
+    instancer_xform: np.ndarray,
+    indices: Optional[Sequence[int]] = None,
+    mask: Optional[Sequence[bool]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the world space box of every selected instance.
+
+    Args:
+        proto_mins (np.ndarray): The box minimum of each prototype in its own space, shape (P, 3).
+        proto_maxs (np.ndarray): The box maximum of each prototype in its own space, shape (P, 3).
+        proto_indices (np.ndarray): The prototype of each instance, shape (I,).
+        instance_xforms (np.ndarray): The instance to instancer transforms, prototype transform included,
+            shape (I, 4, 4).
+        instancer_xform (np.ndarray): The instancer local to world transform, shape (4, 4).
+        indices (Sequence[int], optional): The selected instances, all of them if None.
+        mask (Sequence[bool], optional): The instance mask, inactive instances are skipped.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The box minimums and maximums of the selected instances, shape (K, 3).
+        Instances with an invalid prototype index get an empty box.
+    """
+    proto_mins = np.asarray(proto_mins, dtype=np.float64).reshape(-1, 3)
+    proto_maxs = np.asarray(proto_maxs, dtype=np.float64).reshape(-1, 3)
+    proto_indices = np.asarray(proto_indices, dtype=np.int64)
+    instance_xforms = np.asarray(instance_xforms, dtype=np.float64).reshape(-1, 4, 4)
+
+    num_instances = min(len(proto_indices), len(instance_xforms))
+    selected = select_instances(num_instances, indices, mask)
+    if not len(selected):
+        return empty_bounds(0)
+
+    instance_protos = proto_indices[selected]
+    valid = (instance_protos >= 0) & (instance_protos < len(proto_mins))
+
+    mins, maxs = empty_bounds(len(selected))
+    protos = instance_protos[valid]
+    matrices = instance_xforms[selected[valid]] @ np.asarray(instancer_xform, dtype=np.float64)
+    mins[valid], maxs[valid] = transform_bounds(proto_mins[protos], proto_maxs[protos], matrices)
+    return mins, maxs
@@ -0,0 +1,220 @@
+"""
+Vectorized occlusion tests of rays against a bounding volume hierarchy of axis aligned boxes.
+
+The hierarchy is implicit: the boxes are sorted along a Morton curve of their centers, grouped in leaves of
+``leaf_size`` consecutive boxes, and the leaves are the bottom level of a complete binary tree stored as one
+(min, max) array pair per level. Building it is a sort and a few reductions, refitting moved boxes only recomputes
+their leaves and the ancestors of these leaves, and rays are traversed in batches, one level at a time.
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .engine import empty_bounds, is_empty
+
+# Bits per axis of the Morton codes
+MORTON_BITS = 10
+
+# Rays traversed together, bounds the memory of the (ray, node) pairs of a level
+RAY_BATCH = 4096
+
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    # Interleave two zero bits after each of the MORTON_BITS low bits
+    values = values.astype(np.uint64) & 0x3FF
+    values = (values | (values << 16)) & 0x030000FF
+    values = (values | (values << 8)) & 0x0300F00F
+    values = (values | (values << 4)) & 0x030C30C3
+    values = (values | (values << 2)) & 0x09249249
+    return values
+
+
+def morton_codes(points: np.ndarray) -> np.ndarray:
+    """Return the 30 bit Morton code of each point of shape (N, 3) in the box of all the points."""
+    points = np.asarray(points, dtype=np.float64)
+    if not len(points):
+        return np.zeros(0, dtype=np.uint64)
+
+    low, high = points.min(axis=0), points.max(axis=0)
+    scale = np.where(high > low, ((1 << MORTON_BITS) - 1) / np.where(high > low, high - low, 1.0), 0.0)
+    cells = ((points - low) * scale).astype(np.int64)
+    return (_spread_bits(cells[:, 0]) << 2) | (_spread_bits(cells[:, 1]) << 1) | _spread_bits(cells[:, 2])
+
+
+def segment_hits(
+    origins: np.ndarray, ends: np.ndarray, mins: np.ndarray, maxs: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Intersect segments with boxes, pairwise.
+
+    Args:
+        origins (np.ndarray): Segment origins, shape (N, 3).
+        ends (np.ndarray): Segment ends, shape (N, 3).
+        mins (np.ndarray): Box minimums, shape (N, 3).
+        maxs (np.ndarray): Box maximums, shape (N, 3).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The entry and exit parameters of the line of each segment through its box,
+        0 at the origin and 1 at the end. The line misses the box where the entry is greater than the exit, and
+        every empty box.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inverse = 1.0 / (ends - origins)
+        t1 = (mins - origins) * inverse
+        t2 = (maxs - origins) * inverse
+        # fmin and fmax skip the NaN of an origin on a slab of a segment parallel to it
+        entry = np.fmin(t1, t2).max(axis=-1)
+        exit_ = np.fmax(t1, t2).min(axis=-1)
+    # The slabs of an empty box are inverted and span every line, nothing enters it
+    entry[is_empty(mins, maxs)] = np.inf
+    return entry, exit_
+
+
+class BoxHierarchy:
+    """
+    An implicit bounding volume hierarchy of axis aligned boxes.
+
+    Args:
+        mins (np.ndarray): Box minimums, shape (N, 3). Empty boxes never occlude.
+        maxs (np.ndarray): Box maximums, shape (N, 3).
+        leaf_size (int, optional): The boxes per leaf. Defaults to 8.
+    """
+
+    def __init__(self, mins: np.ndarray, maxs: np.ndarray, leaf_size: int = 8):
+        mins = np.asarray(mins, dtype=np.float64).reshape(-1, 3)
+        maxs = np.asarray(maxs, dtype=np.float64).reshape(-1, 3)
+        self.leaf_size = leaf_size
+        self.count = len(mins)
+
+        empty = is_empty(mins, maxs)
+        centers = np.zeros_like(mins)
+        centers[~empty] = (mins[~empty] + maxs[~empty]) * 0.5
+        codes = morton_codes(centers)
+        # Empty boxes are sorted last
+        codes[empty] = np.iinfo(np.uint64).max
+        # Box index of each slot, and slot of each box
+        self.order = np.argsort(codes, kind="stable")
+        self.slots = np.empty(self.count, dtype=np.int64)
+        self.slots[self.order] = np.arange(self.count)
+
+        leaves = max(1, -(-self.count // leaf_size))
+        self.depth = int(np.ceil(np.log2(leaves))) if leaves > 1 else 0
+        capacity = (1 << self.depth) * leaf_size
+        self.box_mins, self.box_maxs = empty_bounds(capacity)
+        self.box_mins[: self.count], self.box_maxs[: self.count] = mins[self.order], maxs[self.order]
+        self.box_mins[: self.count][empty[self.order]] = np.inf
+        self.box_maxs[: self.count][empty[self.order]] = -np.inf
+
+        # Level 0 is the root, level ``depth`` the leaves
+        self.levels: List[Tuple[np.ndarray, np.ndarray]] = [None] * (self.depth + 1)
+        self.levels[self.depth] = (
+            self.box_mins.reshape(-1, leaf_size, 3).min(axis=1),
+            self.box_maxs.reshape(-1, leaf_size, 3).max(axis=1),
+        )
+        for level in range(self.depth - 1, -1, -1):
+            child_mins, child_maxs = self.levels[level + 1]
+            self.levels[level] = (child_mins.reshape(-1, 2, 3).min(axis=1), child_maxs.reshape(-1, 2, 3).max(axis=1))
+
+    def __len__(self):
+        return self.count
+
+    def refit(self, indices: np.ndarray, mins: np.ndarray, maxs: np.ndarray):
+        """
+        Move the boxes ``indices`` and refit their leaves and the ancestors of these leaves.
+
+        Args:
+            indices (np.ndarray): The indices of the boxes, as given to the constructor, shape (K,).
+            mins (np.ndarray): The new minimums, shape (K, 3).
+            maxs (np.ndarray): The new maximums, shape (K, 3).
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        if not len(indices):
+            return
+
+        mins = np.asarray(mins, dtype=np.float64).reshape(-1, 3)
+        maxs = np.asarray(maxs, dtype=np.float64).reshape(-1, 3)
+        empty = is_empty(mins, maxs)[:, None]
+        slots = self.slots[indices]
+        self.box_mins[slots] = np.where(empty, np.inf, mins)
+        self.box_maxs[slots] = np.where(empty, -np.inf, maxs)
+
+        nodes = np.unique(slots // self.leaf_size)
+        level_mins, level_maxs = self.levels[self.depth]
+        level_mins[nodes] = self.box_mins.reshape(-1, self.leaf_size, 3)[nodes].min(axis=1)
+        level_maxs[nodes] = self.box_maxs.reshape(-1, self.leaf_size, 3)[nodes].max(axis=1)
+        for level in range(self.depth - 1, -1, -1):
+            nodes = np.unique(nodes // 2)
+            child_mins, child_maxs = self.levels[level + 1]
+            level_mins, level_maxs = self.levels[level]
+            level_mins[nodes] = np.minimum(child_mins[nodes * 2], child_mins[nodes * 2 + 1])
+            level_maxs[nodes] = np.maximum(child_maxs[nodes * 2], child_maxs[nodes * 2 + 1])
+
+    def occluded(self, origins: np.ndarray, ends: np.ndarray, ignored: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Return whether each segment is blocked by a box.
+
+        A box blocks a segment when the segment enters and leaves it between its origin and its end. Boxes that
+        contain the origin or the end, such as a room around the camera or the floor under a target, don't block it.
+
+        Args:
+            origins (np.ndarray): Segment origins, shape (R, 3).
+            ends (np.ndarray): Segment ends, shape (R, 3).
+            ignored (np.ndarray, optional): True for the boxes that never block, shape (N,).
+
+        Returns:
+            np.ndarray: True for every blocked segment, shape (R,).
+        """
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+        blocked = np.zeros(len(origins), dtype=bool)
+        if not self.count:
+            return blocked
+
+        ignored_slots = None
+        if ignored is not None:
+            ignored_slots = np.ones(len(self.box_mins), dtype=bool)
+            ignored_slots[: self.count] = np.asarray(ignored, dtype=bool)[self.order]
+
+        for start in range(0, len(origins), RAY_BATCH):
+            rays = np.arange(start, min(start + RAY_BATCH, len(origins)))
+            nodes = np.zeros(len(rays), dtype=np.int64)
+            for level in range(self.depth + 1):
+                if level:
+                    rays, nodes = np.repeat(rays, 2), (np.repeat(nodes, 2) * 2 + np.tile([0, 1], len(nodes)))
+                level_mins, level_maxs = self.levels[level]
+                entry, exit_ = segment_hits(origins[rays], ends[rays], level_mins[nodes], level_maxs[nodes])
+                crossed = (entry <= exit_) & (exit_ >= 0.0) & (entry <= 1.0)
+                rays, nodes = rays[crossed], nodes[crossed]
+                if not len(rays):
+                    break
+            else:
+                slots = (nodes[:, None] * self.leaf_size + np.arange(self.leaf_size)).ravel()
+                rays = np.repeat(rays, self.leaf_size)
+                if ignored_slots is not None:
+                    kept = ~ignored_slots[slots]
+                    rays, slots = rays[kept], slots[kept]
+                entry, exit_ = segment_hits(origins[rays], ends[rays], self.box_mins[slots], self.box_maxs[slots])
+                blocked[rays[(entry > 0.0) & (entry <= exit_) & (exit_ < 1.0)]] = True
+
+        return blocked
+
+
+def box_samples(mins: np.ndarray, maxs: np.ndarray, samples: int = 3, shrink: float = 0.9) -> np.ndarray:
+    """
+    Return a grid of ``samples`` points per axis in each box, shrunk towards its center.
+
+    Args:
+        mins (np.ndarray): Box minimums, shape (B, 3).
+        maxs (np.ndarray): Box maximums, shape (B, 3).
+        samples (int, optional): The points per axis, 1 for the center only. Defaults to 3.
+        shrink (float, optional): The scale of the grid relative to the box. Defaults to 0.9.
+
+    Returns:
+        np.ndarray: The points, shape (B, samples ** 3, 3).
+    """
+    mins = np.asarray(mins, dtype=np.float64).reshape(-1, 3)
+    maxs = np.asarray(maxs, dtype=np.float64).reshape(-1, 3)
+    steps = np.linspace(-0.5, 0.5, samples) * shrink if samples > 1 else np.zeros(1)
+    grid = np.stack(np.meshgrid(steps, steps, steps, indexing="ij"), axis=-1).reshape(-1, 3)
+    return (mins + maxs)[:, None] * 0.5 + grid * (maxs - mins)[:, None]
@@ -0,0 +1,8 @@
+"""
+Alias of :mod:`o.replicator.addons.scripts.modify`, kept so ``import o.replicator.addons.modify`` still works.
+"""
+import sys
+
+from .scripts import modify as _modify
+
+sys.modules[__name__] = _modify
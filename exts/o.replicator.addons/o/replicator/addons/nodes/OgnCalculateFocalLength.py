@@ -8,37 +8,39 @@ import math
 
 import carb
 import omni.graph.core as og
-import omni.kit
 import omni.timeline
 import omni.usd
-from omni.replicator.core import utils
-
-from pxr import (
-    OmniAudioSchema,
-    Gf,
-    Tf,
-    Kind,
-    Sdf,
-    Sdr,
-    Trace,
-    Usd,
-    UsdGeom,
-    UsdLux,
-    UsdShade,
+from o.replicator.addons.framing import engine
+from o.replicator.addons.framing.coverage import solve_coverage
+from o.replicator.addons.scripts.bounds import (
+    BOUNDS_BACKEND_CONTEXT,
+    BOUNDS_BACKEND_USD,
+    UsdBoundsBackend,
+    compute_prim_transforms,
+    gather_world_bounds,
 )
+from o.replicator.addons.scripts.camera import CameraHandle, CameraHandleCache, get_conform_setting, resolve_camera_prim
+from o.replicator.addons.scripts.paths import normalize_paths, normalize_target_paths
+from o.replicator.addons.scripts.prefetch import STAGE_LOCK, FramingData, Prefetcher, gather_framing_data
+from o.replicator.addons.scripts.query import resolve_query
+from o.replicator.addons.scripts.recording import RECORD, RECORD_OFF, REPLAY, get_recorder, get_recording
+from o.replicator.addons.scripts.stats import get_node_stats
+from o.replicator.addons.scripts.stores import get_attribute_store
+from o.replicator.addons.scripts.tracking import TrackedPaths, get_change_tracker
 
+from pxr import Gf, Sdf, Usd
 
-from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
-def _get_camera_prim(camera_prim_path: str):
-    stage = omni.usd.get_context().get_stage()
-    camera = stage.GetPrimAtPath(str(camera_prim_path))
+_stats = get_node_stats("o.replicator.addons.CalculateFocalLength")
+
+# Prefetches in a row thrown away because other writers moved the cameras or targets, before prefetch is turned off
+MAX_INVALIDATED_PREFETCHES = 2
 
-    if camera.HasAttribute("replicatorXform"):
-        camera = camera.GetChildren()[0]
 
-    return camera
+def _get_camera_prim(camera_prim_path: str):
+    return resolve_camera_prim(omni.usd.get_context().get_stage(), camera_prim_path)
 
 
 def _get_time():
@@ -69,65 +71,32 @@ def calculate_focal_length_from_radius(
             - 3 or "crop": Crop the aperture to the aspect ratio.
 
     Returns:
-        float: The calculated focal length.
+        float: The calculated focal length, or the new (horizontal, vertical) apertures of an orthographic camera.
     """
     camera = _get_camera_prim(camera_path)
+    optics = CameraHandle(camera).read_optics(_get_time()) if camera else None
+    if optics is None:
+        return None
 
-    time = _get_time()
-
-    # h_fov_rad, v_fov_rad = self.__horizontal_fov, self.__horizontal_fov
-
-    if camera:
-        h_aperture = camera.GetAttribute("horizontalAperture")
-        v_aperture = camera.GetAttribute("verticalAperture")
-        projection = camera.GetAttribute("projection")
-
-        if h_aperture or v_aperture:
-            if h_aperture and not v_aperture:
-                v_aperture = h_aperture
-            elif v_aperture and not h_aperture:
-                h_aperture = v_aperture
-            h_aperture = h_aperture.Get(time)
-            v_aperture = v_aperture.Get(time)
-
-            if projection.Get(time) == "orthographic":
-                new_horz_ap = (max(0.001, radius) / Gf.Camera.APERTURE_UNIT) * 2.0
-                new_vert_ap = v_aperture * ((new_horz_ap / h_aperture) if h_aperture else new_horz_ap)
-                return (new_horz_ap, new_vert_ap)
-
-            h_fov_rad = math.atan((h_aperture * Gf.Camera.APERTURE_UNIT) / (2.0 * Gf.Camera.FOCAL_LENGTH_UNIT))
-            v_fov_rad = math.atan((v_aperture * Gf.Camera.APERTURE_UNIT) / (2.0 * Gf.Camera.FOCAL_LENGTH_UNIT))
-
-    def fit_horizontal():
-        if use_horizontal_fov is not None:
-            return use_horizontal_fov
-
-        if conform is None:
-            conform = carb.settings.get_settings().get("/app/hydra/aperture/conform")
-
-        if conform == 0 or conform == "vertical":
-            return False
-
-        is_fit = conform == 2 or conform == "fit"
-        if is_fit or (conform == 3 or conform == "crop"):
-            fov_aspect = h_fov_rad / v_fov_rad
-            return not (is_fit ^ (fov_aspect > aspect_ratio))
-
-        return True
+    h_aperture, v_aperture, orthographic = optics
+    if use_horizontal_fov is None and conform is None:
+        conform = get_conform_setting()
 
-    if fit_horizontal():
-        v_fov_rad = h_fov_rad / aspect_ratio
-    else:
-        h_fov_rad = v_fov_rad * aspect_ratio
+    focal_length, h_aperture, v_aperture = engine.focal_lengths_from_radius(
+        distance,
+        radius,
+        h_aperture,
+        v_aperture,
+        use_horizontal_fov,
+        engine.conform_code(conform),
+        aspect_ratio,
+        orthographic,
+    )
 
-    sensor_size = min(h_fov_rad, v_fov_rad)
+    if orthographic:
+        return (float(h_aperture), float(v_aperture))
 
-    if distance == 0 or radius == 0:
-        return 0
-
-    focal_length = sensor_size * (distance / radius)
-
-    return focal_length
+    return float(focal_length)
 
 
 def calculate_focal_length_from_distance(
@@ -168,144 +137,607 @@ def calculate_focal_length_from_distance(
     return focal_length
 
 
-def compute_local_transform(camera_path: str):
+def compute_local_transform(
+    camera_path: str,
+    backend: str = BOUNDS_BACKEND_CONTEXT,
+    camera: Optional[Usd.Prim] = None,
+):
     # stage = omni.usd.get_context().get_stage()
     # prim = stage.GetPrimAtPath(str(camera_path))
-    prim = _get_camera_prim(camera_path)
+    prim = camera if camera is not None else _get_camera_prim(camera_path)
 
     if not prim:
         carb.log_warn(f"Framing of UsdPrims failed, {camera_path} doesn't exist")
         return None, None, None
 
-    time = _get_time()
+    local_xform, parent_xform, world_xform = compute_prim_transforms(prim, _get_time(), backend)
+    if local_xform is None:
+        carb.log_warn(f"Framing of UsdPrims failed, {camera_path} isn't UsdGeom.Xformable or UsdGeom.Imageable")
+
+    return local_xform, parent_xform, world_xform
+
+
+def compute_target_bounds(
+    camera_path: Union[str, Sequence[str]],
+    target_paths: List[str],
+    use_cache: bool = False,
+    backend: str = BOUNDS_BACKEND_CONTEXT,
+    instance_indices: Optional[Sequence[int]] = None,
+):
+    """
+    Gather the world space box of every target, skipping the camera(s) themselves.
+
+    Targets without extent are given a box of +/- ``engine.FALLBACK_HALF_EXTENT`` around their world transform.
 
-    local_xform, world_xform = None, None
-    xformable = UsdGeom.Xformable(prim)
-    if xformable:
-        local_xform = xformable.GetLocalTransformation(time)
+    Args:
+        camera_path (Union[str, Sequence[str]]): The path to the camera prim, or the paths of all framing cameras.
+        target_paths (List[str]): The paths of the targets.
+        use_cache (bool, optional): Serve the boxes from the stage's notice-invalidated bounds cache.
+            Defaults to False.
+        backend (str, optional): "context" to compute the boxes through the ``omni.usd`` context, "usd" to compute
+            them with a shared ``UsdGeom.BBoxCache``. Defaults to "context".
+        instance_indices (Sequence[int], optional): Only bound these instances of the ``UsdGeom.PointInstancer``
+            targets. Defaults to None, instancers are bounded as a whole.
 
-    imageable = UsdGeom.Imageable(prim)
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The box minimums and maximums, both of shape (N, 3).
+    """
+    camera_paths = {str(camera_path)} if isinstance(camera_path, (str, Sdf.Path)) else set(map(str, camera_path))
+    paths = [str(prim_path) for prim_path in target_paths if str(prim_path) not in camera_paths]
+
+    stage = omni.usd.get_context().get_stage()
+    return gather_world_bounds(stage, _get_time(), paths, use_cache, backend, instance_indices)
 
-    if imageable:
-        parent_xform = imageable.ComputeParentToWorldTransform(time)
-        if not local_xform:
-            world_xform = imageable.ComputeLocalToWorldTransform(time)
-            local_xform = world_xform * parent_xform.GetInverse()
-        if not world_xform:
-            world_xform = parent_xform * local_xform
-        return local_xform, parent_xform, world_xform
 
-    carb.log_warn(f"Framing of UsdPrims failed, {camera_path} isn't UsdGeom.Xformable or UsdGeom.Imageable")
-    return None, None, None
+def compute_bounds(
+    camera_path: str,
+    target_paths: List[str],
+    use_cache: bool = False,
+    backend: str = BOUNDS_BACKEND_CONTEXT,
+    instance_indices: Optional[Sequence[int]] = None,
+):
+    # Only the top-level roots of the targets are bounded, their boxes already hold their descendants
+    target_paths = normalize_target_paths(target_paths, [camera_path])
+    aab_min, aab_max = engine.union_bounds(
+        *compute_target_bounds(camera_path, target_paths, use_cache, backend, instance_indices)
+    )
 
+    if engine.is_empty(aab_min, aab_max):
+        return Gf.Range3d()
 
-def compute_bounds(camera_path: str, target_paths: List[str]):
-    aabbox = Gf.Range3d()
-    usd_context = omni.usd.get_context()
+    return Gf.Range3d(Gf.Vec3d(*aab_min), Gf.Vec3d(*aab_max))
 
-    def add_to_range(prim_path):
-        aab_min, aab_max = usd_context.compute_path_world_bounding_box(str(prim_path))
 
-        in_range = Gf.Range3d(Gf.Vec3d(*aab_min), Gf.Vec3d(*aab_max))
+def _pair_targets(
+    camera_paths: Sequence[Union[str, Sdf.Path]],
+    target_paths: Sequence[Union[str, Sdf.Path]],
+    target_counts: Sequence[int],
+    target_indices: Optional[Sequence[int]] = None,
+) -> Tuple[List[str], List[int]]:
+    """
+    Split ``target_paths`` into the targets of each camera, normalized with :func:`normalize_paths` and
+    leaving the camera subtree out of its own targets.
 
-        if in_range.IsEmpty():
-            aa_range = Gf.Range3d(Gf.Vec3d(-20, -20, -20), Gf.Vec3d(20, 20, 20))
-            matrix = Gf.Matrix4d(*usd_context.compute_path_world_transform(str(prim_path)))
-            bbox = Gf.BBox3d(aa_range, matrix)
-            in_range = bbox.ComputeAlignedRange()
-            if in_range.IsEmpty():
-                pos = matrix.ExtractTranslation()
-                in_range.SetMin(pos - aa_range.GetMin())
-                in_range.SetMax(pos + aa_range.GetMax())
+    With ``target_indices``, the runs of ``target_counts`` are runs of indices into ``target_paths``, so several
+    pairs can share a target.
 
-        aabbox.UnionWith(in_range)
+    Returns:
+        Tuple[List[str], List[int]]: The target paths of all the pairs, in order, and the number of each pair.
+    """
+    paths, counts = [], []
+    start = 0
+    members = target_paths if target_indices is None else [target_paths[index] for index in target_indices]
+    for camera_path, count in zip(camera_paths, target_counts):
+        camera_path = str(camera_path)
+        pair = normalize_paths(members[start : start + count], [camera_path])
+        paths.extend(pair)
+        counts.append(len(pair))
+        start += count
+    return paths, counts
 
-    for prim_path in target_paths:
-        if prim_path != camera_path:
-            add_to_range(prim_path)
 
-    return aabbox
+def _prefetch_key(time: float, watch: TrackedPaths, instance_indices: Sequence[int]) -> tuple:
+    return time, watch, watch.generation, np.asarray(instance_indices, dtype=np.int64).tobytes()
+
+
+def _camera_values(cameras: Sequence[Optional[CameraHandle]], time: float) -> tuple:
+    """Return the optics and focal length of the valid ``cameras``, as compared by the solve fingerprint."""
+    return tuple((camera.read_optics(time), camera.focal_length.Get(time)) for camera in cameras if camera is not None)
+
+
+# Camera path, recorded values by attribute name and world transform of each camera of an evaluation
+RecordedRows = List[Tuple[str, Dict[str, float], np.ndarray]]
+
+
+def _record(record_path: str, frame: int, time: float, rows: RecordedRows):
+    recorder = get_recorder(record_path)
+    for camera_path, values, world_xform in rows:
+        recorder.record(frame, time, camera_path, values, world_xform)
+    _stats.count("recorded_frames")
+
+
+def _replayed_values(record_path: str, frame: int, cameras: Sequence[Optional[CameraHandle]]):
+    """Return the values recorded for ``frame`` on each camera, or None unless all of them were recorded."""
+    recording = get_recording(record_path)
+    replayed = []
+    for camera in cameras:
+        values = recording.lookup(str(camera.path), frame) if camera is not None else None
+        if values is None or "focalLength" not in values:
+            return None
+        replayed.append(values)
+    return replayed
+
+
+def _write_replayed(store, camera: CameraHandle, values: Dict[str, float], write_back: bool) -> int:
+    # Orthographic cameras had their apertures written, the others their focal length
+    if "horizontalAperture" in values:
+        written = (("horizontalAperture", camera.horizontal_aperture), ("verticalAperture", camera.vertical_aperture))
+    else:
+        written = (("focalLength", camera.focal_length),)
+
+    for name, attribute in written:
+        store.write(camera.path, name, values[name], attribute=attribute, write_back=write_back)
+    return len(written)
+
+
+class _InternalState:
+    """Per node instance state of OgnCalculateFocalLength."""
+
+    def __init__(self):
+        self.cameras = CameraHandleCache()
+        # The watch of the targets and the fingerprint of the inputs of the last solve, when skipUnchanged is set
+        self.targets: Optional[TrackedPaths] = None
+        self.fingerprint: Optional[tuple] = None
+        self.focal_lengths: List[float] = []
+        self.coverages: List[float] = []
+        self.satisfied: List[bool] = []
+        # The watch of the camera transforms and targets keying the prefetch of the next frame, when prefetch is set
+        self.watch: Optional[TrackedPaths] = None
+        self.prefetcher = Prefetcher()
+        # The caches of the prefetch jobs and the watch generation they are valid for
+        self.prefetch_backend: Optional[UsdBoundsBackend] = None
+        self.prefetch_generation: Optional[tuple] = None
+        # Whether the node already warned that prefetch is ignored without setFocalLength
+        self.prefetch_refused = False
+        # The watch and generation of the pending prefetch, and the pending prefetches invalidated in a row
+        self.prefetch_submitted: Optional[tuple] = None
+        self.prefetch_invalidated = 0
+        # Set once other writers invalidated MAX_INVALIDATED_PREFETCHES prefetches in a row
+        self.prefetch_disabled = False
+        # The evaluation index recorded or replayed, and the rows recorded for the last solve
+        self.frame = 0
+        self.recorded: RecordedRows = []
 
 
 class OgnCalculateFocalLength:
     """
     Set prim rotation and focal length to look at the target coordinates.
     This is a modified version of the focus command.
+
+    Every camera in ``inputs:prims`` is framed against the same targets, the target bounds are gathered once and
+    all the focal lengths are solved in one batch. With ``inputs:targetCounts``, each camera is instead paired with
+    its own run of ``inputs:targetPrim``, or of ``inputs:targetIndices`` into it when pairs share targets, and
+    ``inputs:zooms`` can give each pair its zoom: the bounds of all the pairs are still gathered in one pass and
+    solved in one batch, one node instance for any number of pairs.
+
+    With ``inputs:coverage`` set to a [min, max] range, the focal lengths are solved in closed form from the corners
+    of the target boxes projected through each camera, so that the targets cover that range of the frame area without
+    being clipped. Frames where a camera can't meet the range disable ``outputs:execOut``.
+
+    With ``inputs:skipUnchanged``, the inputs of each solve are fingerprinted: the camera transforms and optics by
+    value and the targets by the generation of their change tracker watch, and by the time code when their transforms
+    or extents are time-varying. A frame with the same fingerprint as the last solve reuses its focal lengths and
+    writes nothing, also at a new time code of a static scene.
+
+    With ``inputs:prefetch``, the camera transforms and target bounds of the time code ``inputs:prefetchTimeStep``
+    ahead are gathered on a worker thread once the focal lengths are written. The next evaluation at that time code
+    only solves and writes, unless the camera transforms or the targets changed in between. The jobs only exclude the
+    writers holding ``STAGE_LOCK``, so prefetch is ignored unless ``inputs:setFocalLength`` lets the node author the
+    focal lengths itself. When other writers, such as ``rep.modify.pose``, move the cameras or targets between
+    ``MAX_INVALIDATED_PREFETCHES`` frames in a row, prefetch is turned off with a warning instead of gathering every
+    frame twice.
+
+    With ``inputs:recordMode`` set to "record", the values written and the camera transforms of every evaluation are
+    appended to the recording in ``inputs:recordPath``. With "replay", the values recorded for the evaluation are
+    written instead of solving them.
     """
 
     @staticmethod
+    def internal_state():
+        return _InternalState()
+
+    @staticmethod
+    @_stats.timed
     def compute(db) -> bool:
-        camera_prim_path: Sequence[Union[str, Sdf.Path]] = db.inputs.prims
+        camera_prim_paths: Sequence[Union[str, Sdf.Path]] = db.inputs.prims
         target_prim_paths: Union[str, Sdf.Path] = db.inputs.targetPrim
+        target_query: str = db.inputs.targetQuery
+        target_counts: Sequence[int] = db.inputs.targetCounts
+        target_indices: Sequence[int] = db.inputs.targetIndices
         zoom: float = db.inputs.zoom
+        zooms: Sequence[float] = db.inputs.zooms
+        coverage_range: Sequence[float] = db.inputs.coverage
         set_focal_length: bool = db.inputs.setFocalLength
         use_horizontal_fov: bool = db.inputs.useHorizontalFov
         conform: Union[int, str] = db.inputs.conform
+        use_bounds_cache: bool = db.inputs.useBoundsCache
+        bounds_backend: str = db.inputs.boundsBackend
+        write_backend: str = db.inputs.writeBackend
+        write_back: bool = db.inputs.fabricWriteBack
+        instance_indices: Sequence[int] = db.inputs.instanceIndices
+        skip_unchanged: bool = db.inputs.skipUnchanged
+        prefetch: bool = db.inputs.prefetch
+        prefetch_time_step: float = db.inputs.prefetchTimeStep
+        record_mode: str = db.inputs.recordMode
+        record_path: str = db.inputs.recordPath
 
         def failed():
             db.outputs.execOut = og.ExecutionAttributeState.DISABLED
             return False
 
-        if len(camera_prim_path) == 0 or camera_prim_path is None:
+        if camera_prim_paths is None or len(camera_prim_paths) == 0:
             return failed()
 
-        if len(target_prim_paths) == 0:
+        if len(target_prim_paths) == 0 and not target_query:
             return failed()
 
-        camera_prim_path = camera_prim_path[0]
-
-        try:
-            local_xform, parent_xform, world_xform = compute_local_transform(camera_prim_path)
-
-            aabbox = compute_bounds(camera_prim_path, target_prim_paths)
-
-            if aabbox.IsEmpty():
-                carb.log_warn(f"Framing of UsdPrims {target_prim_paths} resulted in an empty bounding-box")
-                return failed()
+        paired = len(target_counts) > 0
+        indexed = len(target_indices) > 0
+        members = len(target_indices) if indexed else len(target_prim_paths)
+        if paired and (target_query or len(target_counts) != len(camera_prim_paths) or sum(target_counts) != members):
+            db.log_error(
+                f"FocusAt Error: targetCounts needs one count per camera ({len(camera_prim_paths)}) summing to the"
+                f" number of {'targetIndices' if indexed else 'targets'} ({members}) and can't be combined with"
+                " targetQuery"
+            )
+            return failed()
 
-            if True:
-                # Orient the aabox to the camera
-                target = aabbox.GetMidpoint()
-                tr0 = Gf.Matrix4d().SetTranslate(-target)
-                local_rot = Gf.Matrix4d().SetRotate(local_xform.GetOrthonormalized().ExtractRotationQuat())
-                tr1 = Gf.Matrix4d().SetTranslate(target)
+        if indexed and (not paired or not all(0 <= index < len(target_prim_paths) for index in target_indices)):
+            db.log_error(
+                f"FocusAt Error: targetIndices needs targetCounts and indices within the {len(target_prim_paths)}"
+                " targets"
+            )
+            return failed()
 
-                # And compute the new range
-                aabbox = Gf.BBox3d(aabbox, tr0 * local_rot * tr1).ComputeAlignedRange()
+        if len(zooms) and len(zooms) != len(camera_prim_paths):
+            db.log_error(f"FocusAt Error: zooms needs one zoom per camera ({len(camera_prim_paths)})")
+            return failed()
 
-            # Compute where to move in the parent space
-            aabbox = Gf.BBox3d(aabbox, parent_xform.GetInverse()).ComputeAlignedRange()
+        if len(coverage_range) and (
+            len(coverage_range) != 2 or not 0.0 <= coverage_range[0] <= coverage_range[1] <= 1.0
+        ):
+            db.log_error(
+                f"FocusAt Error: coverage must be a [min, max] range within [0, 1], got {list(coverage_range)}"
+            )
+            return failed()
 
-            # Target is in parent-space (just like the camera / object we're moving)
-            target = aabbox.GetMidpoint()
+        if record_mode != RECORD_OFF and not record_path:
+            db.log_error(f"FocusAt Error: recordMode '{record_mode}' needs a recordPath")
+            return failed()
 
-            # Compute the distance to the target
-            camera_position = local_xform.ExtractTranslation()
-            distance = (camera_position - target).GetLength()
+        time = _get_time()
+        stage = omni.usd.get_context().get_stage()
+        state: _InternalState = db.internal_state
+        frame = state.frame
+        state.frame += 1
+
+        if prefetch and not set_focal_length:
+            # The jobs only exclude the writers holding STAGE_LOCK, the focal length has to be written by this node
+            if not state.prefetch_refused:
+                carb.log_warn("FocusAt: prefetch needs setFocalLength, the node has to author the focal length itself")
+                state.prefetch_refused = True
+            prefetch = False
+        prefetch = prefetch and not state.prefetch_disabled
+        cameras, local_xforms, parent_xforms, optics = [], [], [], []
+        focal_lengths = [0.0] * len(camera_prim_paths)
 
-            # Frame against the aabox's bounding sphere
-            radius = aabbox.GetSize().GetLength() * zoom  # * distance
+        try:
+            with _stats.zone("resolve"):
+                handles = [state.cameras.get(stage, camera_prim_path) for camera_prim_path in camera_prim_paths]
+                if target_query:
+                    target_prim_paths = [*target_prim_paths, *resolve_query(stage, target_query)]
+
+                pair_counts: Optional[List[int]] = None
+                if paired:
+                    bounded_paths, pair_counts = _pair_targets(
+                        camera_prim_paths, target_prim_paths, target_counts, target_indices if indexed else None
+                    )
+                else:
+                    bounded_paths = list(normalize_target_paths(target_prim_paths, camera_prim_paths))
+
+            if record_mode == REPLAY:
+                with _stats.zone("replay"):
+                    replayed = _replayed_values(record_path, frame, handles)
+                if replayed is not None:
+                    store = get_attribute_store(write_backend, stage) if set_focal_length else None
+                    with _stats.zone("write"), STAGE_LOCK, Sdf.ChangeBlock():
+                        for i, (camera, values) in enumerate(zip(handles, replayed)):
+                            focal_lengths[i] = values["focalLength"]
+                            if store is not None:
+                                _stats.count("writes", _write_replayed(store, camera, values, write_back))
+                    _stats.count("replayed_frames")
+                    db.outputs.execOut = og.ExecutionAttributeState.ENABLED
+                    db.outputs.values = focal_lengths
+                    return True
+
+                carb.log_warn(f"Nothing recorded for frame {frame} of all the cameras in {record_path}, solving it")
+
+            prefetched: Optional[FramingData] = None
+            if prefetch:
+                with _stats.zone("prefetch"):
+                    # Only the camera transforms are prefetched, writing their optics doesn't invalidate them
+                    state.watch = get_change_tracker(stage).watch(
+                        map(str, target_prim_paths),
+                        state.watch,
+                        transform_paths=[str(camera.path) for camera in handles if camera is not None],
+                    )
+                    prefetched = state.prefetcher.take(_prefetch_key(time, state.watch, instance_indices))
+                _stats.count("prefetch_hits" if prefetched is not None else "prefetch_misses")
+
+                submitted, state.prefetch_submitted = state.prefetch_submitted, None
+                if submitted is not None and submitted[0] is state.watch and submitted[1] != state.watch.generation:
+                    # Something else authored the cameras or targets since the prefetch, e.g. a rep.modify.pose node
+                    state.prefetch_invalidated += 1
+                    _stats.count("prefetch_invalidations")
+                    if state.prefetch_invalidated >= MAX_INVALIDATED_PREFETCHES:
+                        carb.log_warn(
+                            f"FocusAt: {state.prefetch_invalidated} prefetches in a row were invalidated by other"
+                            f" writers of the cameras or targets of {list(map(str, camera_prim_paths))}, prefetch is"
+                            " turned off. Only time-sampled cameras and targets can be prefetched"
+                        )
+                        state.prefetch_disabled = True
+                        prefetch = False
+                else:
+                    state.prefetch_invalidated = 0
+
+            with _stats.zone("transforms"):
+                for camera_prim_path, camera in zip(camera_prim_paths, handles):
+                    if camera is None:
+                        carb.log_warn(f"Framing of UsdPrims failed, {camera_prim_path} doesn't exist")
+                        cameras.append(None)
+                        continue
+
+                    if prefetched is not None and str(camera.path) in prefetched.transforms:
+                        local_xform, parent_xform = prefetched.transforms[str(camera.path)]
+                    else:
+                        local_xform, parent_xform, _ = compute_local_transform(
+                            camera_prim_path, bounds_backend, camera.prim
+                        )
+                    camera_optics = camera.read_optics(time) if local_xform is not None else None
+                    if camera_optics is None:
+                        carb.log_warn(f"Framing of UsdPrims failed, {camera_prim_path} is not a camera")
+                        cameras.append(None)
+                        continue
+
+                    cameras.append(camera)
+                    local_xforms.append(local_xform)
+                    parent_xforms.append(parent_xform)
+                    optics.append(camera_optics)
+
+            if not optics:
+                return failed()
 
-            # carb.log_info(aabbox)
-            # carb.log_info(f"Distance: {distance}, Radius: {radius}")
+            fingerprint = None
+            if skip_unchanged:
+                with _stats.zone("fingerprint"):
+                    state.targets = get_change_tracker(stage).watch(map(str, target_prim_paths), state.targets)
+                    fingerprint = (
+                        # The camera values are compared at the current time, the targets only depend on it when
+                        # they are animated
+                        time if state.targets.might_be_time_varying(stage) else None,
+                        tuple(map(str, camera_prim_paths)),
+                        state.targets,
+                        state.targets.generation,
+                        np.asarray(instance_indices, dtype=np.int64).tobytes(),
+                        np.asarray(target_counts, dtype=np.int64).tobytes(),
+                        np.asarray(target_indices, dtype=np.int64).tobytes(),
+                        np.asarray(zooms, dtype=np.float32).tobytes(),
+                        np.asarray(coverage_range, dtype=np.float32).tobytes(),
+                        (zoom, use_horizontal_fov, conform, bounds_backend, set_focal_length, write_backend),
+                        record_mode,
+                        tuple(local_xforms),
+                        tuple(parent_xforms),
+                        _camera_values(cameras, time),
+                    )
+
+                if fingerprint == state.fingerprint:
+                    _stats.count("skipped_solves")
+                    if record_mode == RECORD:
+                        _record(record_path, frame, time, state.recorded)
+                    db.outputs.values = state.focal_lengths
+                    if len(coverage_range):
+                        db.outputs.coverages = state.coverages
+                        db.outputs.satisfied = state.satisfied
+                    db.outputs.execOut = (
+                        og.ExecutionAttributeState.ENABLED
+                        if all(state.satisfied) or not len(coverage_range)
+                        else og.ExecutionAttributeState.DISABLED
+                    )
+                    return True
+
+            state.fingerprint = None
+
+            solved_indices = [i for i, camera in enumerate(cameras) if camera is not None]
+            with _stats.zone("bounds"):
+                if prefetched is not None:
+                    target_mins, target_maxs = prefetched.mins, prefetched.maxs
+                else:
+                    target_mins, target_maxs = compute_target_bounds(
+                        [],
+                        bounded_paths,
+                        use_bounds_cache,
+                        bounds_backend,
+                        instance_indices if len(instance_indices) else None,
+                    )
+
+                if pair_counts is None:
+                    aab_min, aab_max = engine.union_bounds(target_mins, target_maxs)
+                else:
+                    # One box per solved camera, shaped (C, 1, 3) so the solve doesn't merge the pairs
+                    aab_min, aab_max = engine.segment_bounds(target_mins, target_maxs, pair_counts)
+                    aab_min, aab_max = aab_min[solved_indices, None], aab_max[solved_indices, None]
+
+            empty = engine.is_empty(aab_min, aab_max)
+            if np.all(empty):
+                carb.log_warn(f"Framing of UsdPrims {target_prim_paths} resulted in an empty bounding-box")
+                return failed()
 
-            focal_length = calculate_focal_length_from_radius(
-                camera_prim_path, distance, radius, use_horizontal_fov, conform=conform
-            )
+            if pair_counts is not None:
+                for i in np.flatnonzero(empty):
+                    carb.log_warn(
+                        f"Framing of {camera_prim_paths[solved_indices[i]]} resulted in an empty bounding-box"
+                    )
+
+            with _stats.zone("solve"):
+                h_apertures, v_apertures, orthographic = zip(*optics)
+                if len(coverage_range):
+                    # Every target box is projected, the pairs are padded to their longest run of targets
+                    if pair_counts is None:
+                        box_mins, box_maxs = target_mins, target_maxs
+                    else:
+                        box_mins, box_maxs = engine.pad_segments(target_mins, target_maxs, pair_counts)
+                        box_mins, box_maxs = box_mins[solved_indices], box_maxs[solved_indices]
+                    solution = solve_coverage(
+                        box_mins,
+                        box_maxs,
+                        np.array(local_xforms),
+                        np.array(parent_xforms),
+                        h_apertures,
+                        v_apertures,
+                        coverage_range[0],
+                        coverage_range[1],
+                        orthographic=orthographic,
+                    )
+                else:
+                    solution = engine.solve_focal_lengths(
+                        aab_min,
+                        aab_max,
+                        np.array(local_xforms),
+                        np.array(parent_xforms),
+                        h_apertures,
+                        v_apertures,
+                        zoom=np.asarray(zooms, dtype=np.float64)[solved_indices] if len(zooms) else zoom,
+                        use_horizontal_fov=use_horizontal_fov,
+                        conform=conform,
+                        orthographic=orthographic,
+                    )
 
         except Exception as error:
             db.log_error(f"FocusAt Error: {error}")
             return failed()
 
-        if focal_length is None:
+        try:
+            store = get_attribute_store(write_backend, stage) if set_focal_length else None
+            recorded: RecordedRows = []
+            coverages = [0.0] * len(camera_prim_paths)
+            satisfied = [False] * len(camera_prim_paths)
+            with _stats.zone("write"), STAGE_LOCK, Sdf.ChangeBlock():
+                solved = 0
+                for i, camera in enumerate(cameras):
+                    if camera is None:
+                        continue
+
+                    values = {}
+                    if len(coverage_range) and solution.valid[solved]:
+                        coverages[i] = float(solution.coverage[solved])
+                        satisfied[i] = True
+
+                    if not solution.valid[solved]:
+                        # A pair whose targets are all empty, or a camera that can't meet the coverage, is kept as is
+                        focal_lengths[i] = camera.focal_length.Get(time)
+                    elif orthographic[solved]:
+                        focal_lengths[i] = camera.focal_length.Get(time)
+                        h_aperture = float(solution.horizontal_aperture[solved])
+                        v_aperture = float(solution.vertical_aperture[solved])
+                        values = {"horizontalAperture": h_aperture, "verticalAperture": v_aperture}
+                        if store is not None:
+                            store.write(
+                                camera.path,
+                                "horizontalAperture",
+                                h_aperture,
+                                attribute=camera.horizontal_aperture,
+                                write_back=write_back,
+                            )
+                            store.write(
+                                camera.path,
+                                "verticalAperture",
+                                v_aperture,
+                                attribute=camera.vertical_aperture,
+                                write_back=write_back,
+                            )
+                            _stats.count("writes", 2)
+                    else:
+                        focal_lengths[i] = float(solution.focal_length[solved])
+                        if store is not None:
+                            store.write(
+                                camera.path,
+                                "focalLength",
+                                focal_lengths[i],
+                                attribute=camera.focal_length,
+                                write_back=write_back,
+                            )
+                            _stats.count("writes")
+
+                    if record_mode == RECORD:
+                        values["focalLength"] = focal_lengths[i]
+                        world_xform = np.asarray(local_xforms[solved]) @ np.asarray(parent_xforms[solved])
+                        recorded.append((str(camera.path), values, world_xform))
+                    solved += 1
+        except Exception as error:
+            db.log_error(f"FocusAt Error: {error}")
             return failed()
 
-        if set_focal_length:
-            with Sdf.ChangeBlock():
-                camera = _get_camera_prim(camera_prim_path)
-
-                camera.GetAttribute("focalLength").Set(focal_length)
-
-        db.outputs.execOut = og.ExecutionAttributeState.ENABLED
-        db.outputs.values = [focal_length]
+        if len(coverage_range) and not all(satisfied):
+            unsatisfied = [str(path) for path, met in zip(camera_prim_paths, satisfied) if not met]
+            carb.log_warn(
+                f"Frame {frame} can't cover {coverage_range[0]:g} to {coverage_range[1]:g} of the frame area with"
+                f" {unsatisfied} without clipping the targets, skip it"
+            )
+            _stats.count("unsatisfied_coverages", len(unsatisfied))
+
+        if fingerprint is not None:
+            # The written values are read back by the next fingerprint
+            state.fingerprint = fingerprint[:-1] + (_camera_values(cameras, time),)
+            state.focal_lengths = focal_lengths
+            state.coverages = coverages
+            state.satisfied = satisfied
+
+        if record_mode == RECORD:
+            with _stats.zone("record"):
+                state.recorded = recorded
+                _record(record_path, frame, time, recorded)
+
+        if prefetch:
+            # Keyed after the writes, the notices they sent must not invalidate the prefetch
+            next_time = time + prefetch_time_step
+            generation = (state.watch, state.watch.generation)
+            if (
+                state.prefetch_backend is None
+                or state.prefetch_backend.stage != stage
+                or generation != state.prefetch_generation
+            ):
+                state.prefetch_backend = UsdBoundsBackend(stage, next_time, listen=False)
+                state.prefetch_generation = generation
+
+            state.prefetcher.submit(
+                _prefetch_key(next_time, state.watch, instance_indices),
+                gather_framing_data,
+                stage,
+                next_time,
+                {str(camera.path): camera.prim for camera in cameras if camera is not None},
+                bounded_paths,
+                instance_indices if len(instance_indices) else None,
+                state.prefetch_backend,
+            )
+            state.prefetch_submitted = generation
+
+        db.outputs.values = focal_lengths
+        if len(coverage_range):
+            db.outputs.coverages = coverages
+            db.outputs.satisfied = satisfied
+        db.outputs.execOut = (
+            og.ExecutionAttributeState.ENABLED
+            if all(satisfied) or not len(coverage_range)
+            else og.ExecutionAttributeState.DISABLED
+        )
         return True
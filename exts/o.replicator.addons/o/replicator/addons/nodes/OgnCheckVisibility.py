@@ -0,0 +1,90 @@
+"""
+This is the implementation of the OGN node defined in OgnCheckVisibility.ogn
+"""
+
+# Array or tuple values are accessed as numpy arrays so you probably need this import
+import numpy as np
+
+import carb
+import omni.graph.core as og
+import omni.timeline
+import omni.usd
+from o.replicator.addons.scripts.occlusion import compute_visibility, get_occluder_index
+from o.replicator.addons.scripts.query import resolve_query
+from o.replicator.addons.scripts.stats import get_node_stats
+
+from pxr import Sdf
+
+
+from typing import Sequence, Union
+
+_stats = get_node_stats("o.replicator.addons.CheckVisibility")
+
+
+def _get_time():
+    timeline_iface = omni.timeline.get_timeline_interface()
+    return timeline_iface.get_current_time() * timeline_iface.get_time_codes_per_seconds()
+
+
+class OgnCheckVisibility:
+    """
+    Cast rays from every camera to points sampled in the target boxes, against the boxes of the stage geometry.
+
+    The boxes are kept in a bounding volume hierarchy per stage, built once and refit from USD change notices and
+    for the time-varying prims, so a check costs a vectorized traversal rather than a render. Frames where a camera
+    sees less than ``inputs:minVisibility`` of the targets disable ``outputs:execOut``.
+    """
+
+    @staticmethod
+    @_stats.timed
+    def compute(db) -> bool:
+        camera_prim_paths: Sequence[Union[str, Sdf.Path]] = db.inputs.prims
+        target_prim_paths: Sequence[Union[str, Sdf.Path]] = db.inputs.targetPrim
+        target_query: str = db.inputs.targetQuery
+        samples: int = db.inputs.samples
+        min_visibility: float = db.inputs.minVisibility
+
+        def failed():
+            db.outputs.execOut = og.ExecutionAttributeState.DISABLED
+            return False
+
+        if camera_prim_paths is None or len(camera_prim_paths) == 0:
+            return failed()
+
+        if len(target_prim_paths) == 0 and not target_query:
+            return failed()
+
+        if samples < 1:
+            db.log_error(f"CheckVisibility Error: samples must be at least 1, got {samples}")
+            return failed()
+
+        time = _get_time()
+        stage = omni.usd.get_context().get_stage()
+        try:
+            if target_query:
+                with _stats.zone("resolve"):
+                    target_prim_paths = [*target_prim_paths, *resolve_query(stage, target_query)]
+            with _stats.zone("occluders"):
+                index = get_occluder_index(stage)
+                index.update(time)
+            with _stats.zone("rays"):
+                visibility = compute_visibility(stage, camera_prim_paths, target_prim_paths, time, samples, index)
+        except Exception as e:
+            db.log_error(f"CheckVisibility Error: {e}")
+            return failed()
+
+        db.outputs.visibility = np.nan_to_num(visibility, nan=0.0).astype(np.float32)
+        if np.isnan(visibility).any():
+            carb.log_warn(f"Missing cameras or empty targets, can't check the visibility of {list(target_prim_paths)}")
+            return failed()
+
+        if np.any(visibility < min_visibility):
+            _stats.count("occluded_frames")
+            carb.log_warn(
+                f"Targets {list(target_prim_paths)} less than {min_visibility:.0%} visible, visibility: {visibility}"
+            )
+            db.outputs.execOut = og.ExecutionAttributeState.DISABLED
+            return True
+
+        db.outputs.execOut = og.ExecutionAttributeState.ENABLED
+        return True
@@ -0,0 +1,109 @@
+"""
+This is the implementation of the OGN node defined in OgnCullTargets.ogn
+"""
+
+# Array or tuple values are accessed as numpy arrays so you probably need this import
+import numpy as np
+
+import carb
+import omni.graph.core as og
+import omni.timeline
+import omni.usd
+from o.replicator.addons.framing.culling import boxes_in_frustums
+from o.replicator.addons.scripts.bounds import gather_world_bounds
+from o.replicator.addons.scripts.camera import CameraHandleCache
+from o.replicator.addons.scripts.culling import compute_frustum_planes, visible_targets
+from o.replicator.addons.scripts.query import resolve_query
+from o.replicator.addons.scripts.stats import get_node_stats
+
+from pxr import Sdf
+
+
+from typing import Sequence, Union
+
+_stats = get_node_stats("o.replicator.addons.CullTargets")
+
+
+def _get_time():
+    timeline_iface = omni.timeline.get_timeline_interface()
+    return timeline_iface.get_current_time() * timeline_iface.get_time_codes_per_seconds()
+
+
+class _InternalState:
+    """Per node instance state of OgnCullTargets."""
+
+    def __init__(self):
+        self.cameras = CameraHandleCache()
+
+
+class OgnCullTargets:
+    """
+    Keep the targets in view of at least one camera.
+
+    The frustum planes of every camera are built from its transform, apertures, focal length and clipping range, and
+    the boxes of all the targets are tested against all the planes in one vectorized pass. ``outputs:prims`` can feed
+    the framing nodes and any later per-target work, so they only spend time on targets in view.
+    """
+
+    @staticmethod
+    def internal_state():
+        return _InternalState()
+
+    @staticmethod
+    @_stats.timed
+    def compute(db) -> bool:
+        camera_prim_paths: Sequence[Union[str, Sdf.Path]] = db.inputs.prims
+        target_prim_paths: Sequence[Union[str, Sdf.Path]] = db.inputs.targetPrim
+        target_query: str = db.inputs.targetQuery
+        use_bounds_cache: bool = db.inputs.useBoundsCache
+        bounds_backend: str = db.inputs.boundsBackend
+
+        def failed():
+            db.outputs.execOut = og.ExecutionAttributeState.DISABLED
+            return False
+
+        if camera_prim_paths is None or len(camera_prim_paths) == 0:
+            return failed()
+
+        if len(target_prim_paths) == 0 and not target_query:
+            return failed()
+
+        time = _get_time()
+        stage = omni.usd.get_context().get_stage()
+        state: _InternalState = db.internal_state
+
+        try:
+            if target_query:
+                with _stats.zone("resolve"):
+                    target_prim_paths = [*target_prim_paths, *resolve_query(stage, target_query)]
+
+            with _stats.zone("frustums"):
+                cameras = [state.cameras.get(stage, camera_prim_path) for camera_prim_path in camera_prim_paths]
+                planes, valid = compute_frustum_planes(cameras, time, bounds_backend)
+
+            with _stats.zone("bounds"):
+                paths = [str(path) for path in target_prim_paths]
+                mins, maxs = gather_world_bounds(stage, time, paths, use_bounds_cache, bounds_backend)
+
+            with _stats.zone("cull"):
+                in_view = boxes_in_frustums(mins, maxs, planes)
+                kept, visible = visible_targets(paths, in_view)
+        except Exception as e:
+            db.log_error(f"CullTargets Error: {e}")
+            return failed()
+
+        if not np.all(valid):
+            missing = [str(path) for path, ok in zip(camera_prim_paths, valid) if not ok]
+            carb.log_warn(f"Culling skipped {missing}, they aren't cameras with an aperture and a transform")
+
+        _stats.count("culled_targets", len(paths) - len(kept))
+        db.outputs.prims = [Sdf.Path(path) for path in kept]
+        db.outputs.visible = visible
+        db.outputs.counts = in_view.sum(axis=1).astype(np.int32)
+
+        if not kept:
+            db.outputs.execOut = og.ExecutionAttributeState.DISABLED
+            return True
+
+        db.outputs.execOut = og.ExecutionAttributeState.ENABLED
+        return True
@@ -0,0 +1,206 @@
+"""
+This is the implementation of the OGN node defined in OgnFrameCamera.ogn
+"""
+
+# Array or tuple values are accessed as numpy arrays so you probably need this import
+import numpy as np
+
+import carb
+import omni.graph.core as og
+import omni.timeline
+import omni.usd
+from o.replicator.addons.framing import engine
+from o.replicator.addons.scripts.bounds import compute_prim_transforms, gather_world_bounds
+from o.replicator.addons.scripts.camera import CameraHandleCache
+from o.replicator.addons.scripts.paths import normalize_target_paths
+from o.replicator.addons.scripts.prefetch import STAGE_LOCK
+from o.replicator.addons.scripts.query import resolve_query
+from o.replicator.addons.scripts.stats import get_node_stats
+
+from pxr import Gf, Sdf, Usd, UsdGeom
+
+from typing import List, Sequence, Union
+
+_stats = get_node_stats("o.replicator.addons.FrameCamera")
+
+
+def _get_time():
+    timeline_iface = omni.timeline.get_timeline_interface()
+    return timeline_iface.get_current_time() * timeline_iface.get_time_codes_per_seconds()
+
+
+def _set_rotation(prim: Usd.Prim, rotation: np.ndarray) -> bool:
+    """Author the local ``rotation`` (3x3, row vectors) on ``prim`` through its rotateXYZ or orient op."""
+    gf_rotation = Gf.Matrix3d(*rotation.flatten().tolist()).ExtractRotation()
+
+    xform_api = UsdGeom.XformCommonAPI(prim)
+    if xform_api:
+        # rotateXYZ applies X first, Decompose returns the angles in the order of the axes it is given
+        z, y, x = gf_rotation.Decompose(Gf.Vec3d.ZAxis(), Gf.Vec3d.YAxis(), Gf.Vec3d.XAxis())
+        return xform_api.SetRotate(Gf.Vec3f(x, y, z), UsdGeom.XformCommonAPI.RotationOrderXYZ)
+
+    orient = prim.GetAttribute("xformOp:orient")
+    if orient:
+        quat = gf_rotation.GetQuat()
+        orient.Set(Gf.Quatf(quat) if orient.GetTypeName() == Sdf.ValueTypeNames.Quatf else quat)
+        return True
+
+    return False
+
+
+class _InternalState:
+    """Per node instance state of OgnFrameCamera."""
+
+    def __init__(self):
+        self.cameras = CameraHandleCache()
+
+
+class OgnFrameCamera:
+    """
+    Orient prims to look at the target(s) and set the focal length of their camera to frame them.
+
+    This fuses ``rep.modify.pose(look_at=...)`` and ``rep.modify.focus(...)``: the target bounds are gathered once,
+    the orientation and focal length of every camera are solved together and both are written in one change block.
+    """
+
+    @staticmethod
+    def internal_state():
+        return _InternalState()
+
+    @staticmethod
+    @_stats.timed
+    def compute(db) -> bool:
+        prim_paths: Sequence[Union[str, Sdf.Path]] = db.inputs.prims
+        target_prim_paths: Sequence[Union[str, Sdf.Path]] = db.inputs.targetPrim
+        target_query: str = db.inputs.targetQuery
+        zoom: float = db.inputs.zoom
+        up_axis: np.ndarray = db.inputs.upAxis
+        use_horizontal_fov: bool = db.inputs.useHorizontalFov
+        conform: Union[int, str] = db.inputs.conform
+        bounds_backend: str = db.inputs.boundsBackend
+        instance_indices: Sequence[int] = db.inputs.instanceIndices
+
+        def failed():
+            db.outputs.execOut = og.ExecutionAttributeState.DISABLED
+            return False
+
+        if prim_paths is None or len(prim_paths) == 0:
+            return failed()
+
+        if len(target_prim_paths) == 0 and not target_query:
+            return failed()
+
+        time = _get_time()
+        stage = omni.usd.get_context().get_stage()
+        state: _InternalState = db.internal_state
+        focal_lengths = [0.0] * len(prim_paths)
+
+        indices: List[int] = []
+        poses, cameras, optics, is_pose = [], [], [], []
+        pose_locals, pose_parents, pose_worlds, camera_locals, camera_parents = [], [], [], [], []
+
+        try:
+            if target_query:
+                with _stats.zone("resolve"):
+                    target_prim_paths = [*target_prim_paths, *resolve_query(stage, target_query)]
+
+            with _stats.zone("transforms"):
+                for i, prim_path in enumerate(prim_paths):
+                    pose = stage.GetPrimAtPath(str(prim_path))
+                    camera = state.cameras.get(stage, prim_path)
+                    camera_optics = camera.read_optics(time) if camera is not None else None
+                    if not pose or camera_optics is None:
+                        carb.log_warn(f"Framing of UsdPrims failed, {prim_path} is not a camera")
+                        continue
+
+                    pose_local, pose_parent, pose_world = compute_prim_transforms(pose, time, bounds_backend)
+                    if camera.prim == pose:
+                        camera_local, camera_parent = pose_local, pose_parent
+                    else:
+                        camera_local, camera_parent, _ = compute_prim_transforms(camera.prim, time, bounds_backend)
+
+                    if pose_local is None or camera_local is None:
+                        carb.log_warn(f"Framing of UsdPrims failed, {prim_path} isn't UsdGeom.Xformable")
+                        continue
+
+                    indices.append(i)
+                    poses.append(pose)
+                    cameras.append(camera)
+                    optics.append(camera_optics)
+                    is_pose.append(camera.prim == pose)
+                    pose_locals.append(pose_local)
+                    pose_parents.append(pose_parent)
+                    pose_worlds.append(pose_world)
+                    camera_locals.append(camera_local)
+                    camera_parents.append(camera_parent)
+
+            if not indices:
+                return failed()
+
+            with _stats.zone("bounds"):
+                excluded = {str(path) for path in prim_paths} | {str(camera.path) for camera in cameras}
+                paths = list(normalize_target_paths(target_prim_paths, sorted(excluded)))
+                selected = instance_indices if len(instance_indices) else None
+                aab_min, aab_max = engine.union_bounds(
+                    *gather_world_bounds(stage, time, paths, False, bounds_backend, selected)
+                )
+
+            if engine.is_empty(aab_min, aab_max):
+                carb.log_warn(f"Framing of UsdPrims {target_prim_paths} resulted in an empty bounding-box")
+                return failed()
+
+            with _stats.zone("solve"):
+                pose_local = np.array(pose_locals)
+                pose_parent = np.array(pose_parents)
+                pose_world = np.array(pose_worlds)
+
+                # Look at the center of the targets from where each prim currently is
+                new_local, local_rotations = engine.look_at_transforms(
+                    pose_local, pose_parent, (aab_min + aab_max) * 0.5, up_axis
+                )
+                new_pose_world = new_local @ pose_parent
+
+                # Cameras under the oriented prim follow it
+                is_pose = np.array(is_pose)[:, None, None]
+                camera_local = np.where(is_pose, new_local, np.array(camera_locals))
+                camera_parent = np.where(
+                    is_pose,
+                    pose_parent,
+                    np.array(camera_parents) @ np.linalg.inv(pose_world) @ new_pose_world,
+                )
+
+                h_apertures, v_apertures, orthographic = zip(*optics)
+                solution = engine.solve_focal_lengths(
+                    aab_min,
+                    aab_max,
+                    camera_local,
+                    camera_parent,
+                    h_apertures,
+                    v_apertures,
+                    zoom=zoom,
+                    use_horizontal_fov=use_horizontal_fov,
+                    conform=conform,
+                    orthographic=orthographic,
+                )
+
+            with _stats.zone("write"), STAGE_LOCK, Sdf.ChangeBlock():
+                for k, i in enumerate(indices):
+                    camera = cameras[k]
+                    if not _set_rotation(poses[k], local_rotations[k]):
+                        carb.log_warn(f"Unable to orient {poses[k].GetPath()}, it has no rotateXYZ or orient op")
+
+                    if orthographic[k]:
+                        focal_lengths[i] = camera.focal_length.Get(time)
+                        camera.horizontal_aperture.Set(float(solution.horizontal_aperture[k]))
+                        camera.vertical_aperture.Set(float(solution.vertical_aperture[k]))
+                    else:
+                        focal_lengths[i] = float(solution.focal_length[k])
+                        camera.focal_length.Set(focal_lengths[i])
+
+        except Exception as error:
+            db.log_error(f"FrameCamera Error: {error}")
+            return failed()
+
+        db.outputs.execOut = og.ExecutionAttributeState.ENABLED
+        db.outputs.values = focal_lengths
+        return True
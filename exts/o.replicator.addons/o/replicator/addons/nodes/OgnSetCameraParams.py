@@ -4,77 +4,281 @@ This is the implementation of the OGN node defined in OgnFocusAt.ogn
 
 # Array or tuple values are accessed as numpy arrays so you probably need this import
 import numpy as np
-import math
 
 import carb
 import omni.graph.core as og
-import omni.kit
 import omni.timeline
 import omni.usd
-from omni.replicator.core import utils
+from o.replicator.addons.scripts.baking import bake_camera_params
+from o.replicator.addons.scripts.camera import CameraHandle, CameraHandleCache
+from o.replicator.addons.scripts.prefetch import STAGE_LOCK
+from o.replicator.addons.scripts.recording import RECORD, RECORD_OFF, REPLAY, get_recorder, get_recording
+from o.replicator.addons.scripts.stats import get_node_stats
+from o.replicator.addons.scripts.stores import get_attribute_store
 
-from pxr import (
-    OmniAudioSchema,
-    Gf,
-    Tf,
-    Kind,
-    Sdf,
-    Sdr,
-    Trace,
-    Usd,
-    UsdGeom,
-    UsdLux,
-    UsdShade,
-)
+from pxr import Sdf, Tf, Usd
 
 
-from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Set, Tuple, Union
+
+_stats = get_node_stats("o.replicator.addons.SetCameraParams")
+
+
+def _get_time():
+    timeline_iface = omni.timeline.get_timeline_interface()
+    return timeline_iface.get_current_time() * timeline_iface.get_time_codes_per_seconds()
+
+
+def _same_value(a: Any, b: Any) -> bool:
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.array_equal(a, b)
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+
+class _WritePlan:
+    """
+    The attributes written for one (camera, params) pair, resolved once instead of on every compute.
+
+    ``attributes`` holds one (value index, attribute name, attribute) entry per param the camera has, and
+    ``last_written`` the (value, time code) last authored on each of them so unchanged values are not written again. An
+    entry is forgotten when its attribute is authored by anything else.
+    """
+
+    __slots__ = ("camera", "attributes", "last_written", "paths")
+
+    def __init__(self, camera: CameraHandle, params: Tuple[str, ...]):
+        self.camera = camera
+        self.attributes: List[Tuple[int, str, Usd.Attribute]] = []
+        self.last_written: List[Optional[Tuple[Any, float]]] = []
+        self.paths: List[Sdf.Path] = []
+
+        prim = camera.prim
+        for index, param in enumerate(params):
+            if not prim.HasAttribute(param) and prim.HasAttribute(f"inputs:{param}"):
+                # fallback to inputs prefix
+                param = f"inputs:{param}"
+
+            if not prim.HasAttribute(param):
+                carb.log_warn(f"Camera does not have attribute: {param}")
+                continue
+
+            attribute = prim.GetAttribute(param)
+            self.attributes.append((index, param, attribute))
+            self.last_written.append(None)
+            self.paths.append(attribute.GetPath())
+
+    def forget_changed(self, changed: Set[Sdf.Path], resynced: Set[Sdf.Path]):
+        """Forget the last written values of the attributes in ``changed`` or below a path of ``resynced``."""
+        for i, path in enumerate(self.paths):
+            if self.last_written[i] is not None and (
+                path in changed or any(ancestor in resynced for ancestor in path.GetAncestorsRange())
+            ):
+                self.last_written[i] = None
+
+
+class _InternalState:
+    """Per node instance state of OgnSetCameraParams."""
+
+    def __init__(self):
+        self.cameras = CameraHandleCache()
+        self.plans: Dict[Tuple[str, Tuple[str, ...]], _WritePlan] = {}
+        self.writes = 0
+        self.skipped_writes = 0
+        # The evaluation index recorded or replayed
+        self.frame = 0
+        # The inputs of the last bake, baked again when they change
+        self.baked: Optional[Hashable] = None
+        # Set while the node authors its own values, their notices don't invalidate the plans
+        self.writing = False
+        self._stage: Optional[Usd.Stage] = None
+        self._listener = None
+
+    def listen(self, stage: Usd.Stage):
+        """Forget the last written values of the attributes authored on ``stage`` by anything else."""
+        if self._stage == stage:
+            return
+        if self._listener:
+            self._listener.Revoke()
+        self._stage = stage
+        self._listener = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self._on_objects_changed, stage)
+        self.plans.clear()
+
+    def _on_objects_changed(self, notice: Usd.Notice.ObjectsChanged, sender: Usd.Stage):
+        if self.writing or not self.plans:
+            return
+
+        changed = set(notice.GetChangedInfoOnlyPaths())
+        resynced = set(notice.GetResyncedPaths())
+        for plan in self.plans.values():
+            plan.forget_changed(changed, resynced)
+
+    def get_plan(self, camera_prim_path: str, camera: CameraHandle, params: Tuple[str, ...]) -> _WritePlan:
+        key = (camera_prim_path, params)
+        plan = self.plans.get(key)
+        # Handles are replaced when the camera is resynced, the plan has to be compiled again
+        if plan is None or plan.camera is not camera:
+            plan = self.plans[key] = _WritePlan(camera, params)
+        return plan
+
+
+def _bake(
+    state: _InternalState,
+    stage: Usd.Stage,
+    camera: CameraHandle,
+    params: Tuple[str, ...],
+    values: Sequence[float],
+    time_codes: Sequence[float],
+    layer: str,
+):
+    """Bake the (frames x params) ``values`` as time samples of ``camera``, unless they are already baked."""
+    values = np.asarray(values, dtype=np.float64)
+    time_codes = np.asarray(time_codes, dtype=np.float64)
+    key = (str(camera.path), params, values.tobytes(), time_codes.tobytes(), layer)
+    if state.baked == key:
+        return
+
+    if not params or len(values) % len(params):
+        raise ValueError(f"{len(values)} bake values is not a multiple of the {len(params)} params")
+
+    bake_camera_params(
+        stage,
+        camera.path,
+        params,
+        values.reshape(-1, len(params)),
+        time_codes if len(time_codes) else None,
+        sublayer=layer or None,
+    )
+    state.baked = key
+    _stats.count("bakes")
 
 
 class OgnSetCameraParams:
     """
     Set parameters on a camera prim.
+
+    The param to attribute resolution is compiled once per (camera, params) and all the values are written in one
+    change block, skipping the ones that are unchanged since the last write. Values authored on the USD stage by
+    anything else are written again; values written straight to Fabric by other nodes are not seen.
+
+    With ``inputs:bakeValues`` set, the values of every frame are authored as time samples in one pass instead, and
+    the timeline resolves them from USD without a write per frame.
+
+    With ``inputs:recordMode`` set to "record", the params written by every evaluation are appended to the recording
+    in ``inputs:recordPath``. With "replay", the values recorded for the evaluation replace the ``inputs:values``.
     """
 
     @staticmethod
+    def internal_state():
+        return _InternalState()
+
+    @staticmethod
+    @_stats.timed
     def compute(db) -> bool:
         camera_prim_path: Sequence[Union[str, Sdf.Path]] = db.inputs.cameraPrim
         params: Sequence[Any] = db.inputs.params
         values: Sequence[Any] = db.inputs.values
+        write_backend: str = db.inputs.writeBackend
+        write_back: bool = db.inputs.fabricWriteBack
+        record_mode: str = db.inputs.recordMode
+        record_path: str = db.inputs.recordPath
+        bake_values: Sequence[float] = db.inputs.bakeValues
 
         def failed():
             db.outputs.execOut = og.ExecutionAttributeState.DISABLED
             return False
 
+        if camera_prim_path is None or len(camera_prim_path) == 0:
+            return failed()
+
+        if not isinstance(camera_prim_path, (str, Sdf.Path)):
+            camera_prim_path = camera_prim_path[0]
+
+        if record_mode != RECORD_OFF and not record_path:
+            carb.log_error(f"recordMode '{record_mode}' needs a recordPath")
+            return failed()
+
+        state: _InternalState = db.internal_state
+        frame = state.frame
+        state.frame += 1
         stage = omni.usd.get_context().get_stage()
-        camera = stage.GetPrimAtPath(str(camera_prim_path))
-        if camera.HasAttribute("replicatorXform"):
-            camera = camera.GetChildren()[0]
+        with _stats.zone("resolve"):
+            state.listen(stage)
+            handle = state.cameras.get(stage, camera_prim_path)
+        if handle is None:
+            carb.log_warn(f"Camera {camera_prim_path} doesn't exist")
+            return failed()
 
-        current_time = omni.timeline.get_timeline_interface().get_current_time()
+        current_time = _get_time()
 
         try:
-            attribute_names = [attr.GetName() for attr in camera.GetAttributes()]
-            ret = {}
-            for param, value in zip(params, values):
-                if param not in attribute_names and f"inputs:{param}" in attribute_names:
-                        # fallback to inputs prefix
-                        param = f"inputs:{param}"
-
-                if param not in attribute_names:
-                    carb.log_warning(f"Camera does not have attribute: {param}")
-                    continue
-
-                camera.GetAttribute(param).Set(value, current_time)
-                ret[param] = value
+            with _stats.zone("plan"):
+                plan = state.get_plan(str(camera_prim_path), handle, tuple(params))
+                store = get_attribute_store(write_backend, stage)
+
+            if len(bake_values):
+                with _stats.zone("bake"), STAGE_LOCK:
+                    _bake(
+                        state,
+                        stage,
+                        handle,
+                        tuple(params),
+                        bake_values,
+                        db.inputs.bakeTimeCodes,
+                        db.inputs.bakeLayer,
+                    )
+                db.outputs.execOut = og.ExecutionAttributeState.ENABLED
+                db.outputs.values = [attribute.Get(current_time) for _, _, attribute in plan.attributes]
+                return True
+
+            if record_mode == REPLAY:
+                with _stats.zone("replay"):
+                    replayed = get_recording(record_path).lookup(str(handle.path), frame)
+                if replayed is None:
+                    carb.log_warn(f"Nothing recorded for frame {frame} of {handle.path} in {record_path}")
+                else:
+                    values = list(values)
+                    for index, param, _ in plan.attributes:
+                        if param in replayed and index < len(values):
+                            values[index] = replayed[param]
+                    _stats.count("replayed_frames")
+
+            written = []
+            state.writing = True
+            try:
+                with _stats.zone("write"), STAGE_LOCK, Sdf.ChangeBlock():
+                    for i, (index, param, attribute) in enumerate(plan.attributes):
+                        if index >= len(values):
+                            break
+
+                        value = values[index]
+                        written.append(value)
+
+                        last = plan.last_written[i]
+                        if last is not None and last[1] == current_time and _same_value(last[0], value):
+                            state.skipped_writes += 1
+                            _stats.count("skipped_writes")
+                            continue
+
+                        time = current_time if store.keeps_time_samples else None
+                        store.write(handle.path, param, value, time, attribute=attribute, write_back=write_back)
+                        plan.last_written[i] = (value, current_time)
+                        state.writes += 1
+                        _stats.count("writes")
+            finally:
+                state.writing = False
+
+            if record_mode == RECORD:
+                with _stats.zone("record"):
+                    recorded = {param: float(value) for (_, param, _), value in zip(plan.attributes, written)}
+                    get_recorder(record_path).record(frame, current_time, str(handle.path), recorded)
+                _stats.count("recorded_frames")
         except Exception as e:
             carb.log_error(f"Failed to set camera parameter: {e}")
             return failed()
-        
-        # https://openusd.org/dev/api/class_sdf_change_block.html
-        # with Sdf.ChangeBlock():
-        #     camera.
 
         db.outputs.execOut = og.ExecutionAttributeState.ENABLED
-        db.outputs.values = ret
+        db.outputs.values = written
         return True
@@ -1 +1,30 @@
-from . import modify
\ No newline at end of file
+"""
+The submodules are imported on first use, ``modify`` pulls in the Replicator runtime.
+"""
+import importlib
+
+_SUBMODULES = (
+    "baking",
+    "bounds",
+    "camera",
+    "culling",
+    "graph",
+    "modify",
+    "occlusion",
+    "paths",
+    "planning",
+    "prefetch",
+    "preflight",
+    "query",
+    "recording",
+    "stats",
+    "stores",
+    "tracking",
+    "utils",
+)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
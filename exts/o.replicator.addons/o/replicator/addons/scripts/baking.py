@@ -0,0 +1,157 @@
+"""
+Bulk baking of camera params as USD time samples.
+
+Baking authors a (frames x params) array of values as time samples of the camera attributes, with layer-level spec
+edits in one ``Sdf.ChangeBlock``, optionally into a dedicated sublayer. Playing the timeline then resolves the
+values of each frame from USD, without a graph evaluation or an authoring call per frame.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import carb
+import numpy as np
+from pxr import Sdf, Usd
+
+from o.replicator.addons.scripts.camera import resolve_camera_prim
+
+
+def _find_attribute(prim: Usd.Prim, param: str) -> Optional[Usd.Attribute]:
+    if not prim.HasAttribute(param) and prim.HasAttribute(f"inputs:{param}"):
+        # fallback to inputs prefix
+        param = f"inputs:{param}"
+    if not prim.HasAttribute(param):
+        return None
+    return prim.GetAttribute(param)
+
+
+def get_bake_layer(stage: Usd.Stage, sublayer: Optional[str] = None) -> Sdf.Layer:
+    """
+    Return the layer baked into.
+
+    Args:
+        stage (Usd.Stage): The stage.
+        sublayer (str, optional): The identifier of a dedicated layer, opened or created, and inserted as the
+            strongest sublayer of the session layer so that its samples override the camera values authored in the
+            root layer stack. Values authored in the session layer itself stay stronger. An empty identifier creates
+            an anonymous layer. Defaults to the edit target layer.
+
+    Returns:
+        Sdf.Layer: The layer.
+    """
+    if sublayer is None:
+        return stage.GetEditTarget().GetLayer()
+
+    if sublayer:
+        layer = Sdf.Layer.FindOrOpen(sublayer) or Sdf.Layer.CreateNew(sublayer)
+    else:
+        layer = Sdf.Layer.CreateAnonymous("camera_bake.usda")
+    session_layer = stage.GetSessionLayer()
+    if layer.identifier not in session_layer.subLayerPaths:
+        session_layer.subLayerPaths.insert(0, layer.identifier)
+    return layer
+
+
+def find_stronger_opinions(
+    stage: Usd.Stage, prim_path: Union[str, Sdf.Path], names: Sequence[str], layer: Sdf.Layer, time: float
+) -> List[str]:
+    """
+    Return the attributes of ``names`` whose value at ``time`` is resolved from a layer other than ``layer``.
+
+    Args:
+        stage (Usd.Stage): The stage.
+        prim_path (Union[str, Sdf.Path]): The prim of the attributes.
+        names (Sequence[str]): The attribute names.
+        layer (Sdf.Layer): The layer the attributes were authored in.
+        time (float): The time code the values are resolved at.
+
+    Returns:
+        List[str]: The paths of the attributes, each followed by the layer holding the stronger opinion.
+    """
+    prim = stage.GetPrimAtPath(str(prim_path))
+    stronger = []
+    for name in names:
+        for spec in prim.GetAttribute(name).GetPropertyStack(time):
+            if spec.HasDefaultValue() or spec.layer.GetNumTimeSamplesForPath(spec.path):
+                if spec.layer != layer:
+                    stronger.append(f"{spec.path} in {spec.layer.identifier}")
+                break
+    return stronger
+
+
+def bake_camera_params(
+    stage: Usd.Stage,
+    camera_path: Union[str, Sdf.Path],
+    params: Sequence[str],
+    values: Union[np.ndarray, Sequence[Sequence[float]]],
+    time_codes: Optional[Sequence[float]] = None,
+    start_time: Optional[float] = None,
+    time_step: float = 1.0,
+    sublayer: Optional[str] = None,
+    save: bool = True,
+) -> Tuple[Sdf.Layer, List[str]]:
+    """
+    Author a (frames x params) array of camera values as time samples, in one change block.
+
+    Samples already authored in the layer at other time codes are kept. A warning lists the baked attributes that
+    still resolve from a stronger layer, such as a default value authored in the session layer.
+
+    Args:
+        stage (Usd.Stage): The stage.
+        camera_path (Union[str, Sdf.Path]): The camera, or the Replicator camera Xform above it.
+        params (Sequence[str]): The camera attribute of each column of ``values``, falling back to the ``inputs:``
+            prefixed attribute, e.g. ``("focalLength", "focusDistance", "fStop")``.
+        values (np.ndarray): The value of each frame and param, shape (N, P). NaN values are not authored.
+        time_codes (Sequence[float], optional): The time code of each frame, shape (N,). Defaults to
+            ``start_time + frame * time_step``.
+        start_time (float, optional): The time code of the first frame. Defaults to the start time code of the stage.
+        time_step (float, optional): The time codes between two frames. Defaults to 1.
+        sublayer (str, optional): Bake into this layer instead of the edit target layer, see :func:`get_bake_layer`.
+        save (bool, optional): Save ``sublayer`` once baked, when it is not anonymous. Defaults to True.
+
+    Returns:
+        Tuple[Sdf.Layer, List[str]]: The layer baked into and the attributes baked, the params the camera doesn't
+        have are skipped.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    if values.ndim != 2 or values.shape[1] != len(params):
+        raise ValueError(f"Expected values of shape (frames, {len(params)}), got {values.shape}")
+
+    if time_codes is None:
+        if start_time is None:
+            start_time = stage.GetStartTimeCode()
+        time_codes = start_time + np.arange(len(values)) * time_step
+    time_codes = np.asarray(time_codes, dtype=np.float64)
+    if time_codes.shape != (len(values),):
+        raise ValueError(f"Expected {len(values)} time codes, got {time_codes.shape}")
+
+    camera = resolve_camera_prim(stage, camera_path)
+    if not camera:
+        raise ValueError(f"Camera {camera_path} doesn't exist")
+
+    columns: Dict[str, Tuple[Sdf.ValueTypeName, np.ndarray]] = {}
+    for index, param in enumerate(params):
+        attribute = _find_attribute(camera, param)
+        if attribute is not None:
+            columns[attribute.GetName()] = (attribute.GetTypeName(), values[:, index])
+
+    layer = get_bake_layer(stage, sublayer)
+    prim_path = camera.GetPath()
+    with Sdf.ChangeBlock():
+        prim_spec = Sdf.CreatePrimInLayer(layer, prim_path)
+        for name, (type_name, column) in columns.items():
+            attribute_path = prim_path.AppendProperty(name)
+            if not layer.GetAttributeAtPath(attribute_path):
+                Sdf.AttributeSpec(prim_spec, name, type_name)
+            authored = ~np.isnan(column)
+            for time_code, value in zip(time_codes[authored].tolist(), column[authored].tolist()):
+                layer.SetTimeSample(attribute_path, time_code, value)
+
+    if sublayer and save and not layer.anonymous:
+        layer.Save()
+
+    if len(time_codes):
+        stronger = find_stronger_opinions(stage, prim_path, list(columns), layer, float(time_codes[0]))
+        if stronger:
+            carb.log_warn(f"Baked camera params are overridden by stronger opinions: {', '.join(stronger)}")
+    return layer, list(columns)
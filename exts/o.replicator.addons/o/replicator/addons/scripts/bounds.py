@@ -0,0 +1,477 @@
+"""
+World bounding-box caching and computation for the framing nodes.
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from pxr import Gf, Sdf, Tf, Usd, UsdGeom
+
+from o.replicator.addons.framing import engine, instancer
+from o.replicator.addons.scripts.paths import PathSet
+from o.replicator.addons.scripts.stats import register_cache
+from o.replicator.addons.scripts.tracking import changed_prim_paths, changed_prim_transforms
+
+BoundsFn = Callable[[List[str]], Tuple[np.ndarray, np.ndarray]]
+
+BOUNDS_BACKEND_CONTEXT = "context"
+BOUNDS_BACKEND_USD = "usd"
+
+
+class BoundsCache:
+    """
+    LRU cache of world space boxes keyed by prim path and time code.
+
+    The cache listens to ``Usd.Notice.ObjectsChanged`` on its stage. A change on a prim drops the cached boxes of
+    that prim, of its descendants (their world transform may have moved) and of its ancestors (their bounds
+    include it). Everything else stays cached, so static targets become dictionary hits. Changes to properties
+    that never affect bounds, such as materials or light inputs, keep the boxes cached.
+
+    Args:
+        stage (Usd.Stage): The stage to listen to.
+        max_size (int, optional): The maximum number of cached boxes. Defaults to 65536.
+    """
+
+    def __init__(self, stage: Usd.Stage, max_size: int = 65536):
+        self.stage = stage
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Incremented every time cached boxes are invalidated
+        self.version = 0
+
+        self._entries: "OrderedDict[Tuple[str, float], Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._times: Dict[Sdf.Path, Set[float]] = {}
+        # The paths of _times as a prefix tree, a change only visits the cached paths of its subtree
+        self._cached_paths = PathSet()
+        self._listener = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self._on_objects_changed, stage)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def revoke(self):
+        """Stop listening to the stage and drop every cached box."""
+        if self._listener:
+            self._listener.Revoke()
+            self._listener = None
+        self.clear()
+
+    def clear(self):
+        self._entries.clear()
+        self._times.clear()
+        self._cached_paths.clear()
+        self.version += 1
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def world_bounds(self, paths: Sequence[str], time: float, compute: BoundsFn) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the boxes of ``paths`` at ``time``, computing the missing ones with a single ``compute`` call.
+
+        Args:
+            paths (Sequence[str]): The prim paths.
+            time (float): The time code the boxes are computed at.
+            compute (Callable): Computes the (mins, maxs) arrays of a list of paths.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The box minimums and maximums, both of shape (N, 3).
+        """
+        mins = np.empty((len(paths), 3))
+        maxs = np.empty((len(paths), 3))
+        missing = []
+
+        for i, path in enumerate(paths):
+            entry = self._entries.get((path, time))
+            if entry is None:
+                missing.append(i)
+                continue
+            self._entries.move_to_end((path, time))
+            mins[i], maxs[i] = entry
+
+        self.hits += len(paths) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            missing_paths = [paths[i] for i in missing]
+            mins[missing], maxs[missing] = compute(missing_paths)
+            for i, path in zip(missing, missing_paths):
+                self._put(path, time, mins[i].copy(), maxs[i].copy())
+
+        return mins, maxs
+
+    def _put(self, path: str, time: float, aab_min: np.ndarray, aab_max: np.ndarray):
+        self._entries[(path, time)] = (aab_min, aab_max)
+        prim_path = Sdf.Path(path)
+        times = self._times.get(prim_path)
+        if times is None:
+            times = self._times[prim_path] = set()
+            self._cached_paths.add(path)
+        times.add(time)
+
+        while len(self._entries) > self.max_size:
+            (old_path, old_time), _ = self._entries.popitem(last=False)
+            self._forget(Sdf.Path(old_path), old_time)
+            self.evictions += 1
+
+    def _forget(self, path: Sdf.Path, time: float):
+        times = self._times.get(path)
+        if times is not None:
+            times.discard(time)
+            if not times:
+                del self._times[path]
+                self._cached_paths.discard(path)
+
+    def _invalidate(self, path: Sdf.Path):
+        if path == Sdf.Path.absoluteRootPath:
+            self.clear()
+            return
+
+        stale = [Sdf.Path(cached) for cached in self._cached_paths.subtree(path)]
+        stale.extend(ancestor for ancestor in path.GetAncestorsRange() if ancestor != path and ancestor in self._times)
+
+        for cached in stale:
+            key = str(cached)
+            for time in self._times.pop(cached):
+                self._entries.pop((key, time), None)
+            self._cached_paths.discard(key)
+
+        if stale:
+            self.version += 1
+
+    def _on_objects_changed(self, notice: Usd.Notice.ObjectsChanged, sender: Usd.Stage):
+        if not self._entries:
+            return
+
+        for path in changed_prim_paths(notice):
+            self._invalidate(path)
+            if not self._entries:
+                break
+
+
+_bounds_cache: Optional[BoundsCache] = None
+
+
+def get_bounds_cache(stage: Usd.Stage) -> BoundsCache:
+    """Return the shared bounds cache of ``stage``, replacing the cache of a previous stage."""
+    global _bounds_cache
+
+    if _bounds_cache is None or _bounds_cache.stage != stage:
+        if _bounds_cache is not None:
+            _bounds_cache.revoke()
+        _bounds_cache = BoundsCache(stage)
+
+    return _bounds_cache
+
+
+def _bounds_cache_stats() -> Optional[Dict[str, float]]:
+    return _bounds_cache.stats() if _bounds_cache is not None else None
+
+
+register_cache("bounds", _bounds_cache_stats)
+
+
+class UsdBoundsBackend:
+    """
+    World bounds and transforms served by one ``UsdGeom.BBoxCache`` and one ``UsdGeom.XformCache``.
+
+    Both caches are shared by every target and camera evaluated at the same time code, so ancestor transforms are
+    computed once per distinct ancestor instead of once per target. Neither of them listens to notices, so the box
+    cache is cleared on the stage changes that can affect bounds and the transform cache only on the ones that can
+    also move a prim. Material, primvar and camera optics edits keep both.
+
+    Args:
+        stage (Usd.Stage): The stage to compute on.
+        time (float): The time code to compute at.
+        purposes (Sequence[str], optional): The purposes included in the bounds. Defaults to default and render.
+        listen (bool, optional): Clear the caches on stage changes. Defaults to True, a backend that doesn't listen
+            must not outlive the stage state it was created for.
+    """
+
+    def __init__(
+        self,
+        stage: Usd.Stage,
+        time: float,
+        purposes: Sequence[str] = (UsdGeom.Tokens.default_, UsdGeom.Tokens.render),
+        listen: bool = True,
+    ):
+        self.stage = stage
+        self.time = time
+        self.bbox_cache = UsdGeom.BBoxCache(Usd.TimeCode(time), list(purposes), useExtentsHint=True)
+        self.xform_cache = UsdGeom.XformCache(Usd.TimeCode(time))
+        self._listener = None
+        if listen:
+            self._listener = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self._on_objects_changed, stage)
+
+    def revoke(self):
+        if self._listener:
+            self._listener.Revoke()
+            self._listener = None
+
+    def set_time(self, time: float):
+        if time != self.time:
+            self.time = time
+            self.bbox_cache.SetTime(Usd.TimeCode(time))
+            self.xform_cache.SetTime(Usd.TimeCode(time))
+
+    def world_bounds(self, paths: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the world space box of each path, with the +/- ``engine.FALLBACK_HALF_EXTENT`` box around the
+        world transform of targets that have no extent.
+
+        Args:
+            paths (Sequence[str]): The prim paths.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The box minimums and maximums, both of shape (N, 3).
+        """
+        prims = [self.stage.GetPrimAtPath(str(path)) for path in paths]
+
+        mins, maxs = engine.empty_bounds(len(prims))
+        for i, prim in enumerate(prims):
+            if prim:
+                aligned = self.bbox_cache.ComputeWorldBound(prim).ComputeAlignedRange()
+                if not aligned.IsEmpty():
+                    mins[i], maxs[i] = aligned.GetMin(), aligned.GetMax()
+
+        empty = np.flatnonzero(engine.is_empty(mins, maxs))
+        if len(empty):
+            matrices = np.array([self.world_transform(prims[i]) for i in empty]).reshape(-1, 4, 4)
+            half_extent = np.full(3, engine.FALLBACK_HALF_EXTENT)
+            mins[empty], maxs[empty] = engine.transform_bounds(-half_extent, half_extent, matrices)
+
+        return mins, maxs
+
+    def world_transform(self, prim: Usd.Prim) -> Gf.Matrix4d:
+        if not prim:
+            return Gf.Matrix4d(1)
+        return self.xform_cache.GetLocalToWorldTransform(prim)
+
+    def transforms(self, prim: Usd.Prim) -> Tuple[Gf.Matrix4d, Gf.Matrix4d, Gf.Matrix4d]:
+        """Return the (local, parent to world, local to world) transforms of ``prim``."""
+        local_xform, _ = self.xform_cache.GetLocalTransformation(prim)
+        parent_xform = self.xform_cache.GetParentToWorldTransform(prim)
+        return local_xform, parent_xform, local_xform * parent_xform
+
+    def instancer_bounds(
+        self, point_instancer: UsdGeom.PointInstancer, indices: Optional[Sequence[int]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the world space boxes of the selected instances of ``point_instancer``, shape (K, 3)."""
+        return compute_instancer_bounds(
+            point_instancer,
+            self.time,
+            indices,
+            self.bbox_cache,
+            np.array(self.world_transform(point_instancer.GetPrim())),
+        )
+
+    def _on_objects_changed(self, notice: Usd.Notice.ObjectsChanged, sender: Usd.Stage):
+        changed = changed_prim_transforms(notice)
+        if not changed:
+            return
+
+        self.bbox_cache.Clear()
+        if any(changed.values()):
+            self.xform_cache.Clear()
+
+
+_usd_bounds_backend: Optional[UsdBoundsBackend] = None
+
+
+def get_usd_bounds_backend(stage: Usd.Stage, time: float) -> UsdBoundsBackend:
+    """Return the shared ``UsdBoundsBackend`` of ``stage``, moved to ``time``."""
+    global _usd_bounds_backend
+
+    if _usd_bounds_backend is None or _usd_bounds_backend.stage != stage:
+        if _usd_bounds_backend is not None:
+            _usd_bounds_backend.revoke()
+        _usd_bounds_backend = UsdBoundsBackend(stage, time)
+    else:
+        _usd_bounds_backend.set_time(time)
+
+    return _usd_bounds_backend
+
+
+def compute_context_bounds(paths: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the world space box of each path through the ``omni.usd`` context, with the +/-
+    ``engine.FALLBACK_HALF_EXTENT`` box around the world transform of targets that have no extent.
+
+    Args:
+        paths (List[str]): The prim paths.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The box minimums and maximums, both of shape (N, 3).
+    """
+    import omni.usd
+
+    usd_context = omni.usd.get_context()
+
+    mins, maxs = engine.empty_bounds(len(paths))
+    for i, prim_path in enumerate(paths):
+        aab_min, aab_max = usd_context.compute_path_world_bounding_box(prim_path)
+        mins[i], maxs[i] = tuple(aab_min), tuple(aab_max)
+
+    empty = np.flatnonzero(engine.is_empty(mins, maxs))
+    if len(empty):
+        matrices = np.array([usd_context.compute_path_world_transform(paths[i]) for i in empty]).reshape(-1, 4, 4)
+        half_extent = np.full(3, engine.FALLBACK_HALF_EXTENT)
+        mins[empty], maxs[empty] = engine.transform_bounds(-half_extent, half_extent, matrices)
+
+    return mins, maxs
+
+
+def compute_instancer_bounds(
+    point_instancer: UsdGeom.PointInstancer,
+    time: float,
+    indices: Optional[Sequence[int]] = None,
+    bbox_cache: Optional[UsdGeom.BBoxCache] = None,
+    world_xform: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the world space box of the selected instances of ``point_instancer`` in one vectorized pass.
+
+    Only the prototypes are bounded through USD, the instance boxes are their prototype box transformed by the
+    instance transform arrays in NumPy.
+
+    Args:
+        point_instancer (UsdGeom.PointInstancer): The instancer.
+        time (float): The time code.
+        indices (Sequence[int], optional): The selected instance indices, all of the active instances if None.
+        bbox_cache (UsdGeom.BBoxCache, optional): The cache bounding the prototypes. Defaults to a new one.
+        world_xform (np.ndarray, optional): The instancer local to world transform. Defaults to computing it.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The box minimums and maximums of the selected instances, shape (K, 3).
+    """
+    stage = point_instancer.GetPrim().GetStage()
+    time_code = Usd.TimeCode(time)
+    if bbox_cache is None:
+        bbox_cache = UsdGeom.BBoxCache(time_code, [UsdGeom.Tokens.default_, UsdGeom.Tokens.render], True)
+
+    prototypes = [stage.GetPrimAtPath(path) for path in point_instancer.GetPrototypesRel().GetForwardedTargets()]
+    proto_mins, proto_maxs = engine.empty_bounds(len(prototypes))
+    for i, prototype in enumerate(prototypes):
+        if prototype:
+            aligned = bbox_cache.ComputeUntransformedBound(prototype).ComputeAlignedRange()
+            if not aligned.IsEmpty():
+                proto_mins[i], proto_maxs[i] = aligned.GetMin(), aligned.GetMax()
+
+    proto_indices = point_instancer.GetProtoIndicesAttr().Get(time_code)
+    instance_xforms = point_instancer.ComputeInstanceTransformsAtTime(
+        time_code,
+        time_code,
+        UsdGeom.PointInstancer.IncludeProtoXform,
+        UsdGeom.PointInstancer.IgnoreMask,
+    )
+    if world_xform is None:
+        world_xform = np.array(point_instancer.ComputeLocalToWorldTransform(time_code))
+
+    return instancer.instance_world_bounds(
+        proto_mins,
+        proto_maxs,
+        np.array(proto_indices if proto_indices is not None else [], dtype=np.int64),
+        np.array(instance_xforms),
+        world_xform,
+        indices,
+        point_instancer.ComputeMaskAtTime(time_code),
+    )
+
+
+def gather_world_bounds(
+    stage: Usd.Stage,
+    time: float,
+    paths: List[str],
+    use_cache: bool = False,
+    backend: str = BOUNDS_BACKEND_CONTEXT,
+    instance_indices: Optional[Sequence[int]] = None,
+    usd_backend: Optional[UsdBoundsBackend] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the world space box of each path with the selected backend, optionally through the bounds cache.
+
+    Args:
+        stage (Usd.Stage): The stage of the prims.
+        time (float): The current time code.
+        paths (List[str]): The prim paths.
+        use_cache (bool, optional): Serve the boxes from the stage's :class:`BoundsCache`. Defaults to False.
+        backend (str, optional): ``BOUNDS_BACKEND_CONTEXT`` or ``BOUNDS_BACKEND_USD``. Defaults to the context.
+        instance_indices (Sequence[int], optional): Bound ``UsdGeom.PointInstancer`` paths by these instances only,
+            with :func:`compute_instancer_bounds`. Defaults to None, instancers are bounded as a whole.
+        usd_backend (UsdBoundsBackend, optional): Compute with this backend instead of the selected one.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The box minimums and maximums, both of shape (N, 3).
+    """
+    if usd_backend is None and backend == BOUNDS_BACKEND_USD:
+        usd_backend = get_usd_bounds_backend(stage, time)
+    compute = usd_backend.world_bounds if usd_backend is not None else compute_context_bounds
+
+    instancers = {}
+    if instance_indices is not None:
+        for i, path in enumerate(paths):
+            point_instancer = UsdGeom.PointInstancer(stage.GetPrimAtPath(str(path)))
+            if point_instancer:
+                instancers[i] = point_instancer
+
+    other_paths = [path for i, path in enumerate(paths) if i not in instancers] if instancers else paths
+    if use_cache:
+        mins, maxs = get_bounds_cache(stage).world_bounds(other_paths, time, compute)
+    else:
+        mins, maxs = compute(other_paths)
+
+    if not instancers:
+        return mins, maxs
+
+    # Each instancer is given the union of its selected instances
+    all_mins, all_maxs = engine.empty_bounds(len(paths))
+    others = np.array([i for i in range(len(paths)) if i not in instancers], dtype=np.int64)
+    all_mins[others], all_maxs[others] = mins, maxs
+    for i, point_instancer in instancers.items():
+        if usd_backend is not None:
+            instance_mins, instance_maxs = usd_backend.instancer_bounds(point_instancer, instance_indices)
+        else:
+            instance_mins, instance_maxs = compute_instancer_bounds(point_instancer, time, instance_indices)
+        all_mins[i], all_maxs[i] = engine.union_bounds(instance_mins, instance_maxs)
+
+    return all_mins, all_maxs
+
+
+def compute_prim_transforms(prim: Usd.Prim, time: float, backend: str = BOUNDS_BACKEND_CONTEXT):
+    """
+    Return the (local, parent to world, local to world) transforms of ``prim``, or Nones if it isn't imageable.
+
+    Args:
+        prim (Usd.Prim): The prim.
+        time (float): The time code.
+        backend (str, optional): ``BOUNDS_BACKEND_USD`` reuses the shared ``UsdGeom.XformCache``. Defaults to the
+            context backend, which computes the transforms directly.
+    """
+    if backend == BOUNDS_BACKEND_USD and prim.IsA(UsdGeom.Xformable):
+        return get_usd_bounds_backend(prim.GetStage(), time).transforms(prim)
+
+    local_xform, world_xform = None, None
+    xformable = UsdGeom.Xformable(prim)
+    if xformable:
+        local_xform = xformable.GetLocalTransformation(time)
+
+    imageable = UsdGeom.Imageable(prim)
+
+    if imageable:
+        parent_xform = imageable.ComputeParentToWorldTransform(time)
+        if not local_xform:
+            world_xform = imageable.ComputeLocalToWorldTransform(time)
+            local_xform = world_xform * parent_xform.GetInverse()
+        if not world_xform:
+            world_xform = local_xform * parent_xform
+        return local_xform, parent_xform, world_xform
+
+    return None, None, None
@@ -0,0 +1,172 @@
+"""
+Resolved camera handles shared by the camera nodes.
+"""
+import weakref
+from typing import Any, Dict, Optional, Tuple, Union
+
+from pxr import Sdf, Tf, Usd
+
+from o.replicator.addons.scripts.stats import get_cache_counter
+
+CONFORM_SETTING = "/app/hydra/aperture/conform"
+
+_handle_counter = get_cache_counter("camera_handles")
+
+
+def resolve_camera_prim(stage: Usd.Stage, camera_prim_path: Union[str, Sdf.Path]) -> Usd.Prim:
+    """Return the camera prim at ``camera_prim_path``, or the camera under it for Replicator camera xforms."""
+    camera = stage.GetPrimAtPath(str(camera_prim_path))
+
+    if camera and camera.HasAttribute("replicatorXform"):
+        camera = camera.GetChildren()[0]
+
+    return camera
+
+
+class CameraHandle:
+    """
+    A resolved camera prim and the handles of the attributes read on every frame.
+
+    Args:
+        prim (Usd.Prim): The camera prim.
+    """
+
+    __slots__ = (
+        "prim",
+        "path",
+        "horizontal_aperture",
+        "vertical_aperture",
+        "projection",
+        "focal_length",
+        "clipping_range",
+    )
+
+    def __init__(self, prim: Usd.Prim):
+        self.prim = prim
+        self.path = prim.GetPath()
+        self.horizontal_aperture = prim.GetAttribute("horizontalAperture")
+        self.vertical_aperture = prim.GetAttribute("verticalAperture")
+        self.projection = prim.GetAttribute("projection")
+        self.focal_length = prim.GetAttribute("focalLength")
+        self.clipping_range = prim.GetAttribute("clippingRange")
+
+    def read_optics(self, time: float) -> Optional[Tuple[float, float, bool]]:
+        """Return (horizontal aperture, vertical aperture, orthographic), or None if the camera has no aperture."""
+        h_aperture = self.horizontal_aperture
+        v_aperture = self.vertical_aperture
+
+        if not (h_aperture or v_aperture):
+            return None
+
+        if h_aperture and not v_aperture:
+            v_aperture = h_aperture
+        elif v_aperture and not h_aperture:
+            h_aperture = v_aperture
+
+        orthographic = bool(self.projection) and self.projection.Get(time) == "orthographic"
+        return h_aperture.Get(time), v_aperture.Get(time), orthographic
+
+    def read_clipping_range(self, time: float) -> Optional[Tuple[float, float]]:
+        """Return the (near, far) clipping distances, or None if the camera has no clipping range."""
+        clipping_range = self.clipping_range.Get(time) if self.clipping_range else None
+        if clipping_range is None:
+            return None
+        return float(clipping_range[0]), float(clipping_range[1])
+
+
+class CameraHandleCache:
+    """
+    Per node instance cache of camera handles, keyed by the path given to the node.
+
+    Handles are dropped when the stage is replaced, when their prim becomes invalid, or when a resync touches the
+    camera or one of its ancestors.
+    """
+
+    def __init__(self):
+        self._stage: Optional[Usd.Stage] = None
+        self._handles: Dict[str, CameraHandle] = {}
+        self._listener = None
+        self._on_changed = None
+
+    def get(self, stage: Usd.Stage, camera_prim_path: Union[str, Sdf.Path]) -> Optional[CameraHandle]:
+        if stage != self._stage:
+            self._bind(stage)
+
+        key = str(camera_prim_path)
+        handle = self._handles.get(key)
+        if handle is not None and handle.prim.IsValid():
+            _handle_counter.hits += 1
+            return handle
+
+        _handle_counter.misses += 1
+
+        prim = resolve_camera_prim(stage, key) if stage else None
+        if not prim:
+            self._handles.pop(key, None)
+            return None
+
+        handle = self._handles[key] = CameraHandle(prim)
+        return handle
+
+    def clear(self):
+        self._handles.clear()
+
+    def _bind(self, stage: Optional[Usd.Stage]):
+        if self._listener:
+            self._listener.Revoke()
+            self._listener = None
+        self._handles.clear()
+        self._stage = stage
+
+        if stage:
+            this = weakref.ref(self)
+
+            def on_objects_changed(notice, sender):
+                cache = this()
+                if cache is not None:
+                    cache._on_objects_changed(notice)
+
+            # Tf only holds named Python functions weakly, the cache keeps the callback alive
+            self._on_changed = on_objects_changed
+            self._listener = Tf.Notice.Register(Usd.Notice.ObjectsChanged, on_objects_changed, stage)
+
+    def _on_objects_changed(self, notice: Usd.Notice.ObjectsChanged):
+        if not self._handles:
+            return
+
+        resynced = [path.GetPrimPath() for path in notice.GetResyncedPaths()]
+        if not resynced:
+            return
+
+        for key in list(self._handles):
+            handle_paths = (Sdf.Path(key), self._handles[key].path)
+            if any(path.HasPrefix(changed) for changed in resynced for path in handle_paths):
+                del self._handles[key]
+
+
+class _SettingSubscription:
+    """Keeps the value of a carb setting up to date through a change subscription."""
+
+    def __init__(self, path: str):
+        import carb.settings
+
+        self.path = path
+        self._settings = carb.settings.get_settings()
+        self.value: Any = self._settings.get(path)
+        self._subscription = self._settings.subscribe_to_node_change_events(path, self._on_change)
+
+    def _on_change(self, item, event_type):
+        self.value = self._settings.get(self.path)
+
+
+_conform_setting: Optional[_SettingSubscription] = None
+
+
+def get_conform_setting() -> Any:
+    """Return the value of ``/app/hydra/aperture/conform`` without querying carb settings on every call."""
+    global _conform_setting
+
+    if _conform_setting is None:
+        _conform_setting = _SettingSubscription(CONFORM_SETTING)
+
+    return _conform_setting.value
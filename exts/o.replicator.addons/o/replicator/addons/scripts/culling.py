@@ -0,0 +1,99 @@
+"""
+View frustum culling of the targets of the camera nodes.
+
+The frustum of each camera is built from the transforms and optics the framing nodes already read, and every target
+box is tested against all of them in one :func:`~o.replicator.addons.framing.culling.boxes_in_frustums` pass, so
+later per-target work only runs on the targets in view.
+"""
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from pxr import Sdf, Usd
+
+from o.replicator.addons.framing.culling import DEFAULT_CLIPPING_RANGE, boxes_in_frustums, frustum_planes
+from o.replicator.addons.scripts.bounds import BOUNDS_BACKEND_USD, compute_prim_transforms, gather_world_bounds
+from o.replicator.addons.scripts.camera import CameraHandle, resolve_camera_prim
+
+
+def compute_frustum_planes(
+    cameras: Sequence[Optional[CameraHandle]], time: float, backend: str = BOUNDS_BACKEND_USD
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the world space frustum planes of ``cameras``.
+
+    Args:
+        cameras (Sequence[Optional[CameraHandle]]): The cameras, None for missing ones.
+        time (float): The time code.
+        backend (str, optional): The backend of :func:`compute_prim_transforms`. Defaults to "usd".
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The planes of each camera, shape (C, 6, 4), and False for the cameras without
+        a transform or an aperture, whose planes are NaN, shape (C,).
+    """
+    count = len(cameras)
+    valid = np.zeros(count, dtype=bool)
+    local_xforms = np.tile(np.eye(4), (count, 1, 1))
+    parent_xforms = local_xforms.copy()
+    optics = np.ones((count, 3))
+    clipping = np.tile(DEFAULT_CLIPPING_RANGE, (count, 1))
+    orthographic = np.zeros(count, dtype=bool)
+
+    for c, camera in enumerate(cameras):
+        camera_optics = camera.read_optics(time) if camera is not None else None
+        if camera_optics is None:
+            continue
+        local_xform, parent_xform, _ = compute_prim_transforms(camera.prim, time, backend)
+        if local_xform is None:
+            continue
+
+        local_xforms[c], parent_xforms[c] = local_xform, parent_xform
+        h_aperture, v_aperture, orthographic[c] = camera_optics
+        focal_length = camera.focal_length.Get(time) if camera.focal_length else None
+        optics[c] = focal_length or 0.0, h_aperture, v_aperture
+        clipping[c] = camera.read_clipping_range(time) or DEFAULT_CLIPPING_RANGE
+        valid[c] = True
+
+    planes = frustum_planes(
+        local_xforms, parent_xforms, *optics.T, near=clipping[:, 0], far=clipping[:, 1], orthographic=orthographic
+    )
+    planes[~valid] = np.nan
+    return planes, valid
+
+
+def cull_targets(
+    stage: Usd.Stage,
+    camera_paths: Sequence[Union[str, Sdf.Path]],
+    target_paths: Sequence[Union[str, Sdf.Path]],
+    time: float = 0.0,
+    backend: str = BOUNDS_BACKEND_USD,
+    use_cache: bool = False,
+) -> np.ndarray:
+    """
+    Test every target against the frustum of every camera, in one pass.
+
+    Args:
+        stage (Usd.Stage): The stage.
+        camera_paths (Sequence[Union[str, Sdf.Path]]): The cameras, or the Replicator camera Xforms above them.
+        target_paths (Sequence[Union[str, Sdf.Path]]): The targets.
+        time (float, optional): The time code. Defaults to 0.
+        backend (str, optional): How the target bounds and camera transforms are computed, see
+            :func:`gather_world_bounds`. Defaults to "usd".
+        use_cache (bool, optional): Serve the target boxes from the bounds cache. Defaults to False.
+
+    Returns:
+        np.ndarray: True where a target may be in view of a camera, shape (C, T). Missing cameras see nothing.
+    """
+    cameras = []
+    for path in camera_paths:
+        prim = resolve_camera_prim(stage, path)
+        cameras.append(CameraHandle(prim) if prim else None)
+
+    planes, _ = compute_frustum_planes(cameras, time, backend)
+    mins, maxs = gather_world_bounds(stage, time, [str(path) for path in target_paths], use_cache, backend)
+    return boxes_in_frustums(mins, maxs, planes)
+
+
+def visible_targets(target_paths: Sequence[Union[str, Sdf.Path]], in_view: np.ndarray) -> Tuple[List[str], np.ndarray]:
+    """Return the targets in view of at least one camera of ``in_view`` from :func:`cull_targets`, and their mask."""
+    visible = np.any(in_view, axis=0) if in_view.ndim == 2 else np.asarray(in_view, dtype=bool)
+    return [str(path) for path, kept in zip(target_paths, visible) if kept], visible
@@ -0,0 +1,148 @@
+"""
+Batched construction of the OmniGraph nodes of the ``rep.modify`` functions.
+
+Outside of a batch, :func:`set_input` sets a node input and syncs it to USD right away. Inside
+:func:`batch_graph_edits`, the input values are kept until the outermost batch exits and are then synced to USD
+together, in one ``Sdf.ChangeBlock``, so building thousands of nodes sends one change notice instead of one per
+input. Each node type also gets a template of its input defaults, read from the first node of that type built,
+and inputs set to their default value on a node built in the current batch are skipped.
+"""
+
+import contextlib
+from typing import Any, Dict, Iterator, Set, Tuple
+
+import numpy as np
+import omni.graph.core as og
+from pxr import Sdf
+
+_MISSING = object()
+
+# Node type name -> input name -> default value
+_templates: Dict[str, Dict[str, Any]] = {}
+# (node prim path, input name) -> (attribute, value), a later set of the same input replaces the earlier one
+_pending: Dict[Tuple[str, str], Tuple[og.Attribute, Any]] = {}
+# Prim paths of the nodes built in the current batch, their inputs still have the template values
+_new_nodes: Set[str] = set()
+_depth = 0
+_counts = {"batches": 0, "deferred": 0, "skipped": 0, "synced": 0}
+
+
+def get_node_template(node: og.Node) -> Dict[str, Any]:
+    """
+    Return the default input values of the type of ``node``.
+
+    The template is read from ``node`` the first time a node of its type is seen, so that node must not have any
+    input set yet, see :func:`new_node`.
+    """
+    type_name = node.get_type_name()
+    template = _templates.get(type_name)
+    if template is None:
+        template = _templates[type_name] = {}
+        for attribute in node.get_attributes():
+            name = attribute.get_name()
+            if name.startswith("inputs:"):
+                try:
+                    template[name] = og.AttributeValueHelper(attribute).get()
+                except Exception:
+                    # Inputs without a readable value, e.g. execution or bundle inputs, are always set
+                    pass
+    return template
+
+
+def _equal(value: Any, default: Any) -> bool:
+    if default is _MISSING or default is None:
+        return False
+    try:
+        return bool(np.array_equal(np.asarray(value), np.asarray(default)))
+    except (TypeError, ValueError):
+        return False
+
+
+def new_node(node: og.Node) -> og.Node:
+    """
+    Register ``node`` as just created, before any of its inputs is set.
+
+    Args:
+        node (og.Node): The new node.
+
+    Returns:
+        og.Node: ``node``.
+    """
+    template = get_node_template(node)
+    if _depth and template:
+        _new_nodes.add(str(node.get_prim_path()))
+    return node
+
+
+def set_input(node: og.Node, name: str, value: Any):
+    """
+    Set the input ``name`` of ``node`` to ``value``, deferring its USD sync inside a batch.
+
+    Args:
+        node (og.Node): The node.
+        name (str): The input name, with its ``inputs:`` prefix.
+        value (Any): The value.
+    """
+    attribute = node.get_attribute(name)
+    if not _depth:
+        og.AttributeValueHelper(attribute).set(value, update_usd=True)
+        return
+
+    key = (str(node.get_prim_path()), name)
+    if (
+        key[0] in _new_nodes
+        and key not in _pending
+        and _equal(value, _templates[node.get_type_name()].get(name, _MISSING))
+    ):
+        _counts["skipped"] += 1
+        return
+
+    _pending[key] = (attribute, value)
+    _counts["deferred"] += 1
+
+
+def flush_graph_edits():
+    """Set and sync to USD the inputs deferred so far, in one change block."""
+    pending = list(_pending.values())
+    _pending.clear()
+    _new_nodes.clear()
+    if not pending:
+        return
+
+    with Sdf.ChangeBlock():
+        for attribute, value in pending:
+            og.AttributeValueHelper(attribute).set(value, update_usd=True)
+    _counts["synced"] += len(pending)
+
+
+@contextlib.contextmanager
+def batch_graph_edits() -> Iterator[None]:
+    """
+    Defer the input sets of the nodes built in the ``with`` block and sync them to USD once when it exits.
+
+    Batches can be nested, the inputs are synced when the outermost one exits.
+
+    Example:
+        >>> import omni.replicator.core as rep
+        >>> import o.replicator.addons as addons
+        >>> with addons.batch_graph_edits():
+        ...     for camera in cameras:
+        ...         with camera:
+        ...             rep.modify.focus(focus_on=target, zoom=2.0)
+    """
+    global _depth
+
+    _depth += 1
+    if _depth == 1:
+        _counts["batches"] += 1
+    try:
+        yield
+    finally:
+        _depth -= 1
+        if not _depth:
+            flush_graph_edits()
+
+
+def graph_edit_counts() -> Dict[str, int]:
+    """Return the number of batches and of deferred, skipped and synced input sets so far."""
+    return dict(_counts)
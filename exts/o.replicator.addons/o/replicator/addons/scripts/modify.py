@@ -1,5 +1,5 @@
 import sys
-from typing import Any, Callable, List, Optional, Tuple, Union
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
 
 import carb
 import numpy as np
@@ -14,23 +14,66 @@ from omni.replicator.core.utils import ReplicatorItem, ReplicatorWrapper, create
 
 import omni.replicator.core as rep
 
+from .planning import FocalLengthPlan
+from .query import TargetQuery
+from .graph import batch_graph_edits, new_node, set_input
 from .utils import _set_node_input
 
 
 @ReplicatorWrapper
+@batch_graph_edits()
 def focus(
-    focus_on: Union[ReplicatorItem, str, Sdf.Path, usdrt.Sdf.Path, List[Union[str, Sdf.Path, usdrt.Sdf.Path]]],
+    focus_on: Union[
+        ReplicatorItem, TargetQuery, str, Sdf.Path, usdrt.Sdf.Path, List[Union[str, Sdf.Path, usdrt.Sdf.Path]]
+    ],
     zoom: Union[ReplicatorItem, float] = 2.0,
     use_horizontal_fov: bool = True,
     conform: Union[int, str] = None,
     input_prims: Union[ReplicatorItem, List[str]] = None,
+    backend: str = "usd",
+    write_back: bool = False,
+    instance_indices: Union[ReplicatorItem, List[int]] = None,
+    skip_unchanged: bool = False,
+    prefetch: bool = False,
+    prefetch_time_step: float = 1.0,
+    record_mode: str = "off",
+    record_path: str = "",
+    coverage: Optional[Tuple[float, float]] = None,
+    min_visibility: Optional[float] = None,
+    visibility_samples: int = 3,
 ) -> ReplicatorItem:
     """Modify the focal length of the camera specified in ``input_prims`` to focus at the specified target.
 
     Args:
         target: The target to orient towards. If multiple prims are set, the target point will be the mean of their
-            positions.
+            positions. A ``TargetQuery`` selects the targets by semantic label or path pattern from an index kept up
+            to date from USD change notices, instead of traversing the stage like ``rep.get.prims``.
         input_prims: The prims to be modified. If using ``with`` syntax, this argument can be omitted.
+        backend: "usd" to author the focal length on the stage, "fabric" to write it straight to Fabric from the
+            focal length node, skipping USD authoring and change notification.
+        write_back: With the "fabric" backend, author the last focal length to USD when
+            ``o.replicator.addons.flush_attribute_stores()`` is called at the end of the run.
+        instance_indices: Only frame these instances of the ``UsdGeom.PointInstancer`` targets. By default an
+            instancer is framed as a whole.
+        skip_unchanged: Reuse the last focal length, without solving or writing it, on frames where neither the
+            camera nor the targets changed. Targets must be moved through USD for their changes to be seen. The focal
+            length node then writes the focal length itself, so skipped frames author nothing.
+        prefetch: Gather the camera transforms and target bounds of the next frame on a worker thread while the
+            current frame renders. The focal length node then writes the focal length itself, under the lock held by
+            the worker. Only use it when the cameras and targets aren't authored by other nodes during the run, e.g.
+            when they are time-sampled. Poses drawn by ``rep.modify.pose`` invalidate every prefetch, the node turns
+            prefetch off with a warning after two frames in a row.
+        prefetch_time_step: The time codes the timeline advances by between two frames, 0 if it doesn't advance.
+        record_mode: "record" to append the focal length of every frame to the recording in ``record_path``,
+            "replay" to use the recorded focal lengths instead of solving them.
+        record_path: The recording directory, see ``o.replicator.addons.FramingRecording``.
+        coverage: A (min, max) fraction of the frame area for the targets to cover. The focal length is then solved
+            in closed form from the projected corners of the target boxes, aiming at the middle of the range without
+            clipping the targets, and ``zoom`` is ignored. Frames where the range can't be met keep the focal length
+            and disable the node ``execOut``, so they can be skipped before rendering.
+        min_visibility: Check after the focal length is written that the camera sees at least this fraction of the
+            targets, see :func:`check_visibility`. Occluded frames disable its ``execOut``.
+        visibility_samples: The points sampled per axis in each target box by the visibility check.
 
     Example:
         >>> import omni.replicator.core as rep
@@ -42,28 +85,342 @@ def focus(
         ...     )
         omni.replicator.core.modify._look_at
     """
+    # Prefetch jobs read the stage under STAGE_LOCK, only the writes of the focal length node itself hold it, and
+    # only the node knows when a skipped solve has nothing to write
+    self_write = backend != "usd" or prefetch or skip_unchanged
+    if self_write and min_visibility is None:
+        return _focus_on(
+            target=focus_on,
+            zoom=zoom,
+            use_horizontal_fov=use_horizontal_fov,
+            set_focal_length=True,
+            conform=conform,
+            input_prims=input_prims,
+            write_backend=backend,
+            write_back=write_back,
+            instance_indices=instance_indices,
+            skip_unchanged=skip_unchanged,
+            prefetch=prefetch,
+            prefetch_time_step=prefetch_time_step,
+            record_mode=record_mode,
+            record_path=record_path,
+            coverage=coverage,
+        )
+
     with sequential():
         calc_node = _focus_on(
             target=focus_on,
             zoom=zoom,
             use_horizontal_fov=use_horizontal_fov,
-            set_focal_length=False,
+            set_focal_length=self_write,
             conform=conform,
-            input_prims=input_prims
+            input_prims=input_prims,
+            write_backend=backend if self_write else None,
+            write_back=write_back,
+            instance_indices=instance_indices,
+            skip_unchanged=skip_unchanged,
+            prefetch=prefetch,
+            prefetch_time_step=prefetch_time_step,
+            record_mode=record_mode,
+            record_path=record_path,
+            coverage=coverage,
             )
         
-        write_node = rep.modify.attribute(
-            name="focalLength",
-            value=calc_node,
-            attribute_type="float",
-            input_prims=input_prims,
-        )
+        if not self_write:
+            write_node = rep.modify.attribute(
+                name="focalLength",
+                value=calc_node,
+                attribute_type="float",
+                input_prims=input_prims,
+            )
+
+        if min_visibility is not None:
+            check_visibility(
+                focus_on, min_visibility=min_visibility, samples=visibility_samples, input_prims=input_prims
+            )
+
+
+@ReplicatorWrapper
+@batch_graph_edits()
+def check_visibility(
+    targets: Union[
+        ReplicatorItem, TargetQuery, str, Sdf.Path, usdrt.Sdf.Path, List[Union[str, Sdf.Path, usdrt.Sdf.Path]]
+    ],
+    min_visibility: float = 0.5,
+    samples: int = 3,
+    input_prims: Union[ReplicatorItem, List[str]] = None,
+) -> ReplicatorItem:
+    """Check on the CPU that the cameras specified in ``input_prims`` see the targets, before rendering the frame.
+
+    Rays are cast from each camera to points sampled in the target boxes, against the boxes of the stage geometry
+    kept in a bounding volume hierarchy refit from USD change notices. The node ``execOut`` is disabled on frames
+    where a camera sees less than ``min_visibility`` of the sample points, so downstream nodes can skip them.
+
+    Args:
+        targets: The prims that must be visible. A ``TargetQuery`` selects them by semantic label or path pattern.
+        min_visibility: The smallest visible fraction of the sample points, for every camera.
+        samples: The points sampled per axis in each target box.
+        input_prims: The cameras to check. If using ``with`` syntax, this argument can be omitted.
+
+    Example:
+        >>> import omni.replicator.core as rep
+        >>> target = rep.create.sphere()
+        >>> with rep.create.camera(position=(500, 200, 500), look_at=target):
+        ...     rep.modify.check_visibility(target, min_visibility=0.8)
+    """
+    node = new_node(create_node("o.replicator.addons.CheckVisibility"))
+
+    _set_targets(node, targets)
+    set_input(node, "inputs:minVisibility", min_visibility)
+    set_input(node, "inputs:samples", samples)
+
+    if input_prims:
+        set_target_prims(node, "inputs:prims", input_prims)
+
+    return node
 
 
 @ReplicatorWrapper
+@batch_graph_edits()
+def cull(
+    targets: Union[
+        ReplicatorItem, TargetQuery, str, Sdf.Path, usdrt.Sdf.Path, List[Union[str, Sdf.Path, usdrt.Sdf.Path]]
+    ],
+    input_prims: Union[ReplicatorItem, List[str]] = None,
+    bounds_backend: str = "context",
+    use_bounds_cache: bool = False,
+) -> ReplicatorItem:
+    """Keep the targets in view of the cameras specified in ``input_prims``.
+
+    Every target box is tested against the frustum of every camera in one vectorized pass. The node ``outputs:prims``
+    holds the targets in view and can be passed as the targets of the framing functions or of later per-target work,
+    and its ``execOut`` is disabled on frames where no target is in view.
+
+    Args:
+        targets: The prims to cull. A ``TargetQuery`` selects them by semantic label or path pattern.
+        input_prims: The cameras. If using ``with`` syntax, this argument can be omitted.
+        bounds_backend: "context" to compute the target boxes through the ``omni.usd`` context, "usd" to share one
+            ``UsdGeom.BBoxCache`` and ``UsdGeom.XformCache`` per time code.
+        use_bounds_cache: Serve the target boxes from the cache invalidated by USD change notices.
+
+    Example:
+        >>> import omni.replicator.core as rep
+        >>> spheres = rep.create.sphere(count=100, position=rep.distribution.uniform((-500,) * 3, (500,) * 3))
+        >>> with rep.create.camera(position=(0, 0, 1000)):
+        ...     in_view = rep.modify.cull(spheres)
+        ...     rep.modify.focus(focus_on=in_view)
+    """
+    node = new_node(create_node("o.replicator.addons.CullTargets"))
+
+    _set_targets(node, targets)
+    set_input(node, "inputs:boundsBackend", bounds_backend)
+
+    if use_bounds_cache:
+        set_input(node, "inputs:useBoundsCache", use_bounds_cache)
+
+    if input_prims:
+        set_target_prims(node, "inputs:prims", input_prims)
+
+    return node
+
+
+@ReplicatorWrapper
+def focus_pairs(
+    cameras: Sequence[Union[str, Sdf.Path, usdrt.Sdf.Path]],
+    targets: Sequence[Union[str, Sdf.Path, usdrt.Sdf.Path, Sequence[Union[str, Sdf.Path, usdrt.Sdf.Path]]]],
+    zoom: Union[float, Sequence[float], np.ndarray] = 2.0,
+    use_horizontal_fov: bool = True,
+    conform: Union[int, str] = None,
+    backend: str = "usd",
+    write_back: bool = False,
+    instance_indices: Union[ReplicatorItem, List[int]] = None,
+    skip_unchanged: bool = False,
+    prefetch: bool = False,
+    prefetch_time_step: float = 1.0,
+    record_mode: str = "off",
+    record_path: str = "",
+    coverage: Optional[Tuple[float, float]] = None,
+) -> ReplicatorItem:
+    """Modify the focal length of each camera of ``cameras`` to focus at its own targets, with one node for all pairs.
+
+    The bounds of every pair are gathered in one pass and all the focal lengths are solved in one batch, so the graph
+    size and the per-frame node dispatch don't grow with the number of pairs. The node writes the focal lengths
+    itself, with the ``backend`` write backend.
+
+    Args:
+        cameras: The camera prims, one per pair, each camera in a single pair.
+        targets: The targets of each camera, a prim path or a list of prim paths per pair. Pairs can share targets.
+        zoom: Zoom factor, shared by all the pairs or one per pair.
+        backend: "usd" to author the focal lengths on the stage, "fabric" to write them straight to Fabric.
+        write_back: With the "fabric" backend, author the last focal lengths to USD when
+            ``o.replicator.addons.flush_attribute_stores()`` is called at the end of the run.
+        use_horizontal_fov, conform, instance_indices, skip_unchanged, prefetch, prefetch_time_step, record_mode,
+            record_path, coverage: See :func:`focus`, they apply to every pair.
+
+    Example:
+        >>> import omni.replicator.core as rep
+        >>> cameras = [rep.create.camera(position=(i * 100, 200, 500)) for i in range(3)]
+        >>> spheres = [rep.create.sphere(position=(i * 100, 0, 0)) for i in range(3)]
+        >>> camera_paths = [camera.get_output_prims()["prims"][0] for camera in cameras]
+        >>> sphere_paths = [sphere.get_output_prims()["prims"][0] for sphere in spheres]
+        >>> with rep.trigger.on_frame():
+        ...     rep.modify.focus_pairs(camera_paths, sphere_paths, zoom=[1.5, 2.0, 2.5])
+    """
+    camera_paths = [str(camera) for camera in cameras]
+    target_sets = [
+        [str(target)] if isinstance(target, (str, Sdf.Path, usdrt.Sdf.Path)) else [str(path) for path in target]
+        for target in targets
+    ]
+    if len(target_sets) != len(camera_paths):
+        raise ValueError(f"Got {len(target_sets)} target sets for {len(camera_paths)} cameras")
+
+    if len(set(camera_paths)) != len(camera_paths):
+        raise ValueError("focus_pairs needs distinct cameras, a camera has a single focal length")
+
+    # A relationship holds each prim once, pairs refer to their targets by index into the distinct paths
+    target_paths = list(dict.fromkeys(path for target_set in target_sets for path in target_set))
+    if not target_paths:
+        raise ValueError("focus_pairs needs at least one target")
+    target_indices = {path: index for index, path in enumerate(target_paths)}
+
+    if np.ndim(zoom):
+        if len(zoom) != len(camera_paths):
+            raise ValueError(f"Got {len(zoom)} zooms for {len(camera_paths)} cameras")
+        zoom = [float(value) for value in zoom]
+
+    return _focus_on(
+        target=target_paths,
+        zoom=zoom,
+        use_horizontal_fov=use_horizontal_fov,
+        set_focal_length=True,
+        conform=conform,
+        input_prims=camera_paths,
+        write_backend=backend,
+        write_back=write_back,
+        instance_indices=instance_indices,
+        skip_unchanged=skip_unchanged,
+        prefetch=prefetch,
+        prefetch_time_step=prefetch_time_step,
+        record_mode=record_mode,
+        record_path=record_path,
+        coverage=coverage,
+        target_counts=[len(target_set) for target_set in target_sets],
+        target_indices=[target_indices[path] for target_set in target_sets for path in target_set],
+    )
+
+
+@ReplicatorWrapper
+@batch_graph_edits()
+def frame(
+    look_at: Union[
+        ReplicatorItem, TargetQuery, str, Sdf.Path, usdrt.Sdf.Path, List[Union[str, Sdf.Path, usdrt.Sdf.Path]]
+    ],
+    zoom: Union[ReplicatorItem, float] = 2.0,
+    up_axis: Tuple[float, float, float] = (0.0, 1.0, 0.0),
+    use_horizontal_fov: bool = True,
+    conform: Union[int, str] = None,
+    input_prims: Union[ReplicatorItem, List[str]] = None,
+    instance_indices: Union[ReplicatorItem, List[int]] = None,
+) -> ReplicatorItem:
+    """Orient the cameras specified in ``input_prims`` towards the target and set their focal length to frame it.
+
+    This is the fused equivalent of ``rep.modify.pose(look_at=...)`` followed by ``rep.modify.focus(...)``: a single
+    node computes the orientation and the focal length from one pass over the target bounds.
+
+    Args:
+        look_at: The target to orient towards and frame. If multiple prims are set, their combined bounds are used.
+            A ``TargetQuery`` selects the targets by semantic label or path pattern.
+        zoom: Zoom factor of the framing.
+        up_axis: The up axis used to orient the cameras.
+        input_prims: The prims to be modified. If using ``with`` syntax, this argument can be omitted.
+        instance_indices: Only frame these instances of the ``UsdGeom.PointInstancer`` targets. By default an
+            instancer is framed as a whole.
+
+    Example:
+        >>> import omni.replicator.core as rep
+        >>> target = rep.create.sphere()
+        >>> with rep.create.camera(position=(500, 200, 500)):
+        ...     rep.modify.frame(
+        ...         look_at=target,
+        ...         zoom=rep.distribution.uniform(2, 4)
+        ...     )
+    """
+    node = new_node(create_node("o.replicator.addons.FrameCamera"))
+
+    if isinstance(zoom, ReplicatorItem):
+        if zoom.node.get_attribute_exists("inputs:numSamples"):
+            set_input(zoom.node, "inputs:numSamples", 1)
+        utils.auto_connect(zoom.node, node, mapping=[utils.AttrMap("outputs:samples", "inputs:zoom")])
+    elif isinstance(zoom, (int, float)):
+        set_input(node, "inputs:zoom", zoom)
+    elif zoom is not None:
+        raise ValueError(f"The type of `zoom` must be either float or int, but got {type(zoom)}.")
+
+    set_input(node, "inputs:upAxis", up_axis)
+    set_input(node, "inputs:useHorizontalFov", use_horizontal_fov)
+
+    _set_targets(node, look_at)
+    _set_instance_indices(node, instance_indices)
+
+    if conform:
+        set_input(node, "inputs:conform", conform)
+
+    if input_prims:
+        set_target_prims(node, "inputs:prims", input_prims)
+
+    return node
+
+
+@ReplicatorWrapper
+def focus_plan(
+    plan: Union[FocalLengthPlan, str],
+    set_pose: bool = True,
+) -> ReplicatorItem:
+    """Apply a pre-planned focal length schedule, one plan frame per trigger.
+
+    The focal lengths, and the poses when the plan has them, are fed through ``sequence`` distributions so no framing
+    is solved while the graph runs.
+
+    Args:
+        plan: A ``FocalLengthPlan`` from ``o.replicator.addons.plan_focal_lengths``, or the path of a saved plan.
+        set_pose: Also apply the planned camera positions and rotations. Defaults to True.
+
+    Example:
+        >>> import omni.replicator.core as rep
+        >>> import o.replicator.addons as addons
+        >>> camera = rep.create.camera(position=(500, 200, 500))
+        >>> plan = addons.plan_focal_lengths(
+        ...     camera.get_output_prims()["prims"], ["/Replicator/Sphere_Xform"], 100, zoom=(2, 4), seed=7
+        ... )
+        >>> with rep.trigger.on_frame(num_frames=plan.num_frames):
+        ...     rep.modify.focus_plan(plan)
+    """
+    if isinstance(plan, str):
+        plan = FocalLengthPlan.load(plan)
+
+    with sequential():
+        for c, camera_path in enumerate(plan.camera_paths):
+            if set_pose and plan.rotations is not None:
+                rep.modify.pose(
+                    position=sequence([tuple(position) for position in plan.positions[:, c].tolist()]),
+                    rotation=sequence([tuple(rotation) for rotation in plan.rotations[:, c].tolist()]),
+                    input_prims=[camera_path],
+                )
+
+            rep.modify.attribute(
+                name="focalLength",
+                value=sequence(plan.focal_lengths[:, c].tolist()),
+                attribute_type="float",
+                input_prims=[camera_path],
+            )
+
+
+@ReplicatorWrapper
+@batch_graph_edits()
 def _focus_on(
     target: Union[
         ReplicatorItem,
+        TargetQuery,
         str,
         Sdf.Path,
         usdrt.Sdf.Path,
@@ -74,16 +431,30 @@ def _focus_on(
     use_horizontal_fov: bool = True,
     conform: Union[int, str] = None,
     input_prims: Union[ReplicatorItem, List[str]] = None,
+    write_backend: Optional[str] = None,
+    write_back: bool = False,
+    instance_indices: Union[ReplicatorItem, List[int]] = None,
+    skip_unchanged: bool = False,
+    prefetch: bool = False,
+    prefetch_time_step: float = 1.0,
+    record_mode: str = "off",
+    record_path: str = "",
+    coverage: Optional[Tuple[float, float]] = None,
+    target_counts: Optional[List[int]] = None,
+    target_indices: Optional[List[int]] = None,
 ) -> ReplicatorItem:
-    node = create_node("o.replicator.addons.CalculateFocalLength")
+    node = new_node(create_node("o.replicator.addons.CalculateFocalLength"))
 
     if isinstance(zoom, ReplicatorItem):
         if zoom.node.get_attribute_exists("inputs:numSamples"):
-            og.AttributeValueHelper(zoom.node.get_attribute("inputs:numSamples")).set(1, update_usd=True)
+            set_input(zoom.node, "inputs:numSamples", 1)
         utils.auto_connect(zoom.node, node, mapping=[utils.AttrMap("outputs:samples", "inputs:zoom")])
     else:
         if isinstance(zoom, (int, float)):
-            og.AttributeValueHelper(node.get_attribute("inputs:zoom")).set(zoom, update_usd=True)
+            set_input(node, "inputs:zoom", zoom)
+        elif isinstance(zoom, (list, tuple, np.ndarray)):
+            # One zoom per camera, read in place of inputs:zoom
+            set_input(node, "inputs:zooms", [float(value) for value in zoom])
         elif zoom is None:
             pass
         else:
@@ -91,11 +462,11 @@ def _focus_on(
 
     if isinstance(set_focal_length, ReplicatorItem):
         if set_focal_length.node.get_attribute_exists("inputs:numSamples"):
-            og.AttributeValueHelper(set_focal_length.node.get_attribute("inputs:numSamples")).set(1, update_usd=True)
+            set_input(set_focal_length.node, "inputs:numSamples", 1)
         utils.auto_connect(set_focal_length.node, node, mapping=[utils.AttrMap("outputs:samples", "inputs:setFocalLength")])
     else:
         if isinstance(set_focal_length, (int, bool)):
-            og.AttributeValueHelper(node.get_attribute("inputs:setFocalLength")).set(set_focal_length, update_usd=True)
+            set_input(node, "inputs:setFocalLength", set_focal_length)
         elif set_focal_length is None:
             pass
         else:
@@ -103,21 +474,45 @@ def _focus_on(
 
     if isinstance(use_horizontal_fov, ReplicatorItem):
         if use_horizontal_fov.node.get_attribute_exists("inputs:numSamples"):
-            og.AttributeValueHelper(use_horizontal_fov.node.get_attribute("inputs:numSamples")).set(1, update_usd=True)
+            set_input(use_horizontal_fov.node, "inputs:numSamples", 1)
         utils.auto_connect(use_horizontal_fov.node, node, mapping=[utils.AttrMap("outputs:samples", "inputs:useHorizontalFov")])
     else:
         if isinstance(use_horizontal_fov, (int, bool)):
-            og.AttributeValueHelper(node.get_attribute("inputs:useHorizontalFov")).set(use_horizontal_fov, update_usd=True)
+            set_input(node, "inputs:useHorizontalFov", use_horizontal_fov)
         elif use_horizontal_fov is None:
             pass
         else:
             raise ValueError(f"The type of `use_horizontal_fov` must be bool, but got {type(use_horizontal_fov)}.")
 
-    _set_node_input(node, "inputs:targetPrim", target)
+    _set_targets(node, target)
+    _set_instance_indices(node, instance_indices)
+
+    if target_counts is not None:
+        set_input(node, "inputs:targetCounts", [int(count) for count in target_counts])
+    if target_indices is not None:
+        set_input(node, "inputs:targetIndices", [int(index) for index in target_indices])
+
+    if coverage is not None:
+        set_input(node, "inputs:coverage", [float(value) for value in coverage])
 
     if conform:
         _set_node_input(node, "inputs:conform", conform)
 
+    if skip_unchanged:
+        set_input(node, "inputs:skipUnchanged", skip_unchanged)
+
+    if prefetch:
+        set_input(node, "inputs:prefetch", prefetch)
+        set_input(node, "inputs:prefetchTimeStep", prefetch_time_step)
+
+    if record_mode != "off":
+        set_input(node, "inputs:recordMode", record_mode)
+        set_input(node, "inputs:recordPath", record_path)
+
+    if write_backend:
+        set_input(node, "inputs:writeBackend", write_backend)
+        set_input(node, "inputs:fabricWriteBack", write_back)
+
     # Target is the prim(s) to focus on
     # input_prims is the camera to modify
 
@@ -125,3 +520,23 @@ def _focus_on(
         set_target_prims(node, "inputs:prims", input_prims)
 
     return node
+
+
+def _set_targets(node: og.Node, targets: Any):
+    if isinstance(targets, TargetQuery):
+        set_input(node, "inputs:targetQuery", targets.to_json())
+    else:
+        _set_node_input(node, "inputs:targetPrim", targets)
+
+
+def _set_instance_indices(node: og.Node, instance_indices: Union[ReplicatorItem, List[int], None]):
+    if instance_indices is None:
+        return
+
+    if isinstance(instance_indices, ReplicatorItem):
+        utils.auto_connect(
+            instance_indices.node, node, mapping=[utils.AttrMap("outputs:samples", "inputs:instanceIndices")]
+        )
+    else:
+        indices = [int(index) for index in instance_indices]
+        set_input(node, "inputs:instanceIndices", indices)
@@ -0,0 +1,268 @@
+"""
+Occlusion pre-check of the targets framed by a camera, before rendering.
+
+The world boxes of the geometry of a stage are kept in a per stage :class:`OccluderIndex`, a
+:class:`~o.replicator.addons.framing.occlusion.BoxHierarchy` built with one traversal and then refit in place: the
+boxes of the prims changed through USD are refit from ``Usd.Notice.ObjectsChanged``, and moving to another time code
+only refits the prims whose transform or extent is time-varying. A stage only has to be traversed again when prims
+are added or removed.
+"""
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+from pxr import Sdf, Tf, Usd, UsdGeom
+
+from o.replicator.addons.framing import engine
+from o.replicator.addons.framing.occlusion import BoxHierarchy, box_samples
+from o.replicator.addons.scripts.bounds import UsdBoundsBackend
+from o.replicator.addons.scripts.camera import resolve_camera_prim
+from o.replicator.addons.scripts.stats import register_cache
+from o.replicator.addons.scripts.tracking import changed_prim_paths
+
+
+class OccluderIndex:
+    """
+    The world boxes of the Gprims of a stage in a bounding volume hierarchy, maintained from change notices.
+
+    Boxes are computed with the default and render purposes, guides and proxies never occlude. The prototypes of
+    ``UsdGeom.PointInstancer`` prims are skipped, their instances are not occluders.
+
+    Args:
+        stage (Usd.Stage): The stage to index.
+        time (float, optional): The time code of the first build. Defaults to 0.
+        leaf_size (int, optional): The boxes per leaf of the hierarchy. Defaults to 8.
+    """
+
+    def __init__(self, stage: Usd.Stage, time: float = 0.0, leaf_size: int = 8):
+        self.stage = stage
+        self.leaf_size = leaf_size
+        self.backend = UsdBoundsBackend(stage, time, listen=False)
+        # Updates served by the current hierarchy, refit or not, and the ones that had to build it
+        self.hits = 0
+        self.builds = 0
+        self.refits = 0
+        self.refit_boxes = 0
+        # Incremented every time the boxes change
+        self.version = 0
+        # The indexed prim paths, sorted
+        self.paths: List[str] = []
+        self.hierarchy: Optional[BoxHierarchy] = None
+        self._animated = np.zeros(0, dtype=np.int64)
+        self._stale = True
+        self._dirty: Set[Sdf.Path] = set()
+        self._listener = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self._on_objects_changed, stage)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def revoke(self):
+        """Stop listening to the stage and drop the index."""
+        if self._listener:
+            self._listener.Revoke()
+            self._listener = None
+        self.paths = []
+        self.hierarchy = None
+        self._stale = True
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.builds
+        return {
+            "size": len(self.paths),
+            "animated": len(self._animated),
+            "hits": self.hits,
+            "misses": self.builds,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "builds": self.builds,
+            "refits": self.refits,
+            "refit_boxes": self.refit_boxes,
+        }
+
+    def update(self, time: float) -> BoxHierarchy:
+        """
+        Return the hierarchy of the boxes at ``time``, rebuilt or refit from the changes since the last update.
+
+        Args:
+            time (float): The time code.
+
+        Returns:
+            BoxHierarchy: The hierarchy, its box indices are the indices of :attr:`paths`.
+        """
+        if self._stale:
+            self.backend.set_time(time)
+            self._build()
+            return self.hierarchy
+
+        self.hits += 1
+        indices = self.indices_under(self._dirty)
+        self._dirty.clear()
+        if len(indices):
+            # Authoring time samples on a prim makes it animated
+            static = np.setdiff1d(self._animated, indices)
+            self._animated = np.union1d(static, indices[self._might_vary(indices)])
+        if time != self.backend.time:
+            self.backend.set_time(time)
+            indices = np.union1d(indices, self._animated)
+
+        if len(indices):
+            mins, maxs = self._compute_bounds(indices)
+            self.hierarchy.refit(indices, mins, maxs)
+            self.refits += 1
+            self.refit_boxes += len(indices)
+            self.version += 1
+
+        return self.hierarchy
+
+    def indices_under(self, paths: Iterable[Union[str, Sdf.Path]]) -> np.ndarray:
+        """Return the sorted indices of the indexed prims at or below ``paths``."""
+        indices = []
+        for path in paths:
+            path = str(path)
+            if path == "/":
+                return np.arange(len(self.paths))
+            # Descendant paths sort between "<path>/" and "<path>0", the character after "/"
+            start = bisect_left(self.paths, path)
+            end = bisect_left(self.paths, path + "0", start)
+            indices.extend(
+                index
+                for index in range(start, end)
+                if len(self.paths[index]) == len(path) or self.paths[index][len(path)] == "/"
+            )
+        return np.unique(np.array(indices, dtype=np.int64))
+
+    def _compute_bounds(self, indices: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        mins, maxs = engine.empty_bounds(len(indices))
+        for i, index in enumerate(indices):
+            prim = self.stage.GetPrimAtPath(self.paths[index])
+            if prim:
+                aligned = self.backend.bbox_cache.ComputeWorldBound(prim).ComputeAlignedRange()
+                if not aligned.IsEmpty():
+                    mins[i], maxs[i] = aligned.GetMin(), aligned.GetMax()
+        return mins, maxs
+
+    def _might_vary(self, indices: Sequence[int]) -> np.ndarray:
+        """Return whether the transform or the extent of each indexed prim might be time-varying."""
+        varying_transforms: Dict[Sdf.Path, bool] = {}
+
+        def transform_might_vary(prim: Usd.Prim) -> bool:
+            path = prim.GetPath()
+            varying = varying_transforms.get(path)
+            if varying is None:
+                parent = prim.GetParent()
+                xformable = UsdGeom.Xformable(prim)
+                varying = (bool(xformable) and xformable.TransformMightBeTimeVarying()) or (
+                    bool(parent) and not parent.IsPseudoRoot() and transform_might_vary(parent)
+                )
+                varying_transforms[path] = varying
+            return varying
+
+        varying = np.zeros(len(indices), dtype=bool)
+        for i, index in enumerate(indices):
+            prim = self.stage.GetPrimAtPath(self.paths[index])
+            if prim:
+                extent = UsdGeom.Boundable(prim).GetExtentAttr()
+                varying[i] = transform_might_vary(prim) or extent.ValueMightBeTimeVarying()
+        return varying
+
+    def _build(self):
+        paths = []
+        prims = iter(Usd.PrimRange(self.stage.GetPseudoRoot(), Usd.TraverseInstanceProxies()))
+        for prim in prims:
+            if prim.IsA(UsdGeom.PointInstancer):
+                prims.PruneChildren()
+            elif prim.IsA(UsdGeom.Gprim):
+                paths.append(str(prim.GetPath()))
+
+        self.paths = sorted(paths)
+        self._animated = np.flatnonzero(self._might_vary(range(len(self.paths))))
+        mins, maxs = self._compute_bounds(range(len(self.paths)))
+        self.hierarchy = BoxHierarchy(mins, maxs, self.leaf_size)
+        self._stale = False
+        self._dirty.clear()
+        self.builds += 1
+        self.version += 1
+
+    def _on_objects_changed(self, notice: Usd.Notice.ObjectsChanged, sender: Usd.Stage):
+        changed = changed_prim_paths(notice)
+        if not changed:
+            return
+
+        self.backend.bbox_cache.Clear()
+        self.backend.xform_cache.Clear()
+        # Added or removed prims change the indexed paths, the hierarchy is built again
+        if any(not path.IsPropertyPath() for path in notice.GetResyncedPaths()):
+            self._stale = True
+        else:
+            self._dirty.update(changed)
+
+
+_occluder_index: Optional[OccluderIndex] = None
+
+
+def get_occluder_index(stage: Usd.Stage) -> OccluderIndex:
+    """Return the shared occluder index of ``stage``, replacing the index of a previous stage."""
+    global _occluder_index
+
+    if _occluder_index is None or _occluder_index.stage != stage:
+        if _occluder_index is not None:
+            _occluder_index.revoke()
+        _occluder_index = OccluderIndex(stage)
+
+    return _occluder_index
+
+
+def compute_visibility(
+    stage: Usd.Stage,
+    camera_paths: Sequence[Union[str, Sdf.Path]],
+    target_paths: Sequence[Union[str, Sdf.Path]],
+    time: float = 0.0,
+    samples: int = 3,
+    index: Optional[OccluderIndex] = None,
+) -> np.ndarray:
+    """
+    Return the fraction of the target sample points visible from each camera.
+
+    ``samples`` points per axis are sampled in the world box of every target, and a point is hidden when the segment
+    from the camera to it crosses the box of a Gprim that contains neither of them. The targets and the prims below
+    them, as well as the prims below the cameras, never occlude. Boxes overestimate the geometry, so the fractions
+    are a conservative estimate: a target can be reported hidden behind the empty corner of a box.
+
+    Args:
+        stage (Usd.Stage): The stage.
+        camera_paths (Sequence[Union[str, Sdf.Path]]): The cameras, or the Replicator camera Xforms above them.
+        target_paths (Sequence[Union[str, Sdf.Path]]): The targets, shared by every camera.
+        time (float, optional): The time code. Defaults to 0.
+        samples (int, optional): The sample points per axis of each target box. Defaults to 3.
+        index (OccluderIndex, optional): The occluders. Defaults to the shared index of ``stage``.
+
+    Returns:
+        np.ndarray: The visible fraction of each camera, shape (C,), NaN for missing cameras or empty targets.
+    """
+    if index is None:
+        index = get_occluder_index(stage)
+    hierarchy = index.update(time)
+
+    mins, maxs = index.backend.world_bounds([str(path) for path in target_paths])
+    kept = ~engine.is_empty(mins, maxs)
+    points = box_samples(mins[kept], maxs[kept], samples).reshape(-1, 3)
+
+    cameras = [resolve_camera_prim(stage, path) for path in camera_paths]
+    origins = np.array([np.array(index.backend.world_transform(camera))[3, :3] for camera in cameras])
+    origins = origins.reshape(-1, 3)
+
+    ignored = np.zeros(len(index), dtype=bool)
+    ignored[index.indices_under([*target_paths, *camera_paths])] = True
+    blocked = hierarchy.occluded(np.repeat(origins, len(points), axis=0), np.tile(points, (len(origins), 1)), ignored)
+
+    visibility = np.full(len(cameras), np.nan)
+    if len(points):
+        visibility[:] = 1.0 - blocked.reshape(len(cameras), len(points)).mean(axis=1)
+    visibility[[not camera for camera in cameras]] = np.nan
+    return visibility
+
+
+def _occluder_index_stats() -> Optional[Dict[str, float]]:
+    return _occluder_index.stats() if _occluder_index is not None else None
+
+
+register_cache("occluder_index", _occluder_index_stats)
@@ -0,0 +1,209 @@
+"""
+Normalization of the target path lists of the framing nodes, and prefix trees of prim paths.
+
+The world box of a prim already bounds its descendants, so a selection holding a prim and some of its descendants,
+or the same prim twice, is bounded by its distinct top-level roots alone. The paths are normalized through a
+:class:`PathTrie`, and the result is cached per input list so a selection repeated on every frame is normalized once.
+"""
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from pxr import Sdf
+
+from o.replicator.addons.scripts.stats import get_cache_counter
+
+PathLike = Union[str, Sdf.Path]
+
+# The maximum number of cached normalized lists
+MAX_NORMALIZED = 256
+
+_normalized_counter = get_cache_counter("normalized_paths")
+
+# Marks the trie node of an inserted path
+_END = ""
+
+
+def _components(path: str) -> Tuple[str, ...]:
+    return tuple(component for component in path.split("/") if component)
+
+
+class PathTrie:
+    """
+    A prefix tree of prim paths holding only the outermost inserted paths.
+
+    Inserting a path below an inserted one doesn't change the trie, inserting a path above inserted ones replaces
+    them.
+    """
+
+    def __init__(self, paths: Iterable[PathLike] = ()):
+        self._root: Dict[str, dict] = {}
+        for path in paths:
+            self.insert(path)
+
+    def insert(self, path: PathLike) -> bool:
+        """Insert ``path``, returning False if it or one of its ancestors was already inserted."""
+        node = self._root
+        for component in _components(str(path)):
+            if _END in node:
+                return False
+            node = node.setdefault(component, {})
+
+        if _END in node:
+            return False
+        # The path covers the subtree, its inserted descendants are dropped
+        node.clear()
+        node[_END] = {}
+        return True
+
+    def covers(self, path: PathLike) -> bool:
+        """Return whether ``path`` or one of its ancestors is in the trie."""
+        node = self._root
+        for component in _components(str(path)):
+            if _END in node:
+                return True
+            node = node.get(component)
+            if node is None:
+                return False
+        return _END in node
+
+    def contains(self, path: PathLike) -> bool:
+        """Return whether ``path`` itself is one of the outermost paths of the trie."""
+        node = self._root
+        for component in _components(str(path)):
+            node = node.get(component)
+            if node is None:
+                return False
+        return _END in node
+
+
+class PathSet:
+    """
+    A set of prim paths stored as a prefix tree, listing the paths of a subtree without scanning the others.
+
+    Args:
+        paths (Iterable[PathLike], optional): The initial paths.
+    """
+
+    def __init__(self, paths: Iterable[PathLike] = ()):
+        self._root: Dict[str, dict] = {}
+        self._size = 0
+        for path in paths:
+            self.add(path)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, path: PathLike) -> bool:
+        node = self._find(str(path))
+        return node is not None and _END in node
+
+    def add(self, path: PathLike) -> bool:
+        """Add ``path``, returning False if it was already in the set."""
+        node = self._root
+        for component in _components(str(path)):
+            node = node.setdefault(component, {})
+        if _END in node:
+            return False
+        node[_END] = {}
+        self._size += 1
+        return True
+
+    def discard(self, path: PathLike) -> bool:
+        """Remove ``path`` and the tree nodes left without paths, returning False if it wasn't in the set."""
+        nodes = [(None, self._root)]
+        for component in _components(str(path)):
+            node = nodes[-1][1].get(component)
+            if node is None:
+                return False
+            nodes.append((component, node))
+        if _END not in nodes[-1][1]:
+            return False
+
+        del nodes[-1][1][_END]
+        self._size -= 1
+        for (component, node), (_, parent) in zip(reversed(nodes[1:]), reversed(nodes[:-1])):
+            if node:
+                break
+            del parent[component]
+        return True
+
+    def subtree(self, path: PathLike) -> List[str]:
+        """Return the paths of the set at or below ``path``."""
+        path = str(path)
+        node = self._find(path)
+        if node is None:
+            return []
+
+        found = []
+        stack = [(path.rstrip("/"), node)]
+        while stack:
+            prefix, node = stack.pop()
+            for component, child in node.items():
+                if component == _END:
+                    found.append(prefix or "/")
+                else:
+                    stack.append((f"{prefix}/{component}", child))
+        return found
+
+    def clear(self):
+        self._root.clear()
+        self._size = 0
+
+    def _find(self, path: str) -> Optional[dict]:
+        node = self._root
+        for component in _components(path):
+            node = node.get(component)
+            if node is None:
+                return None
+        return node
+
+
+def normalize_paths(target_paths: Sequence[PathLike], excluded_paths: Sequence[PathLike] = ()) -> Tuple[str, ...]:
+    """:func:`normalize_target_paths` without the cache, for lists that don't repeat."""
+    target_paths = [str(path) for path in target_paths]
+    excluded = PathTrie(excluded_paths)
+    roots = PathTrie()
+    for path in target_paths:
+        if not excluded.covers(path):
+            roots.insert(path)
+
+    normalized, seen = [], set()
+    for path in target_paths:
+        if path not in seen and roots.contains(path):
+            seen.add(path)
+            normalized.append(path)
+    return tuple(normalized)
+
+
+_normalized: "OrderedDict[Tuple[Tuple[str, ...], Tuple[str, ...]], Tuple[str, ...]]" = OrderedDict()
+
+
+def normalize_target_paths(
+    target_paths: Sequence[PathLike], excluded_paths: Optional[Sequence[PathLike]] = None
+) -> Tuple[str, ...]:
+    """
+    Return the distinct top-level roots of ``target_paths``, outside of the ``excluded_paths`` subtrees.
+
+    Duplicates and the descendants of another target are dropped, their boxes are already bounded by the box of
+    their ancestor. Targets without extent fall back to a box around their transform, a root whose subtree has no
+    extent at all no longer gets the fallback boxes of its dropped descendants.
+
+    Args:
+        target_paths (Sequence[PathLike]): The target paths.
+        excluded_paths (Sequence[PathLike], optional): The prims whose subtrees are never targets, e.g. the cameras.
+
+    Returns:
+        Tuple[str, ...]: The kept paths, in the order of their first occurrence in ``target_paths``.
+    """
+    key = (tuple(map(str, target_paths)), tuple(map(str, excluded_paths or ())))
+    normalized = _normalized.get(key)
+    if normalized is not None:
+        _normalized_counter.hits += 1
+        _normalized.move_to_end(key)
+        return normalized
+
+    _normalized_counter.misses += 1
+    normalized = _normalized[key] = normalize_paths(*key)
+    if len(_normalized) > MAX_NORMALIZED:
+        _normalized.popitem(last=False)
+    return normalized
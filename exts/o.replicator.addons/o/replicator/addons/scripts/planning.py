@@ -0,0 +1,289 @@
+"""
+Pre-planned focal length schedules.
+
+A plan draws the zoom and camera positions of every frame of a run up front, sweeps the target bounds over the
+time codes of the run and solves all the focal lengths in one vectorized pass. Applying the plan feeds the values
+back through ``sequence`` distributions, so the per-frame work is an index lookup.
+"""
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+from pxr import Gf, Sdf, Usd, UsdGeom
+
+from o.replicator.addons.framing import engine
+from o.replicator.addons.scripts.baking import bake_camera_params, get_bake_layer
+from o.replicator.addons.scripts.bounds import UsdBoundsBackend
+from o.replicator.addons.scripts.camera import CameraHandle, resolve_camera_prim
+from o.replicator.addons.scripts.paths import normalize_target_paths
+from o.replicator.addons.scripts.query import TargetQuery, resolve_query
+
+Range = Tuple[Union[float, Sequence[float]], Union[float, Sequence[float]]]
+
+
+class FocalLengthPlan:
+    """
+    The focal length of every camera for every frame of a run.
+
+    Args:
+        camera_paths (Sequence[str]): The cameras, as given to the plan.
+        target_paths (Sequence[str]): The targets framed by the cameras.
+        time_codes (np.ndarray): The time code of each frame, shape (N,).
+        zoom (np.ndarray): The zoom of each frame and camera, shape (N, C).
+        focal_lengths (np.ndarray): The focal length of each frame and camera, shape (N, C). The focal length the
+            camera had when planned where the targets could not be framed.
+        positions (np.ndarray, optional): The local translation of each frame and camera, shape (N, C, 3).
+        rotations (np.ndarray, optional): The local rotateXYZ angles, in degrees, of each frame and camera,
+            shape (N, C, 3).
+    """
+
+    def __init__(
+        self,
+        camera_paths: Sequence[str],
+        target_paths: Sequence[str],
+        time_codes: np.ndarray,
+        zoom: np.ndarray,
+        focal_lengths: np.ndarray,
+        positions: Optional[np.ndarray] = None,
+        rotations: Optional[np.ndarray] = None,
+    ):
+        self.camera_paths = [str(path) for path in camera_paths]
+        self.target_paths = [str(path) for path in target_paths]
+        self.time_codes = np.asarray(time_codes, dtype=np.float64)
+        self.zoom = np.asarray(zoom, dtype=np.float64)
+        self.focal_lengths = np.asarray(focal_lengths, dtype=np.float64)
+        self.positions = None if positions is None else np.asarray(positions, dtype=np.float64)
+        self.rotations = None if rotations is None else np.asarray(rotations, dtype=np.float64)
+
+    @property
+    def num_frames(self) -> int:
+        return len(self.focal_lengths)
+
+    def save(self, path: str):
+        """Save the plan to a ``.npz`` file."""
+        arrays = {
+            "camera_paths": np.array(self.camera_paths, dtype=str),
+            "target_paths": np.array(self.target_paths, dtype=str),
+            "time_codes": self.time_codes,
+            "zoom": self.zoom,
+            "focal_lengths": self.focal_lengths,
+        }
+        if self.positions is not None:
+            arrays["positions"] = self.positions
+        if self.rotations is not None:
+            arrays["rotations"] = self.rotations
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "FocalLengthPlan":
+        """Load a plan saved with :meth:`save`."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                camera_paths=data["camera_paths"].tolist(),
+                target_paths=data["target_paths"].tolist(),
+                time_codes=data["time_codes"],
+                zoom=data["zoom"],
+                focal_lengths=data["focal_lengths"],
+                positions=data["positions"] if "positions" in data else None,
+                rotations=data["rotations"] if "rotations" in data else None,
+            )
+
+    def bake(self, stage: Usd.Stage, sublayer: Optional[str] = None) -> Sdf.Layer:
+        """
+        Author the planned focal lengths as time samples at the planned time codes, in one change block per camera.
+
+        Args:
+            stage (Usd.Stage): The stage of the cameras.
+            sublayer (str, optional): Bake into this layer instead of the edit target layer, see
+                :func:`o.replicator.addons.scripts.baking.get_bake_layer`. Saved once baked when it is not anonymous.
+
+        Returns:
+            Sdf.Layer: The layer baked into.
+        """
+        layer = get_bake_layer(stage, sublayer)
+        for c, camera_path in enumerate(self.camera_paths):
+            bake_camera_params(
+                stage,
+                camera_path,
+                ("focalLength",),
+                self.focal_lengths[:, c, None],
+                self.time_codes,
+                sublayer=layer.identifier if sublayer is not None else None,
+                save=False,
+            )
+        if sublayer and not layer.anonymous:
+            layer.Save()
+        return layer
+
+
+def _draw(rng: np.random.Generator, value, shape: Tuple[int, ...]) -> np.ndarray:
+    """Sample ``value`` uniformly if it is a (low, high) range, broadcast it to ``shape`` otherwise."""
+    if isinstance(value, tuple) and len(value) == 2:
+        low, high = np.asarray(value[0], dtype=np.float64), np.asarray(value[1], dtype=np.float64)
+        return rng.uniform(low, high, shape + low.shape)
+    value = np.asarray(value, dtype=np.float64)
+    return np.broadcast_to(value, shape + value.shape[len(shape) :] if value.ndim > len(shape) else shape + value.shape)
+
+
+def _rotate_xyz_angles(rotations: np.ndarray) -> np.ndarray:
+    angles = np.empty(rotations.shape[:-2] + (3,))
+    flat_rotations = rotations.reshape(-1, 3, 3)
+    flat_angles = angles.reshape(-1, 3)
+    for i, rotation in enumerate(flat_rotations):
+        gf_rotation = Gf.Matrix3d(*rotation.flatten().tolist()).ExtractRotation()
+        z, y, x = gf_rotation.Decompose(Gf.Vec3d.ZAxis(), Gf.Vec3d.YAxis(), Gf.Vec3d.XAxis())
+        flat_angles[i] = (x, y, z)
+    return angles
+
+
+def plan_focal_lengths(
+    camera_paths: Sequence[Union[str, Sdf.Path]],
+    target_paths: Union[Sequence[Union[str, Sdf.Path]], TargetQuery],
+    num_frames: int,
+    zoom: Union[float, Range, np.ndarray] = 2.0,
+    positions: Optional[Union[Range, np.ndarray]] = None,
+    look_at: bool = True,
+    up_axis: Sequence[float] = (0.0, 1.0, 0.0),
+    time_codes: Optional[Sequence[float]] = None,
+    use_horizontal_fov: Optional[bool] = True,
+    conform: Union[int, str] = engine.CONFORM_FIT,
+    seed: Optional[int] = None,
+    stage: Optional[Usd.Stage] = None,
+) -> FocalLengthPlan:
+    """
+    Pre-compute the focal lengths of ``camera_paths`` framing ``target_paths`` for ``num_frames`` frames.
+
+    Args:
+        camera_paths (Sequence[Union[str, Sdf.Path]]): The cameras, or Replicator camera xforms, to plan for.
+        target_paths (Union[Sequence[Union[str, Sdf.Path]], TargetQuery]): The targets framed by every camera, or a
+            query resolved once when planning.
+        num_frames (int): The number of frames to plan.
+        zoom (Union[float, Range, np.ndarray], optional): A constant, a (low, high) range sampled uniformly, or an
+            array of shape (N,) or (N, C). Defaults to 2.0.
+        positions (Union[Range, np.ndarray], optional): Local camera positions, as a (low, high) range of 3D points
+            sampled uniformly or an array of shape (N, 3) or (N, C, 3). Defaults to the current positions.
+        look_at (bool, optional): Orient the cameras towards the targets on every frame. Defaults to True.
+        up_axis (Sequence[float], optional): The up axis used to orient the cameras. Defaults to +Y.
+        time_codes (Sequence[float], optional): The time code of each frame, the target bounds are swept over them.
+            Defaults to the current time code for every frame.
+        use_horizontal_fov (bool, optional): Whether to fit the horizontal field of view. Defaults to True.
+        conform (Union[int, str], optional): The conform mode, used when ``use_horizontal_fov`` is None.
+        seed (int, optional): The seed of the zoom and position samples. Defaults to None.
+        stage (Usd.Stage, optional): The stage of the prims. Defaults to the stage of the ``omni.usd`` context.
+
+    Returns:
+        FocalLengthPlan: The plan.
+    """
+    if stage is None:
+        import omni.usd
+
+        stage = omni.usd.get_context().get_stage()
+
+    if isinstance(target_paths, TargetQuery):
+        target_paths = resolve_query(stage, target_paths)
+
+    if time_codes is None:
+        import omni.timeline
+
+        timeline_iface = omni.timeline.get_timeline_interface()
+        current_time = timeline_iface.get_current_time() * timeline_iface.get_time_codes_per_seconds()
+        time_codes = np.full(num_frames, current_time)
+    time_codes = np.asarray(time_codes, dtype=np.float64)
+    if len(time_codes) != num_frames:
+        raise ValueError(f"Expected {num_frames} time codes, got {len(time_codes)}")
+
+    rng = np.random.default_rng(seed)
+    num_cameras = len(camera_paths)
+    frames_shape = (num_frames, num_cameras)
+
+    zoom = np.asarray(_draw(rng, zoom, (num_frames,)), dtype=np.float64)
+    zoom = np.broadcast_to(zoom[:, None] if zoom.ndim == 1 else zoom, frames_shape)
+    if positions is not None:
+        positions = _draw(rng, positions, (num_frames,))
+        positions = np.broadcast_to(positions[:, None] if positions.ndim == 2 else positions, frames_shape + (3,))
+
+    poses = [stage.GetPrimAtPath(str(path)) for path in camera_paths]
+    cameras = [resolve_camera_prim(stage, path) for path in camera_paths]
+    for path, pose, camera in zip(camera_paths, poses, cameras):
+        if not pose.IsA(UsdGeom.Xformable) or not camera or not camera.IsA(UsdGeom.Xformable):
+            raise ValueError(f"{path} is not an Xformable camera")
+
+    handles = [CameraHandle(camera) for camera in cameras]
+    optics = [handle.read_optics(time_codes[0]) for handle in handles]
+    if any(camera_optics is None or camera_optics[2] for camera_optics in optics):
+        raise ValueError("Only perspective cameras with an aperture can be planned")
+    h_apertures, v_apertures, _ = (np.array(values) for values in zip(*optics))
+    current_focal_lengths = np.array([handle.focal_length.Get(time_codes[0]) for handle in handles], dtype=np.float64)
+
+    camera_paths_set = {str(path) for path in camera_paths} | {str(camera.GetPath()) for camera in cameras}
+    targets = list(normalize_target_paths(target_paths, sorted(camera_paths_set)))
+
+    # Sweep the target bounds and the camera transforms over the time codes of the run
+    backend = UsdBoundsBackend(stage, time_codes[0])
+    aab_mins = np.empty((num_frames, 3))
+    aab_maxs = np.empty((num_frames, 3))
+    pose_local = np.empty(frames_shape + (4, 4))
+    pose_parent = np.empty(frames_shape + (4, 4))
+    camera_local = np.empty(frames_shape + (4, 4))
+    camera_parent = np.empty(frames_shape + (4, 4))
+    try:
+        for time in np.unique(time_codes):
+            backend.set_time(time)
+            frames = time_codes == time
+            aab_mins[frames], aab_maxs[frames] = engine.union_bounds(*backend.world_bounds(targets))
+            for c, (pose, camera) in enumerate(zip(poses, cameras)):
+                pose_local[frames, c], pose_parent[frames, c], _ = backend.transforms(pose)
+                camera_local[frames, c], camera_parent[frames, c], _ = backend.transforms(camera)
+    finally:
+        backend.revoke()
+
+    flat = (-1, 4, 4)
+    pose_world = pose_local @ pose_parent
+    rotations = None
+    if look_at or positions is not None:
+        targets_center = np.repeat((aab_mins + aab_maxs) * 0.5, num_cameras, axis=0)
+        if look_at:
+            new_local, local_rotations = engine.look_at_transforms(
+                pose_local.reshape(flat),
+                pose_parent.reshape(flat),
+                targets_center,
+                up_axis,
+                None if positions is None else positions.reshape(-1, 3),
+            )
+        else:
+            new_local = pose_local.reshape(flat).copy()
+            new_local[:, 3, :3] = positions.reshape(-1, 3)
+            local_rotations = engine.orthonormal_rotations(new_local)
+        new_local = new_local.reshape(pose_local.shape)
+        rotations = _rotate_xyz_angles(local_rotations.reshape(frames_shape + (3, 3)))
+
+        # Cameras under the planned prims follow them
+        is_pose = np.array([camera == pose for camera, pose in zip(cameras, poses)])[None, :, None, None]
+        new_pose_world = new_local @ pose_parent
+        camera_local = np.where(is_pose, new_local, camera_local)
+        camera_parent = np.where(is_pose, pose_parent, camera_parent @ np.linalg.inv(pose_world) @ new_pose_world)
+        if positions is None:
+            positions = new_local[..., 3, :3]
+
+    solution = engine.solve_focal_lengths(
+        np.repeat(aab_mins, num_cameras, axis=0)[:, None],
+        np.repeat(aab_maxs, num_cameras, axis=0)[:, None],
+        camera_local.reshape(flat),
+        camera_parent.reshape(flat),
+        np.tile(h_apertures, num_frames),
+        np.tile(v_apertures, num_frames),
+        zoom=zoom.reshape(-1),
+        use_horizontal_fov=use_horizontal_fov,
+        conform=conform,
+    )
+    focal_lengths = solution.focal_length.reshape(frames_shape)
+    focal_lengths = np.where(solution.valid.reshape(frames_shape), focal_lengths, current_focal_lengths)
+
+    return FocalLengthPlan(
+        camera_paths=camera_paths,
+        target_paths=targets,
+        time_codes=time_codes,
+        zoom=zoom,
+        focal_lengths=focal_lengths,
+        positions=positions,
+        rotations=rotations,
+    )
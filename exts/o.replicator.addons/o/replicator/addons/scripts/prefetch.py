@@ -0,0 +1,153 @@
+"""
+Background prefetch of the framing data of the next frame.
+
+When a framing node knows the time code of its next evaluation, the camera transforms and target bounds of that
+time code are gathered on a worker thread while the current frame renders. The worker only reads the stage, with
+caches of its own, and holds :data:`STAGE_LOCK`, which the nodes of this extension also hold while they author
+USD. Other writers don't take the lock, so a node only prefetches when it authors its own outputs. The result is
+keyed by the generation of a change tracker watch of the camera transforms and the targets, so it is thrown away
+when any of them moved after the prefetch was submitted. Nodes stop prefetching when other writers keep throwing
+their prefetches away.
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Sequence, Tuple
+
+import carb
+import numpy as np
+from pxr import Gf, Usd
+
+from o.replicator.addons.scripts.bounds import UsdBoundsBackend, gather_world_bounds
+
+# Held by the prefetch jobs while they read the stage and by the nodes while they author it
+STAGE_LOCK = threading.RLock()
+
+MAX_WORKERS = 2
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+class FramingData(NamedTuple):
+    """The framing inputs of one time code, gathered ahead of the node evaluation."""
+
+    time: float
+    # Camera path to its (local, parent to world) transforms
+    transforms: Dict[str, Tuple[Gf.Matrix4d, Gf.Matrix4d]]
+    mins: np.ndarray
+    maxs: np.ndarray
+
+
+def gather_framing_data(
+    stage: Usd.Stage,
+    time: float,
+    camera_prims: Dict[str, Usd.Prim],
+    target_paths: Sequence[str],
+    instance_indices: Optional[Sequence[int]] = None,
+    backend: Optional[UsdBoundsBackend] = None,
+) -> FramingData:
+    """
+    Gather the camera transforms and target bounds at ``time`` with private USD caches.
+
+    Args:
+        stage (Usd.Stage): The stage.
+        time (float): The time code.
+        camera_prims (Dict[str, Usd.Prim]): The cameras, by path.
+        target_paths (Sequence[str]): The targets, cameras excluded.
+        instance_indices (Sequence[int], optional): The selected instances of ``UsdGeom.PointInstancer`` targets.
+        backend (UsdBoundsBackend, optional): A backend that doesn't listen to notices, only used by the prefetch
+            jobs and only while the cameras and targets are unchanged. Defaults to a new one.
+
+    Returns:
+        FramingData: The transforms of each camera and the box of each target.
+    """
+    if backend is None:
+        backend = UsdBoundsBackend(stage, time, listen=False)
+    backend.set_time(time)
+    transforms = {path: backend.transforms(prim)[:2] for path, prim in camera_prims.items()}
+    mins, maxs = gather_world_bounds(
+        stage, time, list(target_paths), instance_indices=instance_indices, usd_backend=backend
+    )
+    return FramingData(time, transforms, mins, maxs)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="o.replicator.addons.prefetch")
+    return _executor
+
+
+def _run_locked(fn: Callable[..., Any], *args) -> Any:
+    # Also serializes the jobs, so the backend of a node is never used by two of them
+    with STAGE_LOCK:
+        return fn(*args)
+
+
+class Prefetcher:
+    """
+    The pending prefetch of one node, at most one at a time.
+
+    Args:
+        timeout (float, optional): The seconds :meth:`take` waits for a prefetch still running. Defaults to 1.
+    """
+
+    def __init__(self, timeout: float = 1.0):
+        self.timeout = timeout
+        self._key: Optional[Hashable] = None
+        self._future: Optional[Future] = None
+
+    @property
+    def pending(self) -> bool:
+        return self._future is not None
+
+    def submit(self, key: Hashable, fn: Callable[..., Any], *args):
+        """Run ``fn(*args)`` on the worker pool, replacing the pending prefetch. ``key`` identifies its inputs."""
+        self.cancel()
+        self._key = key
+        self._future = _get_executor().submit(_run_locked, fn, *args)
+
+    def take(self, key: Hashable) -> Optional[Any]:
+        """
+        Return the result of the pending prefetch if it was submitted with ``key``, and forget it.
+
+        Args:
+            key (Hashable): The key of the inputs the caller is about to compute.
+
+        Returns:
+            Any: The result, or None if nothing was prefetched for ``key``, the prefetch failed or timed out.
+        """
+        future, pending_key = self._future, self._key
+        self._future, self._key = None, None
+        if future is None:
+            return None
+
+        if pending_key != key:
+            future.cancel()
+            return None
+
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            carb.log_warn(f"Framing prefetch still running after {self.timeout}s, computing synchronously")
+            future.cancel()
+            return None
+        except Exception as error:
+            carb.log_warn(f"Framing prefetch failed: {error}")
+            future.cancel()
+            return None
+
+    def cancel(self):
+        if self._future is not None:
+            self._future.cancel()
+        self._future, self._key = None, None
+
+
+def shutdown():
+    """Stop the worker pool, waiting for the running prefetches."""
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
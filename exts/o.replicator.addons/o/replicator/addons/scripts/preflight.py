@@ -0,0 +1,331 @@
+"""
+Offline framing preflight over a USD file, without Kit.
+
+Each job frames one camera on its targets at one time code. The jobs are split in chunks evaluated by worker
+processes, each of them opening the USD file once with ``usd-core``, and the jobs of a chunk sharing a time code are
+solved in one batch. A job fails when its camera or targets are missing, its bounds are empty, the camera distance
+or the target radius is zero, or the solved focal length is outside of the lens limits.
+
+Usage:
+    PYTHONPATH=exts/o.replicator.addons python -m o.replicator.addons.scripts.preflight scene.usd jobs.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from pxr import Usd
+
+from o.replicator.addons.framing import engine
+from o.replicator.addons.scripts.bounds import UsdBoundsBackend
+from o.replicator.addons.scripts.camera import CameraHandle, resolve_camera_prim
+from o.replicator.addons.scripts.paths import normalize_target_paths
+
+ERROR_CAMERA = "missing_camera"
+ERROR_NOT_CAMERA = "not_a_camera"
+ERROR_TARGETS = "missing_targets"
+ERROR_EMPTY_BOUNDS = "empty_bounds"
+ERROR_ZERO_DISTANCE = "zero_distance"
+ERROR_ZERO_RADIUS = "zero_radius"
+ERROR_APERTURE = "invalid_aperture"
+ERROR_FOCAL_LENGTH = "focal_length_out_of_range"
+
+# Distances and radii at or below this are reported as zero
+EPSILON = 1e-6
+
+# Jobs sent to a worker at once, per worker
+CHUNKS_PER_PROCESS = 4
+
+
+class FramingJob(NamedTuple):
+    """One camera framing its targets at one time code."""
+
+    camera: str
+    targets: Tuple[str, ...]
+    zoom: float = 2.0
+    time: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FramingJob":
+        targets = data["targets"]
+        if isinstance(targets, str):
+            targets = [targets]
+        return cls(
+            str(data["camera"]),
+            tuple(map(str, targets)),
+            float(data.get("zoom", 2.0)),
+            float(data.get("time", 0.0)),
+        )
+
+
+class FramingLimits(NamedTuple):
+    """The lens limits the solved focal lengths must stay within, in the units of ``focalLength``."""
+
+    min_focal_length: float = 1.0
+    max_focal_length: float = 1000.0
+
+
+class JobResult(NamedTuple):
+    """The solve of one job, ``error`` is None when the framing is valid."""
+
+    index: int
+    focal_length: float = float("nan")
+    distance: float = float("nan")
+    radius: float = float("nan")
+    error: Optional[str] = None
+    detail: str = ""
+
+
+def _describe(values: Sequence[float]) -> Optional[Dict[str, float]]:
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return None
+    return {"min": float(values.min()), "median": float(np.median(values)), "max": float(values.max())}
+
+
+class PreflightReport:
+    """
+    The results of a preflight run.
+
+    Args:
+        results (Sequence[JobResult]): One result per job, in job order.
+        seconds (float): The wall time of the run.
+        processes (int): The number of worker processes.
+    """
+
+    def __init__(self, results: Sequence[JobResult], seconds: float, processes: int):
+        self.results = list(results)
+        self.seconds = seconds
+        self.processes = processes
+
+    @property
+    def failures(self) -> List[JobResult]:
+        return [result for result in self.results if result.error is not None]
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the job and failure counts, the failures by error and statistics of the valid solves."""
+        valid = [result for result in self.results if result.error is None]
+        return {
+            "jobs": len(self.results),
+            "failed": len(self.results) - len(valid),
+            "errors": dict(Counter(result.error for result in self.failures)),
+            "focal_length": _describe([result.focal_length for result in valid]),
+            "distance": _describe([result.distance for result in valid]),
+            "radius": _describe([result.radius for result in valid]),
+            "seconds": self.seconds,
+            "jobs_per_second": len(self.results) / self.seconds if self.seconds else None,
+            "processes": self.processes,
+        }
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"summary": self.summary(), "failures": [result._asdict() for result in self.failures]}
+
+
+def evaluate_jobs(
+    stage: Usd.Stage,
+    jobs: Sequence[Tuple[int, FramingJob]],
+    limits: FramingLimits = FramingLimits(),
+    use_horizontal_fov: Optional[bool] = True,
+    conform: Union[int, str] = engine.CONFORM_FIT,
+) -> List[JobResult]:
+    """
+    Check the framing of ``jobs`` on ``stage``, solving the jobs of each time code in one batch.
+
+    Args:
+        stage (Usd.Stage): The stage.
+        jobs (Sequence[Tuple[int, FramingJob]]): The jobs, with their index in the run.
+        limits (FramingLimits, optional): The lens limits.
+        use_horizontal_fov (bool, optional): Whether to fit the horizontal field of view. Defaults to True.
+        conform (Union[int, str], optional): The conform mode, used when ``use_horizontal_fov`` is None.
+
+    Returns:
+        List[JobResult]: One result per job, in no particular order.
+    """
+    backend = UsdBoundsBackend(stage, 0.0, listen=False)
+    results = []
+    by_time: Dict[float, List[Tuple[int, FramingJob]]] = defaultdict(list)
+    for index, job in jobs:
+        by_time[job.time].append((index, job))
+
+    for time_code, time_jobs in sorted(by_time.items()):
+        backend.set_time(time_code)
+        indices, zooms, local_xforms, parent_xforms, optics, mins, maxs = [], [], [], [], [], [], []
+        for index, job in time_jobs:
+            camera = resolve_camera_prim(stage, job.camera)
+            if not camera:
+                results.append(JobResult(index, error=ERROR_CAMERA, detail=job.camera))
+                continue
+
+            camera_optics = CameraHandle(camera).read_optics(time_code)
+            if camera_optics is None:
+                results.append(JobResult(index, error=ERROR_NOT_CAMERA, detail=job.camera))
+                continue
+
+            missing = [path for path in job.targets if not stage.GetPrimAtPath(path)]
+            if missing or not job.targets:
+                results.append(JobResult(index, error=ERROR_TARGETS, detail=", ".join(missing)))
+                continue
+
+            target_mins, target_maxs = backend.world_bounds(normalize_target_paths(job.targets, [job.camera]))
+            box_min, box_max = engine.union_bounds(target_mins, target_maxs)
+            local_xform, parent_xform, _ = backend.transforms(camera)
+
+            indices.append(index)
+            zooms.append(job.zoom)
+            local_xforms.append(local_xform)
+            parent_xforms.append(parent_xform)
+            optics.append(camera_optics)
+            mins.append(box_min)
+            maxs.append(box_max)
+
+        if not indices:
+            continue
+
+        h_apertures, v_apertures, orthographic = zip(*optics)
+        solution = engine.solve_focal_lengths(
+            np.array(mins)[:, None],
+            np.array(maxs)[:, None],
+            np.array(local_xforms),
+            np.array(parent_xforms),
+            h_apertures,
+            v_apertures,
+            zoom=np.array(zooms),
+            use_horizontal_fov=use_horizontal_fov,
+            conform=conform,
+            orthographic=orthographic,
+        )
+
+        for k, index in enumerate(indices):
+            focal_length = float(solution.focal_length[k])
+            distance = float(solution.distance[k])
+            radius = float(solution.radius[k])
+            result = JobResult(index, focal_length, distance, radius)
+            if not solution.valid[k]:
+                result = result._replace(error=ERROR_EMPTY_BOUNDS)
+            elif not distance > EPSILON:
+                result = result._replace(error=ERROR_ZERO_DISTANCE)
+            elif not radius > EPSILON:
+                result = result._replace(error=ERROR_ZERO_RADIUS)
+            elif orthographic[k]:
+                apertures = (float(solution.horizontal_aperture[k]), float(solution.vertical_aperture[k]))
+                if not all(np.isfinite(apertures)) or min(apertures) <= 0:
+                    result = result._replace(error=ERROR_APERTURE, detail=f"{apertures}")
+            elif not limits.min_focal_length <= focal_length <= limits.max_focal_length:
+                result = result._replace(error=ERROR_FOCAL_LENGTH, detail=f"{focal_length:g}")
+            results.append(result)
+
+    return results
+
+
+_worker_stage: Optional[Usd.Stage] = None
+
+
+def _open_stage(usd_path: str):
+    global _worker_stage
+
+    _worker_stage = Usd.Stage.Open(usd_path)
+
+
+def _evaluate_chunk(jobs, limits, use_horizontal_fov, conform) -> List[JobResult]:
+    return evaluate_jobs(_worker_stage, jobs, limits, use_horizontal_fov, conform)
+
+
+def run_preflight(
+    usd_path: str,
+    jobs: Sequence[FramingJob],
+    limits: FramingLimits = FramingLimits(),
+    processes: Optional[int] = None,
+    use_horizontal_fov: Optional[bool] = True,
+    conform: Union[int, str] = engine.CONFORM_FIT,
+) -> PreflightReport:
+    """
+    Check the framing of ``jobs`` on the USD file ``usd_path``, in parallel worker processes.
+
+    Args:
+        usd_path (str): The USD file.
+        jobs (Sequence[FramingJob]): The jobs.
+        limits (FramingLimits, optional): The lens limits.
+        processes (int, optional): The number of worker processes, 1 evaluates the jobs in this process. Defaults to
+            the number of CPUs.
+        use_horizontal_fov (bool, optional): Whether to fit the horizontal field of view. Defaults to True.
+        conform (Union[int, str], optional): The conform mode, used when ``use_horizontal_fov`` is None.
+
+    Returns:
+        PreflightReport: The result of every job.
+    """
+    start = time.perf_counter()
+    processes = max(1, min(processes or os.cpu_count() or 1, len(jobs) or 1))
+    indexed = list(enumerate(jobs))
+
+    if processes == 1:
+        results = evaluate_jobs(Usd.Stage.Open(usd_path), indexed, limits, use_horizontal_fov, conform)
+    else:
+        chunk_size = -(-len(indexed) // (processes * CHUNKS_PER_PROCESS))
+        # Sorted by time code so that each chunk solves as few batches as possible
+        indexed.sort(key=lambda item: item[1].time)
+        chunks = [indexed[i : i + chunk_size] for i in range(0, len(indexed), chunk_size)]
+        results = []
+        with ProcessPoolExecutor(
+            processes, multiprocessing.get_context("spawn"), initializer=_open_stage, initargs=(usd_path,)
+        ) as executor:
+            futures = [executor.submit(_evaluate_chunk, chunk, limits, use_horizontal_fov, conform) for chunk in chunks]
+            for future in futures:
+                results.extend(future.result())
+
+    results.sort(key=lambda result: result.index)
+    return PreflightReport(results, time.perf_counter() - start, processes)
+
+
+def load_jobs(path: str) -> List[FramingJob]:
+    """Load jobs from a JSON list or a JSON lines file of ``{"camera", "targets", "zoom", "time"}`` objects."""
+    with open(path) as jobs_file:
+        if path.endswith(".jsonl"):
+            items = [json.loads(line) for line in jobs_file if line.strip()]
+        else:
+            items = json.load(jobs_file)
+    return [FramingJob.from_dict(item) for item in items]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("usd_path", help="The USD file to open")
+    parser.add_argument("jobs", help="JSON or JSON lines file of {camera, targets, zoom, time} jobs")
+    parser.add_argument("--processes", type=int, help="Worker processes, defaults to the number of CPUs")
+    parser.add_argument("--min-focal-length", type=float, default=FramingLimits().min_focal_length)
+    parser.add_argument("--max-focal-length", type=float, default=FramingLimits().max_focal_length)
+    parser.add_argument("--conform", default="fit", help="Conform mode used with --fov auto")
+    parser.add_argument(
+        "--fov", choices=("horizontal", "vertical", "auto"), default="horizontal", help="The field of view fitted"
+    )
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    use_horizontal_fov = {"horizontal": True, "vertical": False, "auto": None}[args.fov]
+    report = run_preflight(
+        args.usd_path,
+        load_jobs(args.jobs),
+        FramingLimits(args.min_focal_length, args.max_focal_length),
+        args.processes,
+        use_horizontal_fov,
+        args.conform,
+    )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report.to_json(), output, indent=2)
+    else:
+        json.dump(report.to_json(), sys.stdout, indent=2)
+        print()
+
+    return 1 if report.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""
+Semantic label and prim path pattern target queries.
+
+Queries are served from a per stage index of the prims and their semantic labels. The index is built with one
+traversal and then kept up to date from ``Usd.Notice.ObjectsChanged``, so resolving a query on every frame is a
+dictionary lookup instead of a stage traversal.
+"""
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from pxr import Sdf, Tf, Usd
+
+from o.replicator.addons.scripts.stats import register_cache
+
+Label = Tuple[str, str]
+
+# Attribute prefixes of ``Semantics.SemanticsAPI`` and ``UsdSemantics.LabelsAPI``
+SEMANTICS_PREFIX = "semantic:"
+LABELS_PREFIX = "semantics:labels:"
+
+
+class TargetQuery:
+    """
+    The prims carrying a semantic label and/or whose path matches a pattern.
+
+    Labels and patterns are matched case-insensitively. With both set, a prim must carry one of the labels and
+    match the pattern.
+
+    Args:
+        semantics (Sequence[Tuple[str, str]], optional): (type, data) labels such as ``[("class", "car")]``. Prims
+            carrying any of them match.
+        path_pattern (str, optional): A regular expression searched in the prim paths.
+    """
+
+    __slots__ = ("semantics", "path_pattern")
+
+    def __init__(self, semantics: Optional[Sequence[Label]] = None, path_pattern: Optional[str] = None):
+        if isinstance(semantics, tuple) and len(semantics) == 2 and all(isinstance(part, str) for part in semantics):
+            semantics = [semantics]
+
+        self.semantics: Tuple[Label, ...] = tuple(
+            sorted({(str(label_type).lower(), str(data).lower()) for label_type, data in semantics or ()})
+        )
+        self.path_pattern: Optional[str] = path_pattern or None
+
+        if not self.semantics and self.path_pattern is None:
+            raise ValueError("A target query needs semantics or a path pattern")
+
+        if self.path_pattern is not None:
+            re.compile(self.path_pattern)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, TargetQuery) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __repr__(self) -> str:
+        return f"TargetQuery(semantics={list(self.semantics)!r}, path_pattern={self.path_pattern!r})"
+
+    def _key(self) -> Tuple[Tuple[Label, ...], Optional[str]]:
+        return self.semantics, self.path_pattern
+
+    def to_json(self) -> str:
+        """Serialize the query, as stored in the ``inputs:targetQuery`` node attribute."""
+        return json.dumps({"semantics": [list(label) for label in self.semantics], "path_pattern": self.path_pattern})
+
+    @classmethod
+    def from_json(cls, text: str) -> "TargetQuery":
+        data = json.loads(text)
+        return cls([tuple(label) for label in data.get("semantics") or ()], data.get("path_pattern"))
+
+
+def read_labels(prim: Usd.Prim) -> Set[Label]:
+    """Return the lowercase (type, data) semantic labels of ``prim``, from both semantics schemas."""
+    labels = set()
+    if not prim.HasAuthoredMetadata("apiSchemas"):
+        return labels
+
+    # Read from the metadata, GetAppliedSchemas() drops the schemas of plugins that aren't loaded
+    for schema in prim.GetMetadata("apiSchemas").ApplyOperations([]):
+        name, _, instance = schema.partition(":")
+        if name == "SemanticsAPI":
+            label_type = prim.GetAttribute(f"{SEMANTICS_PREFIX}{instance}:params:semanticType").Get()
+            data = prim.GetAttribute(f"{SEMANTICS_PREFIX}{instance}:params:semanticData").Get()
+            if label_type and data:
+                labels.add((str(label_type).lower(), str(data).lower()))
+        elif name == "SemanticsLabelsAPI":
+            for data in prim.GetAttribute(f"{LABELS_PREFIX}{instance}").Get() or ():
+                labels.add((instance.lower(), str(data).lower()))
+    return labels
+
+
+def _is_semantic_property(name: str) -> bool:
+    return name.startswith(SEMANTICS_PREFIX) or name.startswith(LABELS_PREFIX)
+
+
+def _parent_path(path: str) -> str:
+    return path.rpartition("/")[0] or "/"
+
+
+class TargetIndex:
+    """
+    Index of the prims of a stage and of their semantic labels, maintained from change notices.
+
+    Only the prims a default stage traversal visits are indexed: active, loaded, defined and non-abstract prims,
+    instance proxies excluded. A resynced prim has its subtree re-indexed, a changed semantic attribute has the
+    labels of its prim re-read. Query results are cached until the index changes.
+
+    Args:
+        stage (Usd.Stage): The stage to index.
+        max_results (int, optional): The maximum number of cached query results. Defaults to 1024.
+    """
+
+    def __init__(self, stage: Usd.Stage, max_results: int = 1024):
+        self.stage = stage
+        self.max_results = max_results
+        self.hits = 0
+        self.misses = 0
+        # Incremented every time the indexed prims or labels change
+        self.version = 0
+        self._labels: Dict[Label, Set[str]] = {}
+        self._prim_labels: Dict[str, Set[Label]] = {}
+        self._children: Dict[str, Set[str]] = {}
+        self._paths: Set[str] = set()
+        self._results: Dict[TargetQuery, Tuple[str, ...]] = {}
+        self._index(stage.GetPseudoRoot())
+        self._listener = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self._on_objects_changed, stage)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def revoke(self):
+        """Stop listening to the stage and drop the index."""
+        if self._listener:
+            self._listener.Revoke()
+            self._listener = None
+        self._clear()
+        self._results.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._paths),
+            "labels": len(self._labels),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def labels(self) -> List[Label]:
+        """Return the (type, data) labels carried by at least one indexed prim."""
+        return sorted(self._labels)
+
+    def query(self, query: TargetQuery) -> Tuple[str, ...]:
+        """
+        Return the paths of the prims matching ``query``.
+
+        Args:
+            query (TargetQuery): The query.
+
+        Returns:
+            Tuple[str, ...]: The matching prim paths, sorted.
+        """
+        result = self._results.get(query)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        if query.semantics:
+            paths: Iterable[str] = set().union(*(self._labels.get(label, ()) for label in query.semantics))
+        else:
+            paths = self._paths
+
+        if query.path_pattern is not None:
+            pattern = re.compile(query.path_pattern, re.IGNORECASE)
+            paths = [path for path in paths if pattern.search(path)]
+
+        result = tuple(sorted(paths))
+        if len(self._results) >= self.max_results:
+            self._results.clear()
+        self._results[query] = result
+        return result
+
+    def _index(self, root: Usd.Prim):
+        for prim in Usd.PrimRange(root):
+            if prim.IsPseudoRoot():
+                continue
+
+            path = str(prim.GetPath())
+            self._paths.add(path)
+            self._children.setdefault(_parent_path(path), set()).add(path)
+            self._set_labels(path, read_labels(prim))
+
+    def _set_labels(self, path: str, labels: Set[Label]):
+        for label in self._prim_labels.pop(path, ()):
+            paths = self._labels[label]
+            paths.discard(path)
+            if not paths:
+                del self._labels[label]
+
+        if labels:
+            self._prim_labels[path] = labels
+            for label in labels:
+                self._labels.setdefault(label, set()).add(path)
+
+    def _remove(self, path: str):
+        siblings = self._children.get(_parent_path(path))
+        if siblings is not None:
+            siblings.discard(path)
+
+        stack = [path]
+        while stack:
+            removed = stack.pop()
+            self._paths.discard(removed)
+            self._set_labels(removed, set())
+            stack.extend(self._children.pop(removed, ()))
+
+    def _reindex(self, path: Sdf.Path):
+        if path == Sdf.Path.absoluteRootPath:
+            self._clear()
+            self._index(self.stage.GetPseudoRoot())
+            return
+
+        self._remove(str(path))
+        prim = self.stage.GetPrimAtPath(path)
+        if prim and prim.IsActive() and prim.IsLoaded() and prim.IsDefined() and not prim.IsAbstract():
+            parent = prim.GetParent()
+            if parent.IsPseudoRoot() or str(parent.GetPath()) in self._paths:
+                self._index(prim)
+
+    def _clear(self):
+        self._labels.clear()
+        self._prim_labels.clear()
+        self._children.clear()
+        self._paths.clear()
+
+    def _on_objects_changed(self, notice: Usd.Notice.ObjectsChanged, sender: Usd.Stage):
+        resynced, relabeled = [], set()
+        for path in notice.GetResyncedPaths():
+            if path.IsPropertyPath():
+                if _is_semantic_property(path.name):
+                    relabeled.add(path.GetPrimPath())
+            else:
+                resynced.append(path)
+
+        for path in notice.GetChangedInfoOnlyPaths():
+            if path.IsPropertyPath() and _is_semantic_property(path.name):
+                relabeled.add(path.GetPrimPath())
+
+        if not resynced and not relabeled:
+            return
+
+        # Re-index the outermost resynced prims only, their subtrees cover the others
+        reindexed: List[Sdf.Path] = []
+        for path in sorted(resynced):
+            if not reindexed or not path.HasPrefix(reindexed[-1]):
+                reindexed.append(path)
+                self._reindex(path)
+
+        for path in relabeled:
+            key = str(path)
+            if key in self._paths and not any(path.HasPrefix(root) for root in reindexed):
+                self._set_labels(key, read_labels(self.stage.GetPrimAtPath(path)))
+
+        self.version += 1
+        self._results.clear()
+
+
+_target_index: Optional[TargetIndex] = None
+_parsed_queries: Dict[str, TargetQuery] = {}
+
+
+def get_target_index(stage: Usd.Stage) -> TargetIndex:
+    """Return the shared target index of ``stage``, replacing the index of a previous stage."""
+    global _target_index
+
+    if _target_index is None or _target_index.stage != stage:
+        if _target_index is not None:
+            _target_index.revoke()
+        _target_index = TargetIndex(stage)
+
+    return _target_index
+
+
+def resolve_query(stage: Usd.Stage, query: Union[str, TargetQuery]) -> Tuple[str, ...]:
+    """
+    Return the paths of the prims of ``stage`` matching ``query``.
+
+    Args:
+        stage (Usd.Stage): The stage.
+        query (Union[str, TargetQuery]): The query, or its JSON serialization as stored on the nodes.
+
+    Returns:
+        Tuple[str, ...]: The matching prim paths, sorted.
+    """
+    if isinstance(query, str):
+        parsed = _parsed_queries.get(query)
+        if parsed is None:
+            parsed = _parsed_queries[query] = TargetQuery.from_json(query)
+        query = parsed
+
+    return get_target_index(stage).query(query)
+
+
+def _target_index_stats() -> Optional[Dict[str, float]]:
+    return _target_index.stats() if _target_index is not None else None
+
+
+register_cache("target_index", _target_index_stats)
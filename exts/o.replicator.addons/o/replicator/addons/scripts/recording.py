@@ -0,0 +1,298 @@
+"""
+Record and replay of the values written by the camera nodes.
+
+A recording is a directory of append-only binary columns, one file per column of each table, described by a
+``schema.json``. The ``values`` table holds one row per written camera attribute (frame, time code, camera,
+attribute, value) and the ``transforms`` table the camera world transforms seen by the framing nodes. Frames are
+numbered by evaluation of each node, starting at 0, so a rerun of the same graph replays the values in order.
+
+Recordings are memory-mapped on read. Replaying looks the rows of a camera and frame up in a sorted index of the
+mapped columns, without loading the values in memory.
+"""
+import csv
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+RECORD_OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+
+SCHEMA_FILE = "schema.json"
+FORMAT_VERSION = 1
+
+# Table -> column -> (dtype, shape of one row)
+TABLES: Dict[str, Dict[str, Tuple[str, Tuple[int, ...]]]] = {
+    "values": {
+        "frame": ("<i8", ()),
+        "time": ("<f8", ()),
+        "camera": ("<i4", ()),
+        "attribute": ("<i4", ()),
+        "value": ("<f8", ()),
+    },
+    "transforms": {
+        "frame": ("<i8", ()),
+        "time": ("<f8", ()),
+        "camera": ("<i4", ()),
+        "world": ("<f8", (4, 4)),
+    },
+}
+
+# Buffered rows of a table before they are appended to its columns
+FLUSH_ROWS = 4096
+
+
+def _column_path(directory: str, table: str, column: str) -> str:
+    return os.path.join(directory, f"{table}.{column}.bin")
+
+
+class FramingRecorder:
+    """
+    Appends the values written by the camera nodes to a recording directory.
+
+    Opening a recorder starts a new recording, the columns already in ``directory`` are truncated.
+
+    Args:
+        directory (str): The recording directory, created if needed.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.cameras: List[str] = []
+        self.attributes: List[str] = []
+        self.rows = {table: 0 for table in TABLES}
+        self._ids: Dict[str, Dict[str, int]] = {"cameras": {}, "attributes": {}}
+        self._buffers: Dict[str, Dict[str, list]] = {
+            table: {column: [] for column in columns} for table, columns in TABLES.items()
+        }
+        for table, columns in TABLES.items():
+            for column in columns:
+                open(_column_path(self.directory, table, column), "wb").close()
+        self._write_schema()
+
+    def _id(self, kind: str, name: str) -> int:
+        ids = self._ids[kind]
+        index = ids.get(name)
+        if index is None:
+            names = self.cameras if kind == "cameras" else self.attributes
+            index = ids[name] = len(names)
+            names.append(name)
+        return index
+
+    def record(
+        self,
+        frame: int,
+        time: float,
+        camera_path: str,
+        values: Dict[str, float],
+        world_transform: Optional[np.ndarray] = None,
+    ):
+        """
+        Record the attributes written on a camera for a frame.
+
+        Args:
+            frame (int): The frame, the evaluation index of the recording node.
+            time (float): The time code of the evaluation.
+            camera_path (str): The path of the camera.
+            values (Dict[str, float]): The written values, by attribute name.
+            world_transform (np.ndarray, optional): The world transform of the camera, shape (4, 4).
+        """
+        camera = self._id("cameras", str(camera_path))
+        buffer = self._buffers["values"]
+        for name, value in values.items():
+            buffer["frame"].append(frame)
+            buffer["time"].append(time)
+            buffer["camera"].append(camera)
+            buffer["attribute"].append(self._id("attributes", name))
+            buffer["value"].append(value)
+
+        if world_transform is not None:
+            buffer = self._buffers["transforms"]
+            buffer["frame"].append(frame)
+            buffer["time"].append(time)
+            buffer["camera"].append(camera)
+            buffer["world"].append(np.asarray(world_transform, dtype=np.float64).reshape(4, 4))
+
+        if any(len(columns["frame"]) >= FLUSH_ROWS for columns in self._buffers.values()):
+            self.flush()
+
+    def flush(self):
+        """Append the buffered rows to the columns and update the schema."""
+        if not any(buffer["frame"] for buffer in self._buffers.values()):
+            return
+
+        for table, columns in TABLES.items():
+            buffer = self._buffers[table]
+            count = len(buffer["frame"])
+            if not count:
+                continue
+
+            for column, (dtype, shape) in columns.items():
+                values = np.asarray(buffer[column], dtype=dtype).reshape((count,) + shape)
+                with open(_column_path(self.directory, table, column), "ab") as column_file:
+                    values.tofile(column_file)
+                buffer[column].clear()
+            self.rows[table] += count
+
+        self._write_schema()
+
+    def _write_schema(self):
+        schema = {
+            "version": FORMAT_VERSION,
+            "tables": {
+                table: {
+                    "rows": self.rows[table],
+                    "columns": {
+                        column: {"dtype": dtype, "shape": list(shape)} for column, (dtype, shape) in columns.items()
+                    },
+                }
+                for table, columns in TABLES.items()
+            },
+            "cameras": self.cameras,
+            "attributes": self.attributes,
+        }
+        path = os.path.join(self.directory, SCHEMA_FILE)
+        with open(f"{path}.tmp", "w") as schema_file:
+            json.dump(schema, schema_file, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+
+class FramingRecording:
+    """
+    A recording directory, memory-mapped for reading.
+
+    Args:
+        directory (str): The recording directory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = os.path.abspath(directory)
+        schema_path = os.path.join(self.directory, SCHEMA_FILE)
+        with open(schema_path) as schema_file:
+            schema = json.load(schema_file)
+        if schema.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported recording version {schema.get('version')} in {self.directory}")
+
+        self.mtime = os.path.getmtime(schema_path)
+        self.cameras: List[str] = schema["cameras"]
+        self.attributes: List[str] = schema["attributes"]
+        self._camera_ids = {path: index for index, path in enumerate(self.cameras)}
+        self.tables: Dict[str, Dict[str, np.ndarray]] = {}
+        for table, spec in schema["tables"].items():
+            rows = spec["rows"]
+            self.tables[table] = {
+                column: self._map(table, column, np.dtype(column_spec["dtype"]), tuple(column_spec["shape"]), rows)
+                for column, column_spec in spec["columns"].items()
+            }
+        self._index: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def _map(self, table: str, column: str, dtype: np.dtype, shape: Tuple[int, ...], rows: int) -> np.ndarray:
+        if not rows:
+            return np.empty((0,) + shape, dtype=dtype)
+        return np.memmap(_column_path(self.directory, table, column), dtype=dtype, mode="r", shape=(rows,) + shape)
+
+    def __len__(self) -> int:
+        return len(self.tables["values"]["frame"])
+
+    def _keys(self, cameras: np.ndarray, frames: np.ndarray) -> np.ndarray:
+        return (cameras.astype(np.int64) << 40) | frames.astype(np.int64)
+
+    def lookup(self, camera_path: str, frame: int) -> Optional[Dict[str, float]]:
+        """
+        Return the values recorded on a camera for a frame.
+
+        Args:
+            camera_path (str): The path of the camera.
+            frame (int): The frame.
+
+        Returns:
+            Dict[str, float]: The values by attribute name, or None if nothing was recorded for them.
+        """
+        camera = self._camera_ids.get(str(camera_path))
+        if camera is None:
+            return None
+
+        values = self.tables["values"]
+        if self._index is None:
+            keys = self._keys(values["camera"], values["frame"])
+            order = np.argsort(keys, kind="stable")
+            self._index = (keys[order], order)
+
+        sorted_keys, order = self._index
+        key = (camera << 40) | int(frame)
+        start, stop = np.searchsorted(sorted_keys, [key, key + 1])
+        if start == stop:
+            return None
+
+        rows = order[start:stop]
+        return {
+            self.attributes[attribute]: float(value)
+            for attribute, value in zip(values["attribute"][rows], values["value"][rows])
+        }
+
+    def intrinsics(self) -> Tuple[List[str], List[tuple]]:
+        """
+        Return the recorded values as one row per camera and frame, the per-frame intrinsics of the cameras.
+
+        Returns:
+            Tuple[List[str], List[tuple]]: The column names, "frame", "time", "camera" then the attribute names,
+            and the rows sorted by frame and camera. Attributes not recorded for a row are None.
+        """
+        values = self.tables["values"]
+        rows: Dict[Tuple[int, int], list] = {}
+        for frame, time, camera, attribute, value in zip(
+            values["frame"].tolist(),
+            values["time"].tolist(),
+            values["camera"].tolist(),
+            values["attribute"].tolist(),
+            values["value"].tolist(),
+        ):
+            row = rows.get((frame, camera))
+            if row is None:
+                row = rows[(frame, camera)] = [frame, time, self.cameras[camera]] + [None] * len(self.attributes)
+            row[3 + attribute] = value
+
+        return ["frame", "time", "camera", *self.attributes], [tuple(rows[key]) for key in sorted(rows)]
+
+    def save_intrinsics(self, path: str):
+        """Write :meth:`intrinsics` to a CSV file, to ship next to the rendered frames."""
+        header, rows = self.intrinsics()
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+
+_recorders: Dict[str, FramingRecorder] = {}
+_recordings: Dict[str, FramingRecording] = {}
+
+
+def get_recorder(directory: str) -> FramingRecorder:
+    """Return the recorder of ``directory``, shared by the nodes recording to it, starting it on first use."""
+    directory = os.path.abspath(directory)
+    recorder = _recorders.get(directory)
+    if recorder is None:
+        recorder = _recorders[directory] = FramingRecorder(directory)
+    return recorder
+
+
+def get_recording(directory: str) -> FramingRecording:
+    """Return the mapped recording of ``directory``, mapped again when it was recorded to since."""
+    directory = os.path.abspath(directory)
+    recorder = _recorders.get(directory)
+    if recorder is not None:
+        recorder.flush()
+
+    recording = _recordings.get(directory)
+    if recording is None or recording.mtime != os.path.getmtime(os.path.join(directory, SCHEMA_FILE)):
+        recording = _recordings[directory] = FramingRecording(directory)
+    return recording
+
+
+def flush_recordings():
+    """Append the buffered rows of every recorder to its directory, call it at the end of a recorded run."""
+    for recorder in _recorders.values():
+        recorder.flush()
@@ -0,0 +1,363 @@
+"""
+Always-on timing statistics of the camera nodes, and the profiler zones around their stages.
+
+Each node keeps a :class:`NodeStats` with its call count, a latency histogram, the time spent in each stage and event
+counters such as writes and skipped writes. Caches register a function returning their hit and miss counts.
+:func:`get_stats` returns a snapshot of everything and :func:`dump_stats` writes it as JSON or in the Prometheus
+text format.
+
+Zones are reported to the carb profiler and to the ``pxr.Trace`` collector when they are available and enabled.
+"""
+import bisect
+import functools
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import carb.profiler as _carb_profiler
+except ImportError:
+    _carb_profiler = None
+
+try:
+    from pxr import Trace
+
+    _trace_collector = Trace.Collector()
+except ImportError:
+    _trace_collector = None
+
+PROFILER_MASK = 1
+
+FORMAT_JSON = "json"
+FORMAT_PROMETHEUS = "prometheus"
+
+METRIC_PREFIX = "o_replicator_addons"
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 1e-1, 5e-1, 1.0, 5.0, float("inf"))
+
+CacheStatsFn = Callable[[], Optional[Dict[str, float]]]
+
+
+class LatencyHistogram:
+    """Latency histogram with fixed buckets, the counts are not cumulative."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Return the upper bound of the bucket holding the ``q`` quantile, capped by the largest latency."""
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            total += count
+            if count and total >= rank:
+                return min(bound, self.max)
+        return 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_s": self.sum,
+            "mean_s": self.sum / self.count if self.count else 0.0,
+            "p50_s": self.quantile(0.5),
+            "p99_s": self.quantile(0.99),
+            "max_s": self.max,
+            "buckets": {_format_bound(bound): count for bound, count in zip(LATENCY_BUCKETS, self.counts)},
+        }
+
+
+class _Zone:
+    __slots__ = ("stats", "stage", "label", "traced", "start")
+
+    def __init__(self, stats: "NodeStats", stage: str):
+        self.stats = stats
+        self.stage = stage
+        self.label = stats.zone_label(stage)
+        self.traced = False
+
+    def __enter__(self):
+        if _carb_profiler is not None:
+            _carb_profiler.begin(PROFILER_MASK, self.label)
+        if _trace_collector is not None and _trace_collector.enabled:
+            _trace_collector.BeginEvent(self.label)
+            self.traced = True
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        if self.traced:
+            _trace_collector.EndEvent(self.label)
+        if _carb_profiler is not None:
+            _carb_profiler.end(PROFILER_MASK)
+
+        stage = self.stats.stages.get(self.stage)
+        if stage is None:
+            self.stats.stages[self.stage] = [1, elapsed]
+        else:
+            stage[0] += 1
+            stage[1] += elapsed
+        return False
+
+
+class NodeStats:
+    """
+    The statistics of one node type.
+
+    Args:
+        name (str): The node type name.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.label = name.rsplit(".", 1)[-1]
+        self.calls = 0
+        self.failures = 0
+        self.latency = LatencyHistogram()
+        # Stage name to [count, total seconds]
+        self.stages: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self._zone_labels: Dict[str, str] = {}
+
+    def zone_label(self, stage: str) -> str:
+        label = self._zone_labels.get(stage)
+        if label is None:
+            label = self._zone_labels[stage] = f"{self.label}.{stage}"
+        return label
+
+    def zone(self, stage: str) -> _Zone:
+        """Return a context manager timing ``stage`` and reporting it as a profiler zone."""
+        return _Zone(self, stage)
+
+    def count(self, event: str, value: int = 1):
+        self.counters[event] = self.counters.get(event, 0) + value
+
+    def timed(self, compute: Callable[..., bool]) -> Callable[..., bool]:
+        """Decorate a node ``compute`` to record its latency and failures."""
+        label = self.zone_label("compute")
+
+        @functools.wraps(compute)
+        def timed_compute(*args, **kwargs):
+            if _carb_profiler is not None:
+                _carb_profiler.begin(PROFILER_MASK, label)
+            start = time.perf_counter()
+            ok = False
+            try:
+                ok = compute(*args, **kwargs)
+                return ok
+            finally:
+                self.latency.observe(time.perf_counter() - start)
+                self.calls += 1
+                if not ok:
+                    self.failures += 1
+                if _carb_profiler is not None:
+                    _carb_profiler.end(PROFILER_MASK)
+
+        return timed_compute
+
+    def reset(self):
+        self.calls = 0
+        self.failures = 0
+        self.latency = LatencyHistogram()
+        self.stages.clear()
+        self.counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "latency": self.latency.snapshot(),
+            "stages": {stage: {"count": count, "total_s": total} for stage, (count, total) in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+
+class CacheCounter:
+    """Hit and miss counts shared by the instances of a cache."""
+
+    __slots__ = ("hits", "misses")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+_node_stats: Dict[str, NodeStats] = {}
+_caches: Dict[str, CacheStatsFn] = {}
+_cache_counters: Dict[str, CacheCounter] = {}
+
+
+def get_node_stats(name: str) -> NodeStats:
+    """Return the statistics of the node type ``name``, creating them on first use."""
+    stats = _node_stats.get(name)
+    if stats is None:
+        stats = _node_stats[name] = NodeStats(name)
+    return stats
+
+
+def register_cache(name: str, stats_fn: CacheStatsFn):
+    """
+    Include a cache in the snapshots.
+
+    Args:
+        name (str): The name of the cache.
+        stats_fn (Callable): Returns the cache statistics, with at least ``hits`` and ``misses``, or None if the
+            cache doesn't exist yet.
+    """
+    _caches[name] = stats_fn
+
+
+def get_cache_counter(name: str) -> CacheCounter:
+    """Return the shared hit and miss counter registered as the cache ``name``."""
+    counter = _cache_counters.get(name)
+    if counter is None:
+        counter = _cache_counters[name] = CacheCounter()
+        register_cache(name, counter.stats)
+    return counter
+
+
+def reset_stats():
+    """Reset every node statistic and cache counter."""
+    for stats in _node_stats.values():
+        stats.reset()
+    for counter in _cache_counters.values():
+        counter.reset()
+
+
+def get_stats() -> Dict[str, Any]:
+    """Return a snapshot of the node and cache statistics."""
+    caches = {}
+    for name, stats_fn in _caches.items():
+        cache_stats = stats_fn()
+        if cache_stats is not None:
+            caches[name] = cache_stats
+
+    return {
+        "timestamp": time.time(),
+        "nodes": {name: stats.snapshot() for name, stats in _node_stats.items()},
+        "caches": caches,
+    }
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def _metric(lines: List[str], name: str, kind: str, help_text: str, samples: List[Tuple[Dict[str, Any], float]]):
+    if not samples:
+        return
+    metric = f"{METRIC_PREFIX}_{name}"
+    lines.append(f"# HELP {metric} {help_text}")
+    lines.append(f"# TYPE {metric} {kind}")
+    for labels, value in samples:
+        label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+        lines.append(f"{metric}{{{label_text}}} {value}")
+
+
+def format_prometheus(snapshot: Optional[Dict[str, Any]] = None) -> str:
+    """Format a snapshot, the current one by default, in the Prometheus text exposition format."""
+    if snapshot is None:
+        snapshot = get_stats()
+
+    nodes = snapshot["nodes"]
+    caches = snapshot["caches"]
+    lines: List[str] = []
+
+    _metric(
+        lines, "node_calls_total", "counter", "Node computes.", [({"node": n}, s["calls"]) for n, s in nodes.items()]
+    )
+    _metric(
+        lines,
+        "node_failures_total",
+        "counter",
+        "Node computes that returned False.",
+        [({"node": n}, s["failures"]) for n, s in nodes.items()],
+    )
+
+    if nodes:
+        metric = f"{METRIC_PREFIX}_node_latency_seconds"
+        lines.append(f"# HELP {metric} Node compute latency.")
+        lines.append(f"# TYPE {metric} histogram")
+        for node, stats in nodes.items():
+            latency = stats["latency"]
+            cumulative = 0
+            for bound, count in latency["buckets"].items():
+                cumulative += count
+                lines.append(f'{metric}_bucket{{node="{node}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{node="{node}"}} {latency["sum_s"]}')
+            lines.append(f'{metric}_count{{node="{node}"}} {latency["count"]}')
+
+    _metric(
+        lines,
+        "node_stage_seconds_total",
+        "counter",
+        "Time spent in each stage of the node computes.",
+        [({"node": n, "stage": stage}, v["total_s"]) for n, s in nodes.items() for stage, v in s["stages"].items()],
+    )
+    _metric(
+        lines,
+        "node_events_total",
+        "counter",
+        "Node events such as writes and skipped writes.",
+        [({"node": n, "event": event}, v) for n, s in nodes.items() for event, v in s["counters"].items()],
+    )
+    _metric(lines, "cache_hits_total", "counter", "Cache hits.", [({"cache": c}, s["hits"]) for c, s in caches.items()])
+    _metric(
+        lines,
+        "cache_misses_total",
+        "counter",
+        "Cache misses.",
+        [({"cache": c}, s["misses"]) for c, s in caches.items()],
+    )
+    _metric(
+        lines,
+        "cache_hit_ratio",
+        "gauge",
+        "Cache hits over lookups.",
+        [({"cache": c}, s.get("hit_rate", 0.0)) for c, s in caches.items()],
+    )
+
+    return "\n".join(lines) + "\n"
+
+
+def dump_stats(path: str, format: str = FORMAT_JSON) -> Dict[str, Any]:
+    """
+    Write a snapshot of the statistics to ``path``, e.g. at the end of a run.
+
+    Args:
+        path (str): The file to write.
+        format (str, optional): "json" or "prometheus". Defaults to "json".
+
+    Returns:
+        Dict[str, Any]: The snapshot written.
+    """
+    snapshot = get_stats()
+    with open(path, "w") as output:
+        if format == FORMAT_JSON:
+            json.dump(snapshot, output, indent=2)
+        elif format == FORMAT_PROMETHEUS:
+            output.write(format_prometheus(snapshot))
+        else:
+            raise ValueError(f"Unknown stats format: {format}")
+    return snapshot
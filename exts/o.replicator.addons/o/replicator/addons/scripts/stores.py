@@ -0,0 +1,200 @@
+"""
+Attribute stores the camera nodes write through.
+
+Nodes pick a store by name with :func:`get_attribute_store`. ``"usd"`` authors on the USD stage, ``"fabric"`` writes
+straight to Fabric through ``usdrt`` and skips USD layer authoring and change notification. Other stores, like the
+in-memory one, can be added with :func:`register_attribute_store`.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional, Set, Tuple, Union
+
+import carb
+from pxr import Sdf, Usd, UsdUtils
+
+from o.replicator.addons.scripts.prefetch import STAGE_LOCK
+
+STORE_USD = "usd"
+STORE_FABRIC = "fabric"
+STORE_MEMORY = "memory"
+
+AttributeKey = Tuple[str, str]
+
+
+class AttributeStore(ABC):
+    """
+    Base class of the attribute stores.
+
+    Args:
+        stage (Usd.Stage): The stage the attributes belong to.
+    """
+
+    # Whether values written with a time code are kept as time samples
+    keeps_time_samples = True
+
+    def __init__(self, stage: Usd.Stage):
+        self.stage = stage
+
+    @abstractmethod
+    def write(
+        self,
+        prim_path: Union[str, Sdf.Path],
+        name: str,
+        value: Any,
+        time: Optional[float] = None,
+        attribute: Optional[Usd.Attribute] = None,
+        write_back: bool = False,
+    ):
+        """
+        Write ``value`` to the attribute ``name`` of the prim at ``prim_path``.
+
+        Args:
+            prim_path (Union[str, Sdf.Path]): The path of the prim.
+            name (str): The name of the attribute.
+            value (Any): The value to write.
+            time (float, optional): The time code of the value, None for the default value. Defaults to None.
+            attribute (Usd.Attribute, optional): The resolved USD attribute, if the caller has it. Defaults to None.
+            write_back (bool, optional): Also author the value to USD on :meth:`flush`. Defaults to False.
+        """
+
+    @abstractmethod
+    def read(self, prim_path: Union[str, Sdf.Path], name: str) -> Any:
+        """Return the current value of the attribute ``name`` of the prim at ``prim_path``."""
+
+    def flush(self):
+        """Author anything the store deferred, called at the end of a run."""
+        pass
+
+
+class UsdAttributeStore(AttributeStore):
+    """Author the attributes on the USD stage."""
+
+    def write(self, prim_path, name, value, time=None, attribute=None, write_back=False):
+        if attribute is None:
+            attribute = self.stage.GetPrimAtPath(str(prim_path)).GetAttribute(name)
+
+        if time is None:
+            attribute.Set(value)
+        else:
+            attribute.Set(value, time)
+
+    def read(self, prim_path, name):
+        return self.stage.GetPrimAtPath(str(prim_path)).GetAttribute(name).Get()
+
+
+class FabricAttributeStore(AttributeStore):
+    """
+    Write the attributes to Fabric through ``usdrt``.
+
+    Fabric holds a single value per attribute: a value written with a time code replaces the current one, and a
+    warning is logged once per attribute. Values written with ``write_back`` are authored to USD in one change block
+    by :meth:`flush`.
+    """
+
+    keeps_time_samples = False
+
+    def __init__(self, stage: Usd.Stage):
+        super().__init__(stage)
+        import usdrt
+
+        stage_id = UsdUtils.StageCache.Get().Insert(stage).ToLongInt()
+        self.rt_stage = usdrt.Usd.Stage.Attach(stage_id)
+        self._attributes: Dict[AttributeKey, Any] = {}
+        self._pending: Dict[AttributeKey, Any] = {}
+        self._timed: Set[AttributeKey] = set()
+
+    def _get_attribute(self, prim_path, name):
+        key = (str(prim_path), name)
+        attribute = self._attributes.get(key)
+        if attribute is None:
+            attribute = self.rt_stage.GetPrimAtPath(key[0]).GetAttribute(name)
+            if attribute.IsValid():
+                self._attributes[key] = attribute
+        return attribute
+
+    def write(self, prim_path, name, value, time=None, attribute=None, write_back=False):
+        rt_attribute = self._get_attribute(prim_path, name)
+        if not rt_attribute.IsValid():
+            raise ValueError(f"Fabric has no attribute {name} on {prim_path}")
+
+        if time is not None and (str(prim_path), name) not in self._timed:
+            self._timed.add((str(prim_path), name))
+            carb.log_warn(f"Fabric has no time samples, {prim_path}.{name} is written as its current value")
+
+        rt_attribute.Set(value)
+        if write_back:
+            self._pending[(str(prim_path), name)] = value
+
+    def read(self, prim_path, name):
+        return self._get_attribute(prim_path, name).Get()
+
+    def flush(self):
+        if not self._pending:
+            return
+
+        with STAGE_LOCK, Sdf.ChangeBlock():
+            for (prim_path, name), value in self._pending.items():
+                attribute = self.stage.GetPrimAtPath(prim_path).GetAttribute(name)
+                if attribute:
+                    attribute.Set(value)
+        self._pending.clear()
+
+
+class InMemoryAttributeStore(AttributeStore):
+    """Keep the written values in a dictionary, used to test the nodes without a stage."""
+
+    def __init__(self, stage: Optional[Usd.Stage] = None):
+        super().__init__(stage)
+        self.values: Dict[AttributeKey, Any] = {}
+        self.time_samples: Dict[AttributeKey, Dict[float, Any]] = {}
+        self.flushed = 0
+
+    def write(self, prim_path, name, value, time=None, attribute=None, write_back=False):
+        key = (str(prim_path), name)
+        if time is None:
+            self.values[key] = value
+        else:
+            self.time_samples.setdefault(key, {})[time] = value
+
+    def read(self, prim_path, name):
+        return self.values.get((str(prim_path), name))
+
+    def flush(self):
+        self.flushed += 1
+
+
+StoreFactory = Callable[[Usd.Stage], AttributeStore]
+
+_store_factories: Dict[str, StoreFactory] = {
+    STORE_USD: UsdAttributeStore,
+    STORE_FABRIC: FabricAttributeStore,
+    STORE_MEMORY: InMemoryAttributeStore,
+}
+_stores: Dict[str, AttributeStore] = {}
+
+
+def register_attribute_store(name: str, factory: StoreFactory):
+    """
+    Register, or replace, the store created for ``name``.
+
+    Args:
+        name (str): The backend name the nodes select.
+        factory (Callable): Creates the store for a stage.
+    """
+    _store_factories[name] = factory
+    _stores.pop(name, None)
+
+
+def get_attribute_store(name: str, stage: Usd.Stage) -> AttributeStore:
+    """Return the store registered as ``name`` for ``stage``, creating it on first use."""
+    store = _stores.get(name)
+    if store is None or store.stage != stage:
+        if name not in _store_factories:
+            raise ValueError(f"Unknown attribute store: {name}")
+        store = _stores[name] = _store_factories[name](stage)
+    return store
+
+
+def flush_attribute_stores():
+    """Author every deferred write, e.g. the Fabric values to write back to USD at the end of a run."""
+    for store in _stores.values():
+        store.flush()
@@ -0,0 +1,243 @@
+"""
+Change tracking of watched prims, to skip work whose inputs didn't change.
+
+A :class:`TrackedPaths` watch has a generation that is bumped by every USD change that can move or resize one of
+its prims: a change on the prim, on one of its descendants or on one of its ancestors. Changes to properties that
+never affect bounds, such as materials, primvars, shader and light inputs or camera optics, are ignored. Prims
+watched for their transform only, such as cameras, also ignore the changes of their other properties and of their
+descendants.
+"""
+import weakref
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+from pxr import Sdf, Tf, Usd, UsdGeom
+
+# Property namespaces whose changes never move or resize a prim
+IGNORED_NAMESPACES: Tuple[str, ...] = ("material:", "primvars:", "inputs:", "outputs:", "info:", "semantic")
+
+# Camera optics, such as the focal lengths written by the framing nodes, never move or resize a prim either
+IGNORED_PROPERTIES: FrozenSet[str] = frozenset(UsdGeom.Camera.GetSchemaAttributeNames(False))
+
+# Property namespace of the transform operations, "xformOp:" and "xformOpOrder"
+TRANSFORM_NAMESPACE = "xformOp"
+
+# Attributes of a point instancer placing its instances
+INSTANCER_ATTRIBUTES: Tuple[str, ...] = ("positions", "orientations", "scales", "protoIndices")
+
+
+def affects_bounds(path: Sdf.Path) -> bool:
+    """Return whether a change on ``path`` can change the world bounds of its prim or of related prims."""
+    if not path.IsPropertyPath():
+        return True
+    return not path.name.startswith(IGNORED_NAMESPACES) and path.name not in IGNORED_PROPERTIES
+
+
+def changed_prim_paths(notice: Usd.Notice.ObjectsChanged) -> Set[Sdf.Path]:
+    """Return the prim paths of the changes of ``notice`` that can affect bounds."""
+    changed = set()
+    for paths in (notice.GetResyncedPaths(), notice.GetChangedInfoOnlyPaths()):
+        for path in paths:
+            if affects_bounds(path):
+                changed.add(path.GetPrimPath())
+    return changed
+
+
+def changed_prim_transforms(notice: Usd.Notice.ObjectsChanged) -> Dict[Sdf.Path, bool]:
+    """
+    Return the prim paths of the changes of ``notice`` that can affect bounds, mapped to whether they can also
+    change the local transform of the prim.
+    """
+    changed: Dict[Sdf.Path, bool] = {}
+    for paths in (notice.GetResyncedPaths(), notice.GetChangedInfoOnlyPaths()):
+        for path in paths:
+            if affects_bounds(path):
+                prim_path = path.GetPrimPath()
+                moved = not path.IsPropertyPath() or path.name.startswith(TRANSFORM_NAMESPACE)
+                changed[prim_path] = changed.get(prim_path, False) or moved
+    return changed
+
+
+def _transform_might_vary(prim: Usd.Prim) -> bool:
+    xformable = UsdGeom.Xformable(prim)
+    return bool(xformable) and xformable.TransformMightBeTimeVarying()
+
+
+def _bounds_might_vary(prim: Usd.Prim) -> bool:
+    if _transform_might_vary(prim):
+        return True
+    if prim.IsA(UsdGeom.Boundable) and UsdGeom.Boundable(prim).GetExtentAttr().ValueMightBeTimeVarying():
+        return True
+    return prim.IsA(UsdGeom.PointInstancer) and any(
+        prim.GetAttribute(name).ValueMightBeTimeVarying() for name in INSTANCER_ATTRIBUTES
+    )
+
+
+def paths_might_be_time_varying(stage: Usd.Stage, paths: Iterable[str], transform_paths: Iterable[str] = ()) -> bool:
+    """
+    Return whether the world bounds of the prims at ``paths`` or the world transforms of the prims at
+    ``transform_paths`` might change with the time code.
+
+    The bounds of a prim vary with the transforms of its ancestors, and with the transforms, extents and instancer
+    placements of its subtree.
+    """
+    # Ancestors already found to have static transforms
+    static: Set[Sdf.Path] = set()
+
+    def ancestors_might_vary(prim: Usd.Prim) -> bool:
+        prim = prim.GetParent()
+        while prim and not prim.IsPseudoRoot() and prim.GetPath() not in static:
+            if _transform_might_vary(prim):
+                return True
+            static.add(prim.GetPath())
+            prim = prim.GetParent()
+        return False
+
+    for path in paths:
+        prim = stage.GetPrimAtPath(str(path))
+        if prim and (
+            ancestors_might_vary(prim)
+            or any(_bounds_might_vary(descendant) for descendant in Usd.PrimRange(prim, Usd.TraverseInstanceProxies()))
+        ):
+            return True
+
+    for path in transform_paths:
+        prim = stage.GetPrimAtPath(str(path))
+        if prim and (_transform_might_vary(prim) or ancestors_might_vary(prim)):
+            return True
+    return False
+
+
+class TrackedPaths:
+    """
+    A set of watched prim paths and the generation of their last change.
+
+    Args:
+        paths (Iterable[str]): The watched prim paths.
+        transform_paths (Iterable[str], optional): The prim paths only watched for changes of their world transform.
+    """
+
+    __slots__ = (
+        "paths",
+        "transform_paths",
+        "generation",
+        "_watched",
+        "_transformed",
+        "_ancestors",
+        "_time_varying",
+        "__weakref__",
+    )
+
+    def __init__(self, paths: Iterable[str], transform_paths: Iterable[str] = ()):
+        self.paths: Tuple[str, ...] = tuple(str(path) for path in paths)
+        self.transform_paths: Tuple[str, ...] = tuple(str(path) for path in transform_paths)
+        self.generation = 0
+        self._watched: Set[Sdf.Path] = {Sdf.Path(path) for path in self.paths}
+        self._transformed: Set[Sdf.Path] = {Sdf.Path(path) for path in self.transform_paths}
+        self._ancestors: Set[Sdf.Path] = set()
+        # The generation and result of the last time-varying check
+        self._time_varying: Optional[Tuple[int, bool]] = None
+        for path in self._watched | self._transformed:
+            parent = path.GetParentPath()
+            while not parent.isEmpty and parent not in self._ancestors:
+                self._ancestors.add(parent)
+                parent = parent.GetParentPath()
+
+    def affected_by(self, path: Sdf.Path, moved: bool = True) -> bool:
+        """
+        Return whether a change on the prim ``path`` can move or resize a watched prim.
+
+        Args:
+            path (Sdf.Path): The prim path of the change.
+            moved (bool, optional): Whether the change can affect the local transform of the prim. Defaults to True.
+        """
+        if path in self._ancestors or path == Sdf.Path.absoluteRootPath:
+            return True
+        if moved and path in self._transformed:
+            return True
+        return any(ancestor in self._watched for ancestor in path.GetAncestorsRange())
+
+    def might_be_time_varying(self, stage: Usd.Stage) -> bool:
+        """
+        Return whether the watched prims might move or resize with the time code, see
+        :func:`paths_might_be_time_varying`. The result is kept until the next change of the watched prims.
+        """
+        if self._time_varying is None or self._time_varying[0] != self.generation:
+            varying = paths_might_be_time_varying(stage, self.paths, self.transform_paths)
+            self._time_varying = (self.generation, varying)
+        return self._time_varying[1]
+
+
+class ChangeTracker:
+    """
+    Bumps the generation of the :class:`TrackedPaths` affected by the ``Usd.Notice.ObjectsChanged`` of a stage.
+
+    The tracker only keeps weak references to the watches, dropping a watch stops tracking it.
+
+    Args:
+        stage (Usd.Stage): The stage to listen to.
+    """
+
+    def __init__(self, stage: Usd.Stage):
+        self.stage = stage
+        self._watches: "weakref.WeakSet[TrackedPaths]" = weakref.WeakSet()
+        self._listener = Tf.Notice.Register(Usd.Notice.ObjectsChanged, self._on_objects_changed, stage)
+
+    def watch(
+        self, paths: Iterable[str], previous: Optional[TrackedPaths] = None, transform_paths: Iterable[str] = ()
+    ) -> TrackedPaths:
+        """
+        Return a watch of ``paths``, reusing ``previous`` when it already watches the same paths.
+
+        Args:
+            paths (Iterable[str]): The prim paths to watch.
+            previous (TrackedPaths, optional): The watch returned for the previous call.
+            transform_paths (Iterable[str], optional): The prim paths only watched for changes of their world
+                transform.
+
+        Returns:
+            TrackedPaths: The watch.
+        """
+        paths = tuple(str(path) for path in paths)
+        transform_paths = tuple(str(path) for path in transform_paths)
+        if (
+            previous is not None
+            and previous.paths == paths
+            and previous.transform_paths == transform_paths
+            and previous in self._watches
+        ):
+            return previous
+
+        watch = TrackedPaths(paths, transform_paths)
+        self._watches.add(watch)
+        return watch
+
+    def revoke(self):
+        """Stop listening to the stage, the current watches are no longer updated."""
+        if self._listener:
+            self._listener.Revoke()
+            self._listener = None
+        self._watches.clear()
+
+    def _on_objects_changed(self, notice: Usd.Notice.ObjectsChanged, sender: Usd.Stage):
+        if not len(self._watches):
+            return
+
+        changed = changed_prim_transforms(notice)
+        for watch in list(self._watches):
+            if any(watch.affected_by(path, moved) for path, moved in changed.items()):
+                watch.generation += 1
+
+
+_change_tracker: Optional[ChangeTracker] = None
+
+
+def get_change_tracker(stage: Usd.Stage) -> ChangeTracker:
+    """Return the shared change tracker of ``stage``, replacing the tracker of a previous stage."""
+    global _change_tracker
+
+    if _change_tracker is None or _change_tracker.stage != stage:
+        if _change_tracker is not None:
+            _change_tracker.revoke()
+        _change_tracker = ChangeTracker(stage)
+
+    return _change_tracker
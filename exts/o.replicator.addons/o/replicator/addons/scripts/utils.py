@@ -14,6 +14,8 @@ from omni.replicator.core.utils import ReplicatorItem, ReplicatorWrapper, create
 
 from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
+from o.replicator.addons.scripts.graph import set_input
+
 def _set_node_inputs(node: og.Node, inputs: Dict[str, Any]):
     for input_name, value in inputs.items():
         _set_node_input(node, input_name, value)
@@ -33,7 +35,7 @@ def _set_node_input(
             )
         else:
             if value.node.get_attribute_exists("inputs:numSamples"):
-                og.AttributeValueHelper(value.node.get_attribute("inputs:numSamples")).set(1, update_usd=True)
+                set_input(value.node, "inputs:numSamples", 1)
             utils.auto_connect(value.node, node, mapping=[utils.AttrMap("outputs:samples", input_name)])
     elif hasattr(value, "__iter__"):
         if isinstance(value, str) or isinstance(value[0], str) or isinstance(value[0], (Sdf.Path, usdrt.Sdf.Path)):
@@ -41,6 +43,6 @@ def _set_node_input(
         elif isinstance(value[0], ReplicatorItem):
             set_target_prims(node, input_name, value)
         else:
-            og.AttributeValueHelper(node.get_attribute(input_name)).set(value, update_usd=True)
+            set_input(node, input_name, value)
     else:
         raise ValueError(f"Unable to set input for {node} {input_name} of type {type(value)}")
\ No newline at end of file
@@ -0,0 +1,8 @@
+from .test_calculate_focal_length import *
+from .test_coverage import *
+from .test_culling import *
+from .test_engine import *
+from .test_occlusion import *
+from .test_paths import *
+from .test_recording import *
+from .test_set_camera_params import *
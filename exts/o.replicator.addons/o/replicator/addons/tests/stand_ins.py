@@ -0,0 +1,21 @@
+"""
+The Kit stand-ins of the benchmarks, for the node tests run outside of Kit.
+
+Inside Kit, ``kit`` and ``scenes`` are None and the node tests are skipped.
+"""
+import os
+import sys
+
+try:
+    import omni.usd  # noqa: F401
+except ImportError:
+    _BENCHMARKS = os.path.join(os.path.dirname(os.path.abspath(__file__)), *[os.pardir] * 4, "benchmarks")
+    sys.path.insert(0, os.path.normpath(_BENCHMARKS))
+    import kit
+    import scenes
+
+    kit.install()
+else:
+    kit = scenes = None
+
+SKIP_REASON = "The node tests run on the Kit stand-ins of the benchmarks"
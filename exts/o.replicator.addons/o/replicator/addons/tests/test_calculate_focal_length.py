@@ -0,0 +1,101 @@
+"""
+Run the Calculate Focal Length node on the Kit stand-ins of the benchmarks.
+"""
+import unittest
+
+from pxr import Gf
+
+from .stand_ins import SKIP_REASON, kit, scenes
+
+if kit is not None:
+    from o.replicator.addons.nodes.OgnCalculateFocalLength import MAX_INVALIDATED_PREFETCHES, OgnCalculateFocalLength
+    from o.replicator.addons.scripts.stats import get_node_stats
+
+
+@unittest.skipIf(kit is None, SKIP_REASON)
+class TestCalculateFocalLength(unittest.TestCase):
+    def setUp(self):
+        self.scene = scenes.build_scene(4)
+        kit.set_stage(self.scene.stage)
+        kit.set_time(0.0)
+        self.stats = get_node_stats("o.replicator.addons.CalculateFocalLength")
+
+    def _db(self, **inputs):
+        inputs = {
+            "prims": [self.scene.camera_path],
+            "targetPrim": self.scene.target_paths,
+            "zoom": 2.0,
+            "setFocalLength": True,
+            "useHorizontalFov": True,
+            "boundsBackend": "usd",
+            **inputs,
+        }
+        return kit.FakeDb(inputs, OgnCalculateFocalLength.internal_state(), node="CalculateFocalLength")
+
+    def _run(self, db, time_codes):
+        """Compute at each time code, returning the solves skipped and the focal lengths."""
+        skipped = self.stats.counters.get("skipped_solves", 0)
+        focal_lengths = []
+        for time_code in time_codes:
+            kit.set_time(time_code)
+            self.assertTrue(OgnCalculateFocalLength.compute(db), db.errors)
+            focal_lengths.append(db.outputs.values[0])
+        return self.stats.counters.get("skipped_solves", 0) - skipped, focal_lengths
+
+    def test_skips_new_time_codes_of_a_static_scene(self):
+        skipped, focal_lengths = self._run(self._db(skipUnchanged=True), range(5))
+        self.assertEqual(skipped, 4)
+        self.assertEqual(len(set(focal_lengths)), 1)
+
+    def test_solves_time_sampled_targets(self):
+        translate = self.scene.stage.GetPrimAtPath(self.scene.target_paths[0]).GetAttribute("xformOp:translate")
+        for time_code in range(5):
+            translate.Set(Gf.Vec3d(0.0, 0.0, -100.0 * time_code), time_code)
+
+        skipped, focal_lengths = self._run(self._db(skipUnchanged=True), range(5))
+        self.assertEqual(skipped, 0)
+        self.assertEqual(len(set(focal_lengths)), 5)
+        # Back to a time code already solved, with nothing else changed
+        skipped, _ = self._run(self._db(skipUnchanged=True), [4, 4])
+        self.assertEqual(skipped, 1)
+
+    def test_solves_targets_under_a_time_sampled_ancestor(self):
+        translate = self.scene.stage.GetPrimAtPath(scenes.TARGETS_PATH).GetAttribute("xformOp:translate")
+        translate.Set(Gf.Vec3d(0.0), 0.0)
+        translate.Set(Gf.Vec3d(0.0, 0.0, -400.0), 4.0)
+
+        skipped, _ = self._run(self._db(skipUnchanged=True), range(5))
+        self.assertEqual(skipped, 0)
+
+    def _prefetch_counters(self, db, time_codes, before_compute=None):
+        """Compute at each time code with prefetch, returning the prefetch hits, misses and invalidations."""
+        names = ("prefetch_hits", "prefetch_misses", "prefetch_invalidations")
+        counts = [self.stats.counters.get(name, 0) for name in names]
+        for time_code in time_codes:
+            if before_compute is not None:
+                before_compute(time_code)
+            kit.set_time(time_code)
+            self.assertTrue(OgnCalculateFocalLength.compute(db), db.errors)
+        return [self.stats.counters.get(name, 0) - count for name, count in zip(names, counts)]
+
+    def test_prefetches_time_sampled_targets(self):
+        translate = self.scene.stage.GetPrimAtPath(self.scene.target_paths[0]).GetAttribute("xformOp:translate")
+        for time_code in range(5):
+            translate.Set(Gf.Vec3d(0.0, 0.0, -100.0 * time_code), time_code)
+
+        db = self._db(prefetch=True)
+        hits, misses, invalidations = self._prefetch_counters(db, range(5))
+        self.assertEqual((hits, misses, invalidations), (4, 1, 0))
+
+    def test_turns_prefetch_off_when_other_writers_move_the_targets(self):
+        translate = self.scene.stage.GetPrimAtPath(self.scene.target_paths[0]).GetAttribute("xformOp:translate")
+
+        def pose(time_code):
+            # What a rep.modify.pose node upstream does before every evaluation
+            translate.Set(Gf.Vec3d(0.0, 0.0, -100.0 * time_code))
+
+        db = self._db(prefetch=True)
+        hits, misses, invalidations = self._prefetch_counters(db, range(5), pose)
+        self.assertEqual((hits, misses, invalidations), (0, MAX_INVALIDATED_PREFETCHES + 1, MAX_INVALIDATED_PREFETCHES))
+        self.assertTrue(db.internal_state.prefetch_disabled)
+        self.assertFalse(db.internal_state.prefetcher.pending)
@@ -0,0 +1,30 @@
+"""
+Check the coverage solve against the projection of a ``Gf.Camera``.
+"""
+import unittest
+
+import numpy as np
+from pxr import Gf
+
+from o.replicator.addons.framing import coverage
+
+
+class TestCoverage(unittest.TestCase):
+    def test_solved_coverage_matches_gf_projection(self):
+        target_min, target_max = np.array([-1.0, -2.0, -1.0]), np.array([2.0, 1.0, 1.0])
+        local_xform = Gf.Matrix4d().SetTranslate(Gf.Vec3d(0.5, 0.0, 30.0))
+        solution = coverage.solve_coverage(
+            target_min, target_max, np.array(local_xform), np.eye(4), 36.0, 24.0, 0.2, 0.3
+        )
+        self.assertTrue(solution.valid[0])
+        self.assertGreaterEqual(solution.coverage[0], 0.2 - 1e-9)
+        self.assertLessEqual(solution.coverage[0], 0.3 + 1e-9)
+
+        camera = Gf.Camera(local_xform, Gf.Camera.Perspective, 36.0, 24.0, focalLength=float(solution.focal_length[0]))
+        projection = camera.frustum.ComputeViewMatrix() * camera.frustum.ComputeProjectionMatrix()
+        corners = np.array(
+            [projection.Transform(Gf.Vec3d(*corner)) for corner in coverage.box_corners(target_min, target_max)]
+        )
+        self.assertTrue((np.abs(corners[:, :2]) <= 1.0 + 1e-9).all())
+        area = np.prod(corners[:, :2].max(axis=0) - corners[:, :2].min(axis=0)) / 4.0
+        self.assertAlmostEqual(area, solution.coverage[0])
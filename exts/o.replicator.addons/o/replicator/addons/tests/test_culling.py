@@ -0,0 +1,51 @@
+"""
+Compare the NumPy frustum planes with ``Gf.Frustum``.
+"""
+import unittest
+
+import numpy as np
+from pxr import Gf
+
+from o.replicator.addons.framing import culling
+
+
+class TestCulling(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(11)
+
+    def _check_against_gf(self, projection, orthographic):
+        local_xform = Gf.Matrix4d().SetRotate(Gf.Rotation(Gf.Vec3d(1, 1, 0).GetNormalized(), 30.0))
+        local_xform *= Gf.Matrix4d().SetTranslate(Gf.Vec3d(5.0, -3.0, 40.0))
+        parent_xform = Gf.Matrix4d().SetTranslate(Gf.Vec3d(0.0, 2.0, 0.0))
+        planes = culling.frustum_planes(
+            np.array(local_xform), np.array(parent_xform), 35.0, 36.0, 24.0, 1.0, 100.0, orthographic=orthographic
+        )
+        self.assertEqual(planes.shape, (1, 6, 4))
+
+        camera = Gf.Camera(
+            local_xform * parent_xform, projection, 36.0, 24.0, focalLength=35.0, clippingRange=Gf.Range1f(1.0, 100.0)
+        )
+        mins = self.rng.uniform(-60.0, 60.0, (500, 3))
+        maxs = mins + self.rng.uniform(0.1, 4.0, (500, 3))
+        inside = culling.boxes_in_frustums(mins, maxs, planes)[0]
+        # Gf keeps boxes crossing a plane near a corner of the frustum, the planes test is exact on the centers
+        centers = (mins + maxs) * 0.5
+        for index, center in enumerate(centers):
+            if camera.frustum.Intersects(Gf.Vec3d(*center)):
+                self.assertTrue(inside[index])
+            if not camera.frustum.Intersects(Gf.BBox3d(Gf.Range3d(Gf.Vec3d(*mins[index]), Gf.Vec3d(*maxs[index])))):
+                self.assertFalse(inside[index])
+        self.assertTrue(inside.any() and not inside.all())
+
+    def test_perspective_planes_match_gf(self):
+        self._check_against_gf(Gf.Camera.Perspective, False)
+
+    def test_orthographic_planes_match_gf(self):
+        self._check_against_gf(Gf.Camera.Orthographic, True)
+
+    def test_empty_boxes_are_never_in_view(self):
+        planes = culling.frustum_planes(np.eye(4), np.eye(4), 35.0, 36.0, 24.0)
+        inside = culling.boxes_in_frustums(
+            [[0.0, 0.0, -10.0], [1.0, 1.0, 1.0]], [[1.0, 1.0, -9.0], [0.0, 0.0, 0.0]], planes
+        )
+        self.assertEqual(inside.tolist(), [[True, False]])
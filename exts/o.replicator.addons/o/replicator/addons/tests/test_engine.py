@@ -0,0 +1,124 @@
+"""
+Compare the NumPy framing engine with the scalar ``Gf`` computation it replaced.
+"""
+import itertools
+import math
+import unittest
+
+import numpy as np
+from pxr import Gf
+
+from o.replicator.addons.framing import engine
+
+
+def _gf_focal_length(
+    aabbox, local_xform, parent_xform, h_aperture, v_aperture, zoom, use_horizontal_fov, conform, aspect_ratio
+):
+    """The focal length solve of the original ``CalculateFocalLength`` node, for one camera"""
+    target = aabbox.GetMidpoint()
+    tr0 = Gf.Matrix4d().SetTranslate(-target)
+    local_rot = Gf.Matrix4d().SetRotate(local_xform.GetOrthonormalized().ExtractRotationQuat())
+    tr1 = Gf.Matrix4d().SetTranslate(target)
+    aabbox = Gf.BBox3d(aabbox, tr0 * local_rot * tr1).ComputeAlignedRange()
+    aabbox = Gf.BBox3d(aabbox, parent_xform.GetInverse()).ComputeAlignedRange()
+
+    distance = (local_xform.ExtractTranslation() - aabbox.GetMidpoint()).GetLength()
+    radius = aabbox.GetSize().GetLength() * zoom
+
+    h_fov_rad = math.atan((h_aperture * Gf.Camera.APERTURE_UNIT) / (2.0 * Gf.Camera.FOCAL_LENGTH_UNIT))
+    v_fov_rad = math.atan((v_aperture * Gf.Camera.APERTURE_UNIT) / (2.0 * Gf.Camera.FOCAL_LENGTH_UNIT))
+
+    def fit_horizontal():
+        if use_horizontal_fov is not None:
+            return use_horizontal_fov
+        if conform == "vertical":
+            return False
+        is_fit = conform == "fit"
+        if is_fit or conform == "crop":
+            return not (is_fit ^ (h_fov_rad / v_fov_rad > aspect_ratio))
+        return True
+
+    if fit_horizontal():
+        v_fov_rad = h_fov_rad / aspect_ratio
+    else:
+        h_fov_rad = v_fov_rad * aspect_ratio
+    return min(h_fov_rad, v_fov_rad) * (distance / radius)
+
+
+def _random_xform(rng, translation_scale):
+    axis = Gf.Vec3d(*rng.normal(size=3)).GetNormalized()
+    rotation = Gf.Matrix4d().SetRotate(Gf.Rotation(axis, rng.uniform(-180.0, 180.0)))
+    scale = Gf.Matrix4d().SetScale(rng.uniform(0.5, 2.0))
+    return scale * rotation * Gf.Matrix4d().SetTranslate(Gf.Vec3d(*rng.uniform(-1, 1, 3) * translation_scale))
+
+
+class TestEngine(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(7)
+
+    def test_focal_lengths_match_gf(self):
+        count = 32
+        local_xforms = [_random_xform(self.rng, 500.0) for _ in range(count)]
+        parent_xforms = [_random_xform(self.rng, 50.0) for _ in range(count)]
+        mins = self.rng.uniform(-100.0, 0.0, (count, 3))
+        maxs = mins + self.rng.uniform(1.0, 50.0, (count, 3))
+        h_apertures = self.rng.uniform(10.0, 40.0, count)
+        v_apertures = self.rng.uniform(10.0, 40.0, count)
+        zooms = self.rng.uniform(0.5, 2.0, count)
+
+        # Wide and tall apertures, on both sides of the aspect ratio test of the fit and crop modes
+        self.assertTrue((h_apertures > v_apertures).any() and (h_apertures < v_apertures).any())
+        cases = [(True, "fit"), (False, "fit")]
+        cases += [(None, conform) for conform in ("vertical", "horizontal", "fit", "crop", "none")]
+        for (use_horizontal_fov, conform), aspect_ratio in itertools.product(cases, (1.0, 16.0 / 9.0)):
+            # One target box per camera, shape (C, 1, 3)
+            solution = engine.solve_focal_lengths(
+                mins[:, None],
+                maxs[:, None],
+                np.array([np.array(xform) for xform in local_xforms]),
+                np.array([np.array(xform) for xform in parent_xforms]),
+                h_apertures,
+                v_apertures,
+                zoom=zooms,
+                use_horizontal_fov=use_horizontal_fov,
+                conform=conform,
+                aspect_ratio=aspect_ratio,
+            )
+            self.assertTrue(solution.valid.all())
+            for index in range(count):
+                expected = _gf_focal_length(
+                    Gf.Range3d(Gf.Vec3d(*mins[index]), Gf.Vec3d(*maxs[index])),
+                    local_xforms[index],
+                    parent_xforms[index],
+                    h_apertures[index],
+                    v_apertures[index],
+                    zooms[index],
+                    use_horizontal_fov,
+                    conform,
+                    aspect_ratio,
+                )
+                self.assertAlmostEqual(solution.focal_length[index], expected, delta=1e-6 * expected)
+
+    def test_transform_bounds_match_gf(self):
+        mins = self.rng.uniform(-10.0, 0.0, (16, 3))
+        maxs = mins + self.rng.uniform(0.0, 5.0, (16, 3))
+        xforms = [_random_xform(self.rng, 20.0) for _ in range(16)]
+        new_mins, new_maxs = engine.transform_bounds(mins, maxs, np.array([np.array(xform) for xform in xforms]))
+        for index, xform in enumerate(xforms):
+            expected = Gf.BBox3d(Gf.Range3d(Gf.Vec3d(*mins[index]), Gf.Vec3d(*maxs[index])), xform)
+            expected = expected.ComputeAlignedRange()
+            np.testing.assert_allclose(new_mins[index], expected.GetMin(), atol=1e-9)
+            np.testing.assert_allclose(new_maxs[index], expected.GetMax(), atol=1e-9)
+
+    def test_empty_targets_are_invalid(self):
+        empty_min, empty_max = engine.empty_bounds()
+        solution = engine.solve_focal_lengths(empty_min, empty_max, np.eye(4), np.eye(4), 20.0, 20.0)
+        self.assertFalse(solution.valid[0])
+
+    def test_orthographic_apertures(self):
+        focal_length, h_aperture, v_aperture = engine.focal_lengths_from_radius(
+            10.0, 2.0, 20.0, 10.0, use_horizontal_fov=True, orthographic=True
+        )
+        self.assertTrue(np.isnan(focal_length))
+        self.assertAlmostEqual(float(h_aperture), 2.0 / Gf.Camera.APERTURE_UNIT * 2.0)
+        self.assertAlmostEqual(float(v_aperture), float(h_aperture) / 2.0)
@@ -0,0 +1,63 @@
+"""
+Check the box hierarchy of the occlusion test against testing every box.
+"""
+import unittest
+
+import numpy as np
+
+from o.replicator.addons.framing.occlusion import BoxHierarchy, segment_hits
+
+
+def _brute_force(origins, ends, mins, maxs, ignored=None):
+    blocked = np.zeros(len(origins), dtype=bool)
+    for index in range(len(mins)):
+        if ignored is not None and ignored[index]:
+            continue
+        entry, exit_ = segment_hits(
+            origins, ends, np.broadcast_to(mins[index], origins.shape), np.broadcast_to(maxs[index], origins.shape)
+        )
+        blocked |= (entry > 0.0) & (entry <= exit_) & (exit_ < 1.0)
+    return blocked
+
+
+class TestBoxHierarchy(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.mins = rng.uniform(-50.0, 50.0, (300, 3))
+        self.maxs = self.mins + rng.uniform(0.5, 5.0, (300, 3))
+        # A few empty boxes, which never occlude
+        self.mins[::50], self.maxs[::50] = self.maxs[::50], self.mins[::50]
+        self.origins = rng.uniform(-60.0, 60.0, (400, 3))
+        self.ends = rng.uniform(-60.0, 60.0, (400, 3))
+        self.rng = rng
+
+    def test_occluded_matches_brute_force(self):
+        hierarchy = BoxHierarchy(self.mins, self.maxs, leaf_size=4)
+        expected = _brute_force(self.origins, self.ends, self.mins, self.maxs)
+        self.assertTrue(expected.any() and not expected.all())
+        np.testing.assert_array_equal(hierarchy.occluded(self.origins, self.ends), expected)
+
+    def test_ignored_boxes(self):
+        hierarchy = BoxHierarchy(self.mins, self.maxs)
+        ignored = self.rng.random(len(self.mins)) < 0.5
+        np.testing.assert_array_equal(
+            hierarchy.occluded(self.origins, self.ends, ignored),
+            _brute_force(self.origins, self.ends, self.mins, self.maxs, ignored),
+        )
+
+    def test_refit_matches_rebuild(self):
+        hierarchy = BoxHierarchy(self.mins, self.maxs, leaf_size=4)
+        moved = self.rng.choice(len(self.mins), 40, replace=False)
+        offsets = self.rng.uniform(-20.0, 20.0, (40, 3))
+        mins, maxs = self.mins.copy(), self.maxs.copy()
+        mins[moved] += offsets
+        maxs[moved] += offsets
+        hierarchy.refit(moved, mins[moved], maxs[moved])
+        np.testing.assert_array_equal(
+            hierarchy.occluded(self.origins, self.ends), _brute_force(self.origins, self.ends, mins, maxs)
+        )
+
+    def test_boxes_around_the_ends_do_not_block(self):
+        hierarchy = BoxHierarchy([[-1.0, -1.0, -1.0], [4.0, -1.0, -1.0]], [[1.0, 1.0, 1.0], [6.0, 1.0, 1.0]])
+        blocked = hierarchy.occluded([[0.0, 0.0, 0.0], [-5.0, 0.0, 0.0]], [[10.0, 0.0, 0.0], [-2.0, 0.0, 0.0]])
+        self.assertEqual(blocked.tolist(), [True, False])
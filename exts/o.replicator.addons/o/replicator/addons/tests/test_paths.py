@@ -0,0 +1,56 @@
+"""
+Check the prefix trees of prim paths and the normalization of the target lists.
+"""
+import unittest
+
+import numpy as np
+from pxr import Sdf
+
+from o.replicator.addons.scripts.paths import PathSet, PathTrie, normalize_paths
+
+
+class TestPathTrie(unittest.TestCase):
+    def test_keeps_outermost_paths(self):
+        trie = PathTrie(["/World/A/B", "/World/C"])
+        self.assertTrue(trie.insert("/World/A"))
+        self.assertFalse(trie.insert("/World/A/D"))
+        self.assertFalse(trie.insert("/World/C"))
+        self.assertTrue(trie.contains("/World/A"))
+        self.assertFalse(trie.contains("/World/A/B"))
+        self.assertTrue(trie.covers("/World/A/B/E"))
+        self.assertFalse(trie.covers("/World/AB"))
+        self.assertFalse(trie.covers("/World"))
+
+    def test_normalize_paths(self):
+        targets = ["/World/A/B", "/World/C", "/World/A", Sdf.Path("/World/C"), "/World/Cam/Child", "/World/D"]
+        self.assertEqual(normalize_paths(targets, ["/World/Cam"]), ("/World/C", "/World/A", "/World/D"))
+
+
+class TestPathSet(unittest.TestCase):
+    def test_matches_a_set(self):
+        rng = np.random.default_rng(5)
+        names = ["A", "B", "C"]
+        paths = ["/" + "/".join(rng.choice(names, rng.integers(1, 5))) for _ in range(400)]
+        path_set, expected = PathSet(), set()
+        for path in paths:
+            if rng.random() < 0.3:
+                self.assertEqual(path_set.discard(path), path in expected)
+                expected.discard(path)
+            else:
+                self.assertEqual(path_set.add(path), path not in expected)
+                expected.add(path)
+            self.assertEqual(len(path_set), len(expected))
+
+        for root in ["/", "/A", "/A/B", "/C/C/A", "/B/D"]:
+            below = {path for path in expected if path == root or path.startswith(root.rstrip("/") + "/")}
+            self.assertEqual(set(path_set.subtree(root)), below)
+        for path in paths:
+            self.assertEqual(path in path_set, path in expected)
+
+    def test_discard_keeps_other_paths(self):
+        path_set = PathSet(["/World/A/B", "/World/A"])
+        self.assertTrue(path_set.discard("/World/A/B"))
+        self.assertFalse(path_set.discard("/World/A/B"))
+        self.assertEqual(path_set.subtree("/World"), ["/World/A"])
+        self.assertTrue(path_set.discard("/World/A"))
+        self.assertEqual(path_set.subtree("/"), [])
@@ -0,0 +1,61 @@
+"""
+Round-trip the values written by the camera nodes through a recording directory.
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from o.replicator.addons.scripts import recording
+from o.replicator.addons.scripts.recording import FramingRecorder, FramingRecording
+
+
+class TestRecording(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.directory = self._directory.name
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_round_trip(self):
+        recorder = FramingRecorder(self.directory)
+        world = np.arange(16.0).reshape(4, 4)
+        for frame in range(3):
+            recorder.record(frame, frame * 0.5, "/World/CamA", {"focalLength": 10.0 + frame}, world_transform=world)
+            recorder.record(frame, frame * 0.5, "/World/CamB", {"focalLength": 20.0, "horizontalAperture": 1.5 * frame})
+        recorder.flush()
+
+        replay = FramingRecording(self.directory)
+        self.assertEqual(len(replay), 9)
+        self.assertEqual(replay.lookup("/World/CamA", 2), {"focalLength": 12.0})
+        self.assertEqual(replay.lookup("/World/CamB", 1), {"focalLength": 20.0, "horizontalAperture": 1.5})
+        self.assertIsNone(replay.lookup("/World/CamA", 3))
+        self.assertIsNone(replay.lookup("/World/CamC", 0))
+        np.testing.assert_array_equal(replay.tables["transforms"]["world"][1], world)
+
+        columns, rows = replay.intrinsics()
+        self.assertEqual(columns, ["frame", "time", "camera", "focalLength", "horizontalAperture"])
+        self.assertEqual(rows[0], (0, 0.0, "/World/CamA", 10.0, None))
+        self.assertEqual(rows[-1], (2, 1.0, "/World/CamB", 20.0, 3.0))
+
+    def test_buffered_rows_are_flushed(self):
+        recorder = FramingRecorder(self.directory)
+        for frame in range(recording.FLUSH_ROWS + 1):
+            recorder.record(frame, float(frame), "/World/Cam", {"focalLength": float(frame)})
+        # Reached the buffer size once, the last row is still buffered
+        self.assertEqual(len(FramingRecording(self.directory)), recording.FLUSH_ROWS)
+        recorder.flush()
+        replay = FramingRecording(self.directory)
+        self.assertEqual(
+            replay.lookup("/World/Cam", recording.FLUSH_ROWS), {"focalLength": float(recording.FLUSH_ROWS)}
+        )
+
+    def test_new_recorder_truncates(self):
+        recorder = FramingRecorder(self.directory)
+        recorder.record(0, 0.0, "/World/Cam", {"focalLength": 1.0})
+        recorder.flush()
+        FramingRecorder(self.directory)
+        self.assertEqual(len(FramingRecording(self.directory)), 0)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, recording.SCHEMA_FILE)))
@@ -0,0 +1,75 @@
+"""
+Run the Set Camera Params node on the Kit stand-ins of the benchmarks.
+"""
+import unittest
+
+from .stand_ins import SKIP_REASON, kit, scenes
+
+if kit is not None:
+    import omni.timeline
+    from o.replicator.addons.nodes.OgnSetCameraParams import OgnSetCameraParams
+    from o.replicator.addons.scripts.stores import (
+        STORE_MEMORY,
+        InMemoryAttributeStore,
+        get_attribute_store,
+        register_attribute_store,
+    )
+
+
+@unittest.skipIf(kit is None, SKIP_REASON)
+class TestSetCameraParams(unittest.TestCase):
+    def setUp(self):
+        self.scene = scenes.build_scene(1)
+        kit.set_stage(self.scene.stage)
+        self.timeline = omni.timeline.get_timeline_interface()
+        self.timeline.time_codes_per_second = 24.0
+        self.focal_length = self.scene.stage.GetPrimAtPath(scenes.CAMERA_PATH).GetAttribute("focalLength")
+
+    def tearDown(self):
+        self.timeline.time_codes_per_second = 60.0
+        kit.set_time(0.0)
+
+    def _db(self, **inputs):
+        inputs = {"cameraPrim": [self.scene.camera_path], "params": ["focalLength"], "values": [50.0], **inputs}
+        return kit.FakeDb(inputs, OgnSetCameraParams.internal_state(), node="SetCameraParams")
+
+    def test_writes_at_the_time_code(self):
+        kit.set_time(48.0)
+        db = self._db()
+        self.assertTrue(OgnSetCameraParams.compute(db))
+        self.assertEqual(list(self.focal_length.GetTimeSamples()), [48.0])
+        self.assertEqual(self.focal_length.Get(48.0), 50.0)
+
+    def test_outputs_the_baked_values_of_the_time_code(self):
+        db = self._db(bakeValues=[10.0, 20.0, 30.0], bakeTimeCodes=[0.0, 1.0, 2.0])
+        for time_code, expected in ((0.0, 10.0), (2.0, 30.0), (1.0, 20.0)):
+            kit.set_time(time_code)
+            self.assertTrue(OgnSetCameraParams.compute(db))
+            self.assertEqual(list(db.outputs.values), [expected])
+
+    def test_write_plans_skip_the_values_already_written(self):
+        # Registering the store again drops the store of a previous test
+        register_attribute_store(STORE_MEMORY, InMemoryAttributeStore)
+        store = get_attribute_store(STORE_MEMORY, self.scene.stage)
+        db = self._db(params=["focalLength", "focusDistance"], values=[50.0, 400.0], writeBackend=STORE_MEMORY)
+
+        kit.set_time(48.0)
+        for _ in range(2):
+            self.assertTrue(OgnSetCameraParams.compute(db))
+        db.inputs.values = [35.0, 400.0]
+        self.assertTrue(OgnSetCameraParams.compute(db))
+        kit.set_time(72.0)
+        self.assertTrue(OgnSetCameraParams.compute(db))
+
+        camera_path = str(db.internal_state.cameras.get(self.scene.stage, self.scene.camera_path).path)
+        self.assertEqual(
+            store.time_samples,
+            {
+                (camera_path, "focalLength"): {48.0: 35.0, 72.0: 35.0},
+                (camera_path, "focusDistance"): {48.0: 400.0, 72.0: 400.0},
+            },
+        )
+        self.assertEqual(store.values, {})
+        # The second evaluation writes nothing, the third only the focal length
+        self.assertEqual((db.internal_state.writes, db.internal_state.skipped_writes), (5, 3))
+        self.assertEqual(list(self.focal_length.GetTimeSamples()), [])